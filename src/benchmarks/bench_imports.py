@@ -0,0 +1,100 @@
+"""
+bench_imports.py
+
+Import-time profile of the topic-modeling entry point. Runs
+`python -X importtime -c "import <module>"` in fresh interpreters and reports
+the cold import wall time, the slowest top-level packages (cumulative time)
+and whether any heavy dependency was pulled in at import time.
+
+Heavy dependencies (sklearn, joblib, google.genai, SQLAlchemy, the Snowflake
+connector) must only load on the code path that needs them; the command exits
+with status 1 if one of the `--forbid` modules is imported.
+
+Usage (from the repository root):
+    python -m src.benchmarks.bench_imports
+    python -m src.benchmarks.bench_imports --module src.topic_modeling.pipeline --runs 10 --top 20
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+HEAVY_MODULES = ["sklearn", "joblib", "google.genai", "sqlalchemy", "snowflake"]
+
+
+def profile_imports(module: str) -> Tuple[float, Dict[str, int]]:
+    """Import `module` in a fresh interpreter; returns (wall seconds, {module: cumulative µs})."""
+    start = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, check=True,
+    )
+    wall = time.perf_counter() - start
+    cumulative: Dict[str, int] = {}
+    for line in proc.stderr.splitlines():
+        # "import time:  self [us] | cumulative | imported package"
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        _, cum, name = line[len("import time:"):].split("|")
+        cumulative[name.strip()] = int(cum)
+    return wall, cumulative
+
+
+def top_level(cumulative: Dict[str, int]) -> Dict[str, int]:
+    """Cumulative µs per top-level package (the outermost import of each package)."""
+    totals: Dict[str, int] = defaultdict(int)
+    for name, us in cumulative.items():
+        root = name.split(".")[0]
+        # Only the outermost entry of a package carries its whole cost
+        totals[root] = max(totals[root], us)
+    return dict(totals)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="src.topic_modeling.main")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--forbid", nargs="*", default=HEAVY_MODULES)
+    parser.add_argument("--output", help="Write the report as JSON to this file")
+    args = parser.parse_args(argv)
+
+    walls: List[float] = []
+    cumulative: Dict[str, int] = {}
+    for _ in range(args.runs):
+        wall, cumulative = profile_imports(args.module)
+        walls.append(wall)
+
+    packages = sorted(top_level(cumulative).items(), key=lambda kv: kv[1], reverse=True)
+    loaded = [m for m in args.forbid if any(n == m or n.startswith(m + ".") for n in cumulative)]
+
+    print(f"⏱️ import {args.module}: median {statistics.median(walls) * 1000:.0f} ms wall over {args.runs} run(s), "
+          f"{cumulative.get(args.module, 0) / 1000:.0f} ms in imports")
+    for name, us in packages[: args.top]:
+        print(f"  {us / 1000:>9.1f} ms  {name}")
+    if loaded:
+        print(f"❌ Heavy modules imported eagerly: {', '.join(loaded)}")
+    else:
+        print("✅ No heavy module imported at import time")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "module": args.module,
+                    "wall_ms": [round(w * 1000, 1) for w in walls],
+                    "packages_ms": {n: round(us / 1000, 1) for n, us in packages},
+                    "heavy_loaded": loaded,
+                },
+                f, indent=2,
+            )
+    return 1 if loaded else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,111 @@
+"""
+bench_parsers.py
+
+Benchmark of the Takeout parsers in `src/parsers/` on synthetic exports
+(see takeout_corpus.py). For every parser and input size it reports wall time,
+rows/sec, MB/sec and the peak RSS of the process running the parser.
+
+Each measurement runs in a fresh process so peak RSS is per parser and size.
+Generated inputs are cached in the work directory and reused across runs.
+
+Usage (from the repository root):
+    python -m src.benchmarks.bench_parsers --sizes-mb 10 100 1000
+    python -m src.benchmarks.bench_parsers --parsers chrome --sizes-mb 10 2048 --workdir /data/bench
+"""
+
+import argparse
+import importlib
+import json
+import os
+import resource
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from typing import Dict, List, Tuple
+
+from src.benchmarks.takeout_corpus import write_corpus
+
+# parser name -> (corpus kind, module, function(input_path, csv_path) -> rows)
+PARSERS: Dict[str, Tuple[str, str, str]] = {
+    "chrome": ("chrome", "src.parsers.parse_chrome_history", "parse_chrome_history"),
+    "youtube": ("youtube", "src.parsers.parse_yt", "parse_youtube_history"),
+    "google_analytics": ("google_analytics", "src.parsers.parse_google_analytics", "parse_and_save_csv"),
+}
+
+
+def run_parser(name: str, input_path: str, csv_path: str) -> Dict[str, object]:
+    """Run one parser on one input; executed in a child process."""
+    _, module, func = PARSERS[name]
+    parse = getattr(importlib.import_module(module), func)
+    rss_before = _peak_rss_mb()
+    start = time.perf_counter()
+    rows = parse(input_path, csv_path)
+    elapsed = time.perf_counter() - start
+    return {"rows": rows, "wall_s": elapsed, "peak_rss_mb": _peak_rss_mb(), "import_rss_mb": rss_before}
+
+
+def _peak_rss_mb() -> float:
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+def _corpus_path(workdir: str, kind: str, size_mb: float, seed: int) -> str:
+    ext = "json" if kind == "chrome" else "html"
+    return os.path.join(workdir, f"{kind}_{size_mb:g}mb_seed{seed}.{ext}")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--parsers", nargs="+", choices=sorted(PARSERS), default=sorted(PARSERS))
+    parser.add_argument("--sizes-mb", type=float, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--workdir", default=os.path.join(tempfile.gettempdir(), "takeout_bench"))
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write the raw results as JSON to this file")
+    args = parser.parse_args(argv)
+
+    os.makedirs(args.workdir, exist_ok=True)
+    results: List[Dict[str, object]] = []
+
+    for name in args.parsers:
+        kind = PARSERS[name][0]
+        for size_mb in args.sizes_mb:
+            input_path = _corpus_path(args.workdir, kind, size_mb, args.seed)
+            if not os.path.exists(input_path):
+                start = time.perf_counter()
+                records = write_corpus(kind, input_path, size_mb, args.seed)
+                print(f"📝 Generated {records} {kind} records ({size_mb:g} MB) in {time.perf_counter() - start:.1f}s")
+            input_mb = os.path.getsize(input_path) / (1024 * 1024)
+            csv_path = os.path.join(args.workdir, f"{name}_{size_mb:g}mb.csv")
+
+            with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as ex:
+                res = ex.submit(run_parser, name, input_path, csv_path).result()
+            os.remove(csv_path)
+
+            row = {
+                "parser": name,
+                "input_mb": round(input_mb, 1),
+                "rows": res["rows"],
+                "wall_s": round(res["wall_s"], 3),
+                "rows_per_s": round(res["rows"] / res["wall_s"], 1) if res["wall_s"] else 0.0,
+                "mb_per_s": round(input_mb / res["wall_s"], 2) if res["wall_s"] else 0.0,
+                "peak_rss_mb": round(res["peak_rss_mb"], 1),
+                "rss_over_input": round(res["peak_rss_mb"] / input_mb, 2) if input_mb else 0.0,
+            }
+            results.append(row)
+            print(json.dumps(row), flush=True)
+
+    cols = ["parser", "input_mb", "rows", "wall_s", "rows_per_s", "mb_per_s", "peak_rss_mb", "rss_over_input"]
+    print(" | ".join(f"{c:>16}" for c in cols))
+    for r in results:
+        print(" | ".join(f"{r[c]!s:>16}" for c in cols))
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"created_at": time.strftime("%Y-%m-%dT%H:%M:%S"), "results": results}, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
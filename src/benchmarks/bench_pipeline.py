@@ -0,0 +1,240 @@
+"""
+bench_pipeline.py
+
+End-to-end benchmark of `TopicModelingPipeline` (discovery → refinement →
+classification) against the SQLite stand-in and the fake LLM, so performance
+changes can be measured without Snowflake or Gemini quota.
+
+Each size runs in a fresh process, which keeps peak RSS per size meaningful.
+
+Usage (from the repository root):
+    python -m src.benchmarks.bench_pipeline --sizes 10000 100000 1000000
+    python -m src.benchmarks.bench_pipeline --sizes 10000 --save-baseline
+    python -m src.benchmarks.bench_pipeline --sizes 10000 --compare
+    python -m src.benchmarks.bench_pipeline --sizes 100000 --backend duckdb
+    python -m src.benchmarks.bench_pipeline --sizes 100000 --latency 0.5 --discovery-mode mapreduce
+"""
+
+import argparse
+import json
+import os
+import resource
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import replace
+from multiprocessing import get_context
+from typing import Dict, List
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "baselines", "pipeline_baseline.json")
+
+# (metric, direction): +1 means higher is better, -1 means lower is better
+COMPARED_METRICS = [
+    ("rows_per_s", +1),
+    ("classify_rows_per_s", +1),
+    ("peak_rss_mb", -1),
+    ("llm_calls", -1),
+]
+
+
+def run_size(n: int, opts: Dict[str, object]) -> Dict[str, object]:
+    """Run the whole pipeline on `n` synthetic entries; executed in a child process."""
+    from src.benchmarks.fake_llm import FakeLLM
+    from src.benchmarks.local_repository import LocalRepository
+    from src.benchmarks.synthetic_history import generate_history
+    from src.topic_modeling.config import AppConfig, setup_logging
+    from src.topic_modeling.metrics import metrics
+    from src.topic_modeling.pipeline import TopicModelingPipeline
+
+    setup_logging(opts["log_level"])
+    domain = opts["domain"]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # File-backed so the database pages do not count towards the process RSS
+        rows = generate_history(n, domain=domain, seed=opts["seed"])
+        start = time.perf_counter()
+        if opts["backend"] == "duckdb":
+            import pandas as pd
+
+            from src.topic_modeling.duckdb_repository import DuckDBRepository
+
+            repo = DuckDBRepository(os.path.join(tmp, "bench.duckdb"))
+            loaded = repo.import_history(pd.DataFrame(rows, columns=["datetime", "title", "url", "domain"]))
+        else:
+            repo = LocalRepository(os.path.join(tmp, "bench.sqlite"))
+            loaded = repo.load_history(rows)
+        load_s = time.perf_counter() - start
+
+        metrics.reset()
+        llm = FakeLLM(
+            latency_s=opts["latency"],
+            jitter_s=opts["jitter"],
+            error_rate=opts["error_rate"],
+            truncation_rate=opts["truncation_rate"],
+            seed=opts["seed"],
+        )
+        cfg = replace(
+            AppConfig(),
+            MODEL_PATH=os.path.join(tmp, "topic_classifier"),
+            METRICS_DIR="",
+            DISCOVERY_MODE=opts["discovery_mode"],
+            DISCOVERY_WORKERS=opts["discovery_workers"],
+        )
+        pipe = TopicModelingPipeline(domain, cfg=cfg, repo=repo, llm=llm)
+
+        timings: Dict[str, float] = {}
+        start = time.perf_counter()
+        pipe.discover_topics(sample_limit=opts["sample_limit"])
+        timings["discover_s"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        pipe.refine_topics()
+        timings["refine_s"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        with pipe.repo as db:
+            pipe.classify(db.fetch_history_by_domain(domain))
+        timings["classify_s"] = time.perf_counter() - start
+
+        with repo as db:
+            written = db.count_classified_urls(pipe.classification_table, domain)
+        repo.close()
+
+    summary = metrics.summary()
+    stage_calls: Dict[str, int] = {}
+    for stage in summary["stages"].values():
+        name = stage["labels"].get("stage", "")
+        stage_calls[name] = stage_calls.get(name, 0) + stage["count"]
+
+    total_s = sum(timings.values())
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    peak_rss_mb = rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+    return {
+        "size": n,
+        "rows_loaded": loaded,
+        "rows_classified": written,
+        "load_s": round(load_s, 3),
+        **{k: round(v, 3) for k, v in timings.items()},
+        "total_s": round(total_s, 3),
+        "rows_per_s": round(n / total_s, 1) if total_s else 0.0,
+        "classify_rows_per_s": round(written / timings["classify_s"], 1) if timings["classify_s"] else 0.0,
+        "peak_rss_mb": round(peak_rss_mb, 1),
+        "llm_calls": int(summary["llm_calls"]),
+        "llm_calls_by_outcome": dict(llm.calls),
+        "tokens_in": int(summary["tokens_in"]),
+        "tokens_out": int(summary["tokens_out"]),
+        "stage_calls": {k: v for k, v in sorted(stage_calls.items()) if k},
+    }
+
+
+def compare(results: List[Dict[str, object]], baseline: Dict[str, object], threshold: float) -> List[str]:
+    """Return a human-readable line for every metric that regressed beyond `threshold`."""
+    regressions = []
+    base_results = baseline.get("results", {})
+    for res in results:
+        base = base_results.get(str(res["size"]))
+        if not base:
+            continue
+        for metric, direction in COMPARED_METRICS:
+            old, new = base.get(metric), res.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            if change * direction < -threshold:
+                regressions.append(f"size={res['size']} {metric}: {old} → {new} ({change:+.1%})")
+    return regressions
+
+
+def _print_table(results: List[Dict[str, object]]) -> None:
+    cols = ["size", "total_s", "discover_s", "refine_s", "classify_s", "rows_per_s",
+            "classify_rows_per_s", "peak_rss_mb", "llm_calls"]
+    print(" | ".join(f"{c:>19}" for c in cols))
+    for r in results:
+        print(" | ".join(f"{r[c]!s:>19}" for c in cols))
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--domain", default="reddit.com")
+    parser.add_argument("--backend", choices=["sqlite", "duckdb"], default="sqlite", help="Local storage backend")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--sample-limit", type=int, default=None, help="Discovery sample limit (as in main.py)")
+    parser.add_argument("--discovery-mode", choices=["sequential", "mapreduce"], default="sequential")
+    parser.add_argument("--discovery-workers", type=int, default=4)
+    parser.add_argument("--latency", type=float, default=0.0, help="Fake LLM latency per call (s)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Fake LLM latency jitter (s)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of non-JSON LLM answers")
+    parser.add_argument("--truncation-rate", type=float, default=0.0, help="Share of truncated LLM answers")
+    parser.add_argument("--log-level", default="WARNING")
+    parser.add_argument("--output", help="Write the raw results as JSON to this file")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="Store these results as the new baseline")
+    parser.add_argument("--compare", action="store_true", help="Fail if results regress against the baseline")
+    parser.add_argument("--threshold", type=float, default=0.15, help="Allowed relative regression")
+    args = parser.parse_args(argv)
+
+    opts = {
+        "domain": args.domain,
+        "backend": args.backend,
+        "seed": args.seed,
+        "sample_limit": args.sample_limit,
+        "discovery_mode": args.discovery_mode,
+        "discovery_workers": args.discovery_workers,
+        "latency": args.latency,
+        "jitter": args.jitter,
+        "error_rate": args.error_rate,
+        "truncation_rate": args.truncation_rate,
+        "log_level": args.log_level,
+    }
+
+    results = []
+    for n in args.sizes:
+        with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as ex:
+            results.append(ex.submit(run_size, n, opts).result())
+        print(json.dumps(results[-1]), flush=True)
+
+    _print_table(results)
+    payload = {"created_at": time.strftime("%Y-%m-%dT%H:%M:%S"), "params": opts,
+               "results": {str(r["size"]): r for r in results}}
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(payload, f, indent=2)
+
+    status = 0
+    if args.compare:
+        if not os.path.exists(args.baseline):
+            print(f"No baseline at {args.baseline}; run with --save-baseline first.")
+            status = 2
+        else:
+            with open(args.baseline, encoding="utf-8") as f:
+                baseline = json.load(f)
+            if baseline.get("params") != opts:
+                print("⚠️ Baseline was recorded with different parameters; comparison may be meaningless.")
+            regressions = compare(results, baseline, args.threshold)
+            for line in regressions:
+                print(f"❌ Regression: {line}")
+            if not regressions:
+                print("✅ No regression against baseline.")
+            status = 1 if regressions else 0
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        # Merge so baselines for sizes not re-run are kept
+        existing = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline, encoding="utf-8") as f:
+                existing = json.load(f).get("results", {})
+        payload["results"] = {**existing, **payload["results"]}
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(payload, f, indent=2)
+        print(f"💾 Baseline saved to {args.baseline}")
+
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
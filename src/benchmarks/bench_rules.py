@@ -0,0 +1,71 @@
+"""
+bench_rules.py
+
+Throughput of the rule engine (src/topic_modeling/rules.py) on synthetic
+history: entries/sec over blocks of `RULES_BATCH` entries and hits per rule.
+
+Usage (from the repository root):
+    python -m src.benchmarks.bench_rules --n 1000000
+    python -m src.benchmarks.bench_rules --n 300000 --dense
+    python -m src.benchmarks.bench_rules --rules topic_rules.json --domain reddit.com --scrolling /r/popular,/r/all
+
+`--dense` adds the SCROLLING_URLS of .env.example, which hit almost every
+synthetic entry: the worst case for the block scan.
+"""
+
+import argparse
+import json
+import sys
+import time
+
+from src.benchmarks.synthetic_history import generate_history
+from src.topic_modeling.config import AppConfig
+from src.topic_modeling.rules import load_rules
+
+EXAMPLE_RULES = "src/topic_modeling/topic_rules.example.json"
+# SCROLLING_URLS of .env.example
+DENSE_SCROLLING = "https://www.reddit.com,https://m.facebook.com,https://www.instagram.com"
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--n", type=int, default=1_000_000)
+    parser.add_argument("--rules", default=EXAMPLE_RULES)
+    parser.add_argument("--domain", default="reddit.com")
+    parser.add_argument("--scrolling", default="", help="Comma-separated SCROLLING_URLS substrings")
+    parser.add_argument("--dense", action="store_true", help="Add the .env.example SCROLLING_URLS (dense hits)")
+    parser.add_argument("--block", type=int, default=AppConfig().RULES_BATCH)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    scrolling = [s for s in args.scrolling.split(",") if s]
+    if args.dense:
+        scrolling += DENSE_SCROLLING.split(",")
+    rules = load_rules(args.rules, args.domain, scrolling)
+    if rules is None:
+        print(f"❌ No rules for {args.domain} in {args.rules}")
+        return 1
+    rows = list(generate_history(args.n, args.domain, seed=args.seed))
+    urls = [r[2] for r in rows]
+    titles = [r[1] for r in rows]
+
+    start = time.perf_counter()
+    final = 0
+    for i in range(0, len(rows), args.block):
+        for m in rules.match(urls[i : i + args.block], titles[i : i + args.block]):
+            final += bool(m and m.final)
+    elapsed = time.perf_counter() - start
+
+    print(json.dumps({
+        "entries": len(rows),
+        "rules": len(rules.rules),
+        "wall_s": round(elapsed, 3),
+        "entries_per_s": round(len(rows) / elapsed, 1) if elapsed else 0.0,
+        "final_hits": final,
+        "hits": dict(rules.hits.most_common()),
+    }, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,198 @@
+"""
+bench_workers.py
+
+Multi-process test of sharded classification (`TopicModelingPipeline.run_worker`):
+several worker processes share one SQLite file standing in for Snowflake and
+one `MODEL_PATH` directory, claim shard leases and classify with the fake LLM
+until the shared `--llm-limit` is spent, then with the local model one of them
+trains. Optionally one worker crashes (hard exit) mid-shard, so its lease has
+to expire and be taken over.
+
+Checks that every history URL ends up classified exactly once in the
+classification table, every shard is done and the workers together sent at
+most `--llm-limit` rows (plus one batch per worker) to the LLM; exits 1
+otherwise. Reports wall time, shards and rows per worker, and the rows
+classified twice because of takeovers.
+
+Usage (from the repository root):
+    python -m src.benchmarks.bench_workers --workers 4 --n 20000 --latency 0.05
+    python -m src.benchmarks.bench_workers --workers 4 --crash-after 20 --lease 3
+    python -m src.benchmarks.bench_workers --workers 3 --n 3000 --shards 8 --llm-limit 500
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from dataclasses import replace
+from multiprocessing import get_context
+from typing import Dict, List
+
+
+def _config(tmp: str, opts: Dict[str, object]):
+    from src.topic_modeling.config import AppConfig
+
+    return replace(
+        AppConfig(),
+        MODEL_PATH=os.path.join(tmp, "topic_classifier"),  # shared by every worker
+        METRICS_DIR="",
+        RULES_PATH="",
+        CLASSIFY_SHARDS=opts["shards"],
+        LEASE_SECONDS=opts["lease"],
+        LLM_LIMIT=opts["llm_limit"],
+    )
+
+
+def prepare(db_path: str, tmp: str, opts: Dict[str, object]) -> int:
+    """Load synthetic history and refine topics once; returns the number of distinct URLs."""
+    from src.benchmarks.fake_llm import FakeLLM
+    from src.benchmarks.local_repository import LocalRepository
+    from src.benchmarks.synthetic_history import generate_history
+    from src.topic_modeling.pipeline import TopicModelingPipeline
+
+    repo = LocalRepository(db_path)
+    repo.load_history(generate_history(opts["n"], domain=opts["domain"], seed=opts["seed"]))
+    pipe = TopicModelingPipeline(opts["domain"], cfg=_config(tmp, opts), repo=repo, llm=FakeLLM(seed=opts["seed"]))
+    pipe.discover_topics()
+    pipe.refine_topics()
+    with repo as db:
+        distinct = db.count_history_urls(opts["domain"])
+    repo.close()
+    return distinct
+
+
+def run_worker(index: int, db_path: str, tmp: str, opts: Dict[str, object]) -> None:
+    """Child process: run one worker and write its report to `<tmp>/worker-<index>.json`."""
+    from src.benchmarks.fake_llm import FakeLLM
+    from src.benchmarks.local_repository import LocalRepository
+    from src.topic_modeling.config import setup_logging
+    from src.topic_modeling.metrics import metrics
+    from src.topic_modeling.pipeline import TopicModelingPipeline
+
+    setup_logging(opts["log_level"])
+    name = f"w{index}"
+    fake = FakeLLM(latency_s=opts["latency"], seed=opts["seed"] + index)
+    llm = fake
+    if index == 0 and opts["crash_after"]:
+        def llm(prompt: str) -> str:
+            # Simulated crash: no cleanup, the lease is left to expire
+            if sum(fake.calls.values()) >= opts["crash_after"]:
+                os._exit(3)
+            return fake(prompt)
+
+    repo = LocalRepository(db_path)
+    pipe = TopicModelingPipeline(opts["domain"], cfg=_config(tmp, opts), repo=repo, llm=llm)
+    start = time.perf_counter()
+    completed = pipe.run_worker(name)
+    wall = time.perf_counter() - start
+    repo.close()
+
+    report = {
+        "worker": name,
+        "wall_s": round(wall, 3),
+        "shards_completed": completed,
+        "rows_classified": int(metrics.counter_value("rows_classified_total")),
+        "rows_llm": int(metrics.counter_value("rows_classified_total", source="llm")),
+        "rows_local": int(metrics.counter_value("rows_classified_total", source="local")),
+        "takeovers": int(metrics.counter_value("shard_takeovers_total")),
+        "lease_renewals": int(metrics.counter_value("lease_renewals_total")),
+        "llm_calls": sum(fake.calls.values()),
+    }
+    with open(os.path.join(tmp, f"worker-{index}.json"), "w", encoding="utf-8") as f:
+        json.dump(report, f)
+
+
+def check(db_path: str, opts: Dict[str, object], distinct_urls: int) -> Dict[str, object]:
+    from src.benchmarks.local_repository import LocalRepository
+    from src.topic_modeling.config import AppConfig
+
+    cfg = AppConfig()
+    repo = LocalRepository(db_path)
+    with repo as db:
+        rows, urls = db.session.execute(
+            f"SELECT COUNT(*), COUNT(DISTINCT url) FROM {cfg.CLASSIFICATION_TABLE} WHERE domain = ?", (opts["domain"],)
+        ).fetchone()
+        shards, done = db.session.execute(
+            f"SELECT COUNT(*), SUM(done) FROM {cfg.LEASE_TABLE} WHERE domain = ?", (opts["domain"],)
+        ).fetchone()
+        budget = db.session.execute(
+            f"SELECT llm_rows FROM {cfg.BUDGET_TABLE} WHERE domain = ?", (opts["domain"],)
+        ).fetchone()
+    repo.close()
+    return {"history_urls": distinct_urls, "classified_rows": rows, "classified_urls": urls,
+            "shards": shards, "shards_done": done or 0, "llm_budget_used": budget[0] if budget else 0}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--n", type=int, default=20_000, help="Synthetic history entries")
+    parser.add_argument("--domain", default="reddit.com")
+    parser.add_argument("--shards", type=int, default=16)
+    parser.add_argument("--lease", type=float, default=5.0, help="Lease duration (s)")
+    parser.add_argument("--latency", type=float, default=0.05, help="Fake LLM latency per call (s)")
+    parser.add_argument("--llm-limit", type=int, default=5_000, help="LLM_LIMIT shared by all workers")
+    parser.add_argument("--crash-after", type=int, default=0, help="Worker 0 exits hard after this many LLM calls")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--log-level", default="WARNING")
+    args = parser.parse_args(argv)
+    opts = {k: v for k, v in vars(args).items() if k != "workers"}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "shared.sqlite")
+        distinct = prepare(db_path, tmp, opts)
+
+        ctx = get_context("spawn")
+        procs = [ctx.Process(target=run_worker, args=(i, db_path, tmp, opts)) for i in range(args.workers)]
+        start = time.perf_counter()
+        for p in procs:
+            p.start()
+        for p in procs:
+            p.join()
+        wall = time.perf_counter() - start
+
+        reports: List[Dict[str, object]] = []
+        for i, p in enumerate(procs):
+            path = os.path.join(tmp, f"worker-{i}.json")
+            if os.path.exists(path):
+                with open(path, encoding="utf-8") as f:
+                    reports.append(json.load(f))
+            else:
+                reports.append({"worker": f"w{i}", "exit_code": p.exitcode})
+        result = check(db_path, opts, distinct)
+
+    result.update({
+        "workers": args.workers,
+        "wall_s": round(wall, 3),
+        "urls_per_s": round(distinct / wall, 1) if wall else 0.0,
+        "rows_classified_by_workers": sum(r.get("rows_classified", 0) for r in reports),
+        "rows_llm_by_workers": sum(r.get("rows_llm", 0) for r in reports),
+        "per_worker": reports,
+    })
+    # Rows of the crashed worker are not reported, so this counts redone work of surviving workers only
+    result["redone_rows"] = max(0, result["rows_classified_by_workers"] - distinct)
+    print(json.dumps(result, indent=2))
+
+    from src.topic_modeling.config import AppConfig
+
+    # Each worker may overshoot the shared limit by the one batch it reserved last
+    llm_cap = args.llm_limit + args.workers * AppConfig().CLASSIFY_BATCH
+    ok = (
+        result["classified_rows"] == result["classified_urls"] == distinct
+        and result["shards_done"] == result["shards"]
+    )
+    # Rows of a crashed worker are not reported; the budget table counts its reservations
+    within_budget = max(result["rows_llm_by_workers"], result["llm_budget_used"]) <= llm_cap
+    print("✅ Every URL classified exactly once" if ok else "❌ Classification incomplete or duplicated")
+    print(
+        f"✅ {result['rows_llm_by_workers']} rows sent to the LLM (limit {args.llm_limit} + one batch per worker)"
+        if within_budget else f"❌ {result['rows_llm_by_workers']} rows sent to the LLM, above {llm_cap}"
+    )
+    ok = ok and within_budget
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
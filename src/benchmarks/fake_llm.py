@@ -0,0 +1,155 @@
+"""
+fake_llm.py
+
+Deterministic stand-in for `call_llm`. It recognises the three real prompts
+(discovery, refinement, batch assignment), reads the data embedded in them and
+returns well-formed JSON answers, with configurable latency and a configurable
+rate of refusals (non-JSON answers) and truncated answers.
+"""
+
+import json
+import random
+import re
+import threading
+import time
+import zlib
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Dict, List
+
+from src.topic_modeling.metrics import TOKEN_BUCKETS, metrics
+
+MODEL_NAME = "fake-llm"
+
+_DISCOVERY_MARKER = "discover recurring **topics**"
+_REFINEMENT_MARKER = "refine it to 5 to 15 broader"
+_ASSIGNMENT_MARKER = "## Batch of browsing history entries:"
+
+_STOPWORDS = {
+    "the", "and", "for", "with", "how", "what", "why", "you", "your", "this", "that",
+    "from", "are", "les", "des", "une", "pour", "dans", "sur", "est", "reddit",
+}
+_WORD_RE = re.compile(r"[^\W\d_]{3,}", re.UNICODE)
+
+
+@dataclass
+class FakeLLM:
+    """Callable `prompt -> str` mimicking Gemini answers for the pipeline prompts.
+
+    Randomness is seeded from `seed` and the prompt itself, so a given prompt
+    always gets the same answer regardless of call order or thread.
+    """
+
+    latency_s: float = 0.0
+    jitter_s: float = 0.0
+    error_rate: float = 0.0
+    truncation_rate: float = 0.0
+    max_topics: int = 10
+    seed: int = 0
+    calls: Counter = field(default_factory=Counter)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def __call__(self, prompt: str) -> str:
+        rng = random.Random(zlib.crc32(prompt.encode("utf-8")) ^ self.seed)
+        kind = _prompt_kind(prompt)
+        start = time.perf_counter()
+
+        if self.latency_s or self.jitter_s:
+            time.sleep(max(0.0, self.latency_s + rng.uniform(-self.jitter_s, self.jitter_s)))
+
+        if rng.random() < self.error_rate:
+            # Models fail mostly by answering prose instead of JSON
+            answer = "I'm sorry, I can't help with classifying this content."
+            self._count(kind, "error")
+        else:
+            if kind == "discovery":
+                answer = json.dumps(self._discover(prompt), ensure_ascii=False, indent=2)
+            elif kind == "refinement":
+                answer = json.dumps(self._refine(prompt), ensure_ascii=False, indent=2)
+            elif kind == "assignment":
+                answer = json.dumps(self._assign(prompt), ensure_ascii=False, indent=2)
+            else:
+                answer = "{}"
+            if rng.random() < self.truncation_rate:
+                answer = answer[: rng.randint(1, max(1, len(answer) - 1))]
+                self._count(kind, "truncated")
+            else:
+                self._count(kind, "ok")
+
+        # Same metric names as the real client so benchmark reports read the same
+        metrics.observe("stage_seconds", time.perf_counter() - start, stage="llm.call")
+        metrics.inc("llm_calls_total", model=MODEL_NAME)
+        tokens_in, tokens_out = len(prompt) // 4, len(answer) // 4
+        metrics.inc("llm_tokens_total", tokens_in, direction="input", model=MODEL_NAME)
+        metrics.inc("llm_tokens_total", tokens_out, direction="output", model=MODEL_NAME)
+        metrics.observe("llm_tokens_per_call", tokens_in + tokens_out, buckets=TOKEN_BUCKETS, model=MODEL_NAME)
+        return f"```json\n{answer}\n```"
+
+    def _count(self, kind: str, outcome: str) -> None:
+        with self._lock:
+            self.calls[f"{kind}.{outcome}"] += 1
+
+    # ---- Answers ----
+    def _discover(self, prompt: str) -> Dict[str, Dict[str, object]]:
+        sample = _json_between(prompt, "## Data sample:", "## Your task:") or []
+        by_word: Dict[str, List[Dict[str, str]]] = {}
+        for entry in sample:
+            for word in _keywords(entry.get("title", "")):
+                by_word.setdefault(word, []).append(entry)
+        top = sorted(by_word.items(), key=lambda kv: (-len(kv[1]), kv[0]))[: self.max_topics]
+        return {
+            f"{word.title()} Content": {
+                "description": f"Pages about {word}.",
+                "example_domains": [e["url"] for e in entries[:2]],
+                "example_titles": [e["title"] for e in entries[:2]],
+            }
+            for word, entries in top
+        }
+
+    def _refine(self, prompt: str) -> Dict[str, Dict[str, object]]:
+        names = re.findall(r"^- Name: (.+)$", prompt, flags=re.MULTILINE)
+        counts = Counter(n.strip() for n in names)
+        kept = [n for n, _ in sorted(counts.items(), key=lambda kv: (-kv[1], kv[0]))][:15]
+        return {
+            name: {"description": f"Refined topic covering {name.lower()}.", "example_domains": [], "example_titles": []}
+            for name in kept
+        }
+
+    def _assign(self, prompt: str) -> Dict[str, Dict[str, List[str]]]:
+        entries = _json_between(prompt, _ASSIGNMENT_MARKER, "## Task:") or []
+        topics = _json_between(prompt, "## Topics:", "Each topic has:") or []
+        names = [t["name"] for t in topics if isinstance(t, dict) and "name" in t]
+        out: Dict[str, Dict[str, List[str]]] = {}
+        for entry in entries:
+            title_words = set(_keywords(entry.get("title", "")))
+            classes = [n for n in names if n.split(" ")[0].lower() in title_words][:3]
+            if not classes and names:
+                # Stable pseudo-random fallback so unseen words still spread over topics
+                classes = [names[zlib.crc32(entry["url"].encode("utf-8")) % len(names)]]
+            out[entry["url"]] = {"classes": classes or ["Other"]}
+        return out
+
+
+def _prompt_kind(prompt: str) -> str:
+    if _ASSIGNMENT_MARKER in prompt:
+        return "assignment"
+    if _REFINEMENT_MARKER in prompt:
+        return "refinement"
+    if _DISCOVERY_MARKER in prompt:
+        return "discovery"
+    return "unknown"
+
+
+def _json_between(prompt: str, start: str, end: str):
+    i = prompt.find(start)
+    j = prompt.find(end, i + len(start)) if i >= 0 else -1
+    if i < 0 or j < 0:
+        return None
+    try:
+        return json.loads(prompt[i + len(start) : j])
+    except json.JSONDecodeError:
+        return None
+
+
+def _keywords(title: str) -> List[str]:
+    return [w for w in (m.lower() for m in _WORD_RE.findall(title or "")) if w not in _STOPWORDS]
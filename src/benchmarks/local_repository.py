@@ -0,0 +1,370 @@
+"""
+local_repository.py
+
+SQLite `StorageBackend` standing in for `SnowflakeRepository`, so the topic
+pipeline can be run and benchmarked without a Snowflake account. Same public
+methods, same table names;
+Snowflake-only SQL (`PARSE_JSON`, `ARRAY`, `FROM VALUES`) is replaced by JSON text
+columns and plain parameterized inserts.
+"""
+
+import json
+import sqlite3
+import time
+import zlib
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+
+from src.topic_modeling.data_models import HistoryEntry
+from src.topic_modeling.leases import claim_order
+from src.topic_modeling.metrics import metrics
+from src.topic_modeling.storage import StorageBackend
+
+HISTORY_TABLE = "raw_history"
+# Shard of a URL for sharded workers (SQLite has no hash function; crc32 is registered per connection)
+_SHARD_SQL = "crc32(url) % ?"
+
+
+def _crc32(value: Optional[str]) -> int:
+    return zlib.crc32((value or "").encode("utf-8"))
+
+
+class LocalRepository(StorageBackend):
+    """SQLite-backed repository exposing the `SnowflakeRepository` API.
+
+    `path` may be ":memory:" (default) or a file; a file lets several
+    processes share one database.
+    """
+
+    def __init__(self, path: str = ":memory:", fetch_size: int = 10_000):
+        self.path = path
+        self.fetch_size = fetch_size
+        self.conn = sqlite3.connect(path, timeout=60, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.create_function("crc32", 1, _crc32, deterministic=True)
+        self.conn.execute(
+            f"""
+            CREATE TABLE IF NOT EXISTS {HISTORY_TABLE} (
+                id INTEGER PRIMARY KEY,
+                datetime TEXT,
+                title TEXT,
+                url TEXT,
+                domain TEXT
+            )
+            """
+        )
+        self.conn.execute(f"CREATE INDEX IF NOT EXISTS {HISTORY_TABLE}_domain ON {HISTORY_TABLE} (domain)")
+        self.conn.commit()
+        self.session = None
+        self._depth = 0
+
+    def __enter__(self) -> "LocalRepository":
+        # Re-entrant like SnowflakeRepository: nested blocks share the session
+        self.session = self.conn
+        self._depth += 1
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._depth -= 1
+        if exc_type is None:
+            self.conn.commit()
+        elif not self._depth:
+            self.conn.rollback()
+        if not self._depth:
+            self.session = None
+
+    def close(self) -> None:
+        self.conn.close()
+
+    # ---- Loading ----
+    def load_history(self, rows: Iterable[Tuple[str, str, str, str]], batch_size: int = 50_000) -> int:
+        """Bulk-insert (datetime, title, url, domain) rows; returns the number inserted."""
+        sql = f"INSERT INTO {HISTORY_TABLE} (datetime, title, url, domain) VALUES (?, ?, ?, ?)"
+        total = 0
+        buf: List[Tuple[str, str, str, str]] = []
+        for row in rows:
+            buf.append(row)
+            if len(buf) >= batch_size:
+                self.conn.executemany(sql, buf)
+                total += len(buf)
+                buf.clear()
+        if buf:
+            self.conn.executemany(sql, buf)
+            total += len(buf)
+        self.conn.commit()
+        return total
+
+    # ---- Helpers ----
+    @metrics.timed("repo.ensure_classification_table")
+    def ensure_classification_table(self, table: str) -> None:
+        # WITHOUT ROWID stores rows in key order, the SQLite analogue of CLUSTER BY (domain, url)
+        self.session.execute(
+            f"""
+            CREATE TABLE IF NOT EXISTS {table} (
+                domain TEXT NOT NULL,
+                url TEXT NOT NULL,
+                title TEXT,
+                topics TEXT,
+                source TEXT,
+                classified_at TEXT DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (domain, url)
+            ) WITHOUT ROWID
+            """
+        )
+        # Tables created before rows recorded their source (SQLite has no ADD COLUMN IF NOT EXISTS)
+        columns = {r[1] for r in self.session.execute(f"PRAGMA table_info({table})")}
+        if "source" not in columns:
+            self.session.execute(f"ALTER TABLE {table} ADD COLUMN source TEXT")
+
+    @metrics.timed("repo.distinct_classified_urls")
+    def distinct_classified_urls(
+        self, table: str, domain: str, shard: Optional[int] = None, n_shards: int = 1
+    ) -> Set[str]:
+        sql, params = f"SELECT url FROM {table} WHERE domain = ?", (domain,)
+        if shard is not None:
+            sql += f" AND {_SHARD_SQL} = ?"
+            params += (n_shards, shard)
+        return {r[0] for r in self.session.execute(sql, params)}
+
+    @metrics.timed("repo.count_classified_urls")
+    def count_classified_urls(self, table: str, domain: str) -> int:
+        row = self.session.execute(f"SELECT COUNT(*) FROM {table} WHERE domain = ?", (domain,)).fetchone()
+        return (row[0] or 0) if row else 0
+
+    @metrics.timed("repo.write_classifications")
+    def write_classifications(self, table: str, domain: str, entries: Sequence[Dict[str, object]]) -> None:
+        if not entries:
+            return
+        metrics.inc("rows_written_total", len(entries), table=table)
+        self.session.executemany(
+            f"""
+            INSERT INTO {table} (domain, url, title, topics, source) VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT (domain, url) DO UPDATE SET
+                title = excluded.title, topics = excluded.topics, source = excluded.source,
+                classified_at = CURRENT_TIMESTAMP
+            """,
+            [(domain, e["url"], e["title"], json.dumps(e.get("topics", [])), e.get("source")) for e in entries],
+        )
+
+    @metrics.timed("repo.migrate_classifications")
+    def migrate_classifications(self, legacy_table: str, table: str, domain: str) -> bool:
+        exists = self.session.execute(
+            "SELECT COUNT(*) FROM sqlite_master WHERE type = 'table' AND name = ?", (legacy_table,)
+        ).fetchone()[0]
+        if not exists:
+            return False
+        self.session.execute(
+            f"""
+            INSERT INTO {table} (domain, url, title, topics)
+            SELECT ?, url, title, topics FROM {legacy_table}
+            WHERE url IS NOT NULL
+            GROUP BY url
+            ON CONFLICT DO NOTHING
+            """,
+            (domain,),
+        )
+        return True
+
+    @metrics.timed("repo.fetch_classifications")
+    def fetch_classifications(
+        self, table: str, domain: str, limit: int, source: Optional[str] = None
+    ) -> List[Tuple[str, List[str]]]:
+        sql, params = f"SELECT title, topics FROM {table} WHERE domain = ?", (domain,)
+        if source is not None:
+            sql += " AND source = ?"
+            params += (source,)
+        rows = self.session.execute(sql + " ORDER BY classified_at DESC LIMIT ?", params + (limit,))
+        return [(title, json.loads(topics or "[]")) for title, topics in rows]
+
+    # ---- Shard leases ----
+    @metrics.timed("repo.ensure_lease_table")
+    def ensure_lease_table(self, table: str) -> None:
+        self.session.execute(
+            f"""
+            CREATE TABLE IF NOT EXISTS {table} (
+                domain TEXT NOT NULL,
+                shard INTEGER NOT NULL,
+                owner TEXT,
+                expires_at REAL NOT NULL DEFAULT 0,
+                done INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (domain, shard)
+            )
+            """
+        )
+
+    @metrics.timed("repo.init_shards")
+    def init_shards(self, table: str, domain: str, n_shards: int) -> int:
+        count = self.session.execute(f"SELECT COUNT(*) FROM {table} WHERE domain = ?", (domain,)).fetchone()[0]
+        if count:
+            return count
+        self.session.executemany(
+            f"INSERT OR IGNORE INTO {table} (domain, shard) VALUES (?, ?)", [(domain, s) for s in range(n_shards)]
+        )
+        return self.session.execute(f"SELECT COUNT(*) FROM {table} WHERE domain = ?", (domain,)).fetchone()[0]
+
+    @metrics.timed("repo.reset_shards")
+    def reset_shards(self, table: str, domain: str) -> None:
+        self.session.execute(f"UPDATE {table} SET owner = NULL, expires_at = 0, done = 0 WHERE domain = ?", (domain,))
+
+    @metrics.timed("repo.claim_shard")
+    def claim_shard(self, table: str, domain: str, worker: str, lease_seconds: float) -> Optional[int]:
+        now = time.time()
+        free = dict(
+            self.session.execute(
+                f"SELECT shard, owner FROM {table} WHERE domain = ? AND NOT done AND (owner IS NULL OR expires_at < ?)"
+                " ORDER BY shard",
+                (domain, now),
+            ).fetchall()
+        )
+        for shard in claim_order(list(free), worker):
+            cur = self.session.execute(
+                f"UPDATE {table} SET owner = ?, expires_at = ?"
+                " WHERE domain = ? AND shard = ? AND NOT done AND (owner IS NULL OR expires_at < ?)",
+                (worker, now + lease_seconds, domain, shard, now),
+            )
+            if cur.rowcount == 1:
+                if free[shard] is not None:
+                    metrics.inc("shard_takeovers_total")
+                return shard
+        return None
+
+    @metrics.timed("repo.renew_lease")
+    def renew_lease(self, table: str, domain: str, shard: int, worker: str, lease_seconds: float) -> bool:
+        cur = self.session.execute(
+            f"UPDATE {table} SET expires_at = ? WHERE domain = ? AND shard = ? AND owner = ? AND NOT done",
+            (time.time() + lease_seconds, domain, shard, worker),
+        )
+        return cur.rowcount == 1
+
+    @metrics.timed("repo.complete_shard")
+    def complete_shard(self, table: str, domain: str, shard: int, worker: str) -> bool:
+        cur = self.session.execute(
+            f"UPDATE {table} SET done = 1, expires_at = 0 WHERE domain = ? AND shard = ? AND owner = ? AND NOT done",
+            (domain, shard, worker),
+        )
+        return cur.rowcount == 1
+
+    @metrics.timed("repo.release_shard")
+    def release_shard(self, table: str, domain: str, shard: int, worker: str) -> None:
+        self.session.execute(
+            f"UPDATE {table} SET owner = NULL, expires_at = 0 WHERE domain = ? AND shard = ? AND owner = ? AND NOT done",
+            (domain, shard, worker),
+        )
+
+    # ---- Shared LLM budget ----
+    @metrics.timed("repo.ensure_budget_table")
+    def ensure_budget_table(self, table: str) -> None:
+        self.session.execute(
+            f"""
+            CREATE TABLE IF NOT EXISTS {table} (
+                domain TEXT PRIMARY KEY,
+                llm_rows INTEGER NOT NULL DEFAULT 0,
+                trainer TEXT,
+                trainer_expires_at REAL NOT NULL DEFAULT 0
+            )
+            """
+        )
+
+    @metrics.timed("repo.init_budget")
+    def init_budget(self, table: str, domain: str, used: int, reset: bool = False) -> None:
+        conflict = (
+            "DO UPDATE SET llm_rows = excluded.llm_rows, trainer = NULL, trainer_expires_at = 0" if reset else "DO NOTHING"
+        )
+        self.session.execute(f"INSERT INTO {table} (domain, llm_rows) VALUES (?, ?) ON CONFLICT (domain) {conflict}", (domain, used))
+
+    @metrics.timed("repo.take_budget")
+    def take_budget(self, table: str, domain: str, n: int, limit: int) -> bool:
+        cur = self.session.execute(
+            f"UPDATE {table} SET llm_rows = llm_rows + ? WHERE domain = ? AND llm_rows < ?", (n, domain, limit)
+        )
+        return cur.rowcount == 1
+
+    @metrics.timed("repo.claim_training")
+    def claim_training(self, table: str, domain: str, worker: str, lease_seconds: float) -> bool:
+        now = time.time()
+        cur = self.session.execute(
+            f"UPDATE {table} SET trainer = ?, trainer_expires_at = ?"
+            " WHERE domain = ? AND (trainer IS NULL OR trainer = ? OR trainer_expires_at < ?)",
+            (worker, now + lease_seconds, domain, worker, now),
+        )
+        return cur.rowcount == 1
+
+    @metrics.timed("repo.release_training")
+    def release_training(self, table: str, domain: str, worker: str) -> None:
+        self.session.execute(
+            f"UPDATE {table} SET trainer = NULL, trainer_expires_at = 0 WHERE domain = ? AND trainer = ?", (domain, worker)
+        )
+
+    # ---- Topic tables ----
+    @metrics.timed("repo.has_topics")
+    def has_topics(self, table: str, min_count: int = 20) -> bool:
+        try:
+            row = self.session.execute(f"SELECT COUNT(*) FROM {table}").fetchone()
+        except sqlite3.OperationalError:
+            return False  # Table does not exist yet
+        return bool(row and row[0] >= min_count)
+
+    @metrics.timed("repo.fetch_topics")
+    def fetch_topics(self, table: str) -> List[Tuple[str, str]]:
+        return [(r[0], r[1]) for r in self.session.execute(f"SELECT topic_name, description FROM {table}")]
+
+    @metrics.timed("repo.write_topics")
+    def write_topics(self, table: str, topics: Dict[str, Dict[str, object]]) -> None:
+        self.session.execute(
+            f"""
+            CREATE TABLE IF NOT EXISTS {table} (
+                topic_name TEXT,
+                description TEXT,
+                example_domains TEXT,
+                example_titles TEXT
+            )
+            """
+        )
+        self.session.executemany(
+            f"INSERT INTO {table} (topic_name, description, example_domains, example_titles) VALUES (?, ?, ?, ?)",
+            [
+                (
+                    topic,
+                    details.get("description"),
+                    json.dumps(details.get("example_domains", [])),
+                    json.dumps(details.get("example_titles", [])),
+                )
+                for topic, details in topics.items()
+            ],
+        )
+
+    # ---- History ----
+    @metrics.timed("repo.count_history_urls")
+    def count_history_urls(self, domain: str) -> int:
+        sql = f"SELECT COUNT(DISTINCT url) FROM {HISTORY_TABLE} WHERE domain = ?"
+        return self.conn.execute(sql, (domain,)).fetchone()[0] or 0
+
+    def fetch_history_by_domain(
+        self, domain: str, limit: Optional[int] = None, shard: Optional[int] = None, n_shards: int = 1
+    ) -> Iterator[HistoryEntry]:
+        sql = f"SELECT title, url FROM {HISTORY_TABLE} WHERE domain = ?"
+        params: Tuple = (domain,)
+        if shard is not None:
+            sql += f" AND {_SHARD_SQL} = ?"
+            params += (n_shards, shard)
+        sql += " ORDER BY id"
+        if limit:
+            sql += " LIMIT ?"
+            params += (limit,)
+        # Own cursor so writes on the session while streaming do not reset it
+        cur = self.conn.cursor()
+        start = time.perf_counter()
+        cur.execute(sql, params)
+        driver_time = time.perf_counter() - start
+        fetched = 0
+        while True:
+            start = time.perf_counter()
+            rows = cur.fetchmany(self.fetch_size)
+            driver_time += time.perf_counter() - start
+            if not rows:
+                break
+            fetched += len(rows)
+            for title, url in rows:
+                yield HistoryEntry(title=title, url=url)
+        metrics.observe("stage_seconds", driver_time, stage="repo.fetch_history_by_domain")
+        metrics.inc("rows_fetched_total", fetched)
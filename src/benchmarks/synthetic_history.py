@@ -0,0 +1,63 @@
+"""
+synthetic_history.py
+
+Deterministic generator of Chrome-history-like rows for one domain. Titles are
+drawn from a fixed set of latent themes so topic discovery has real structure
+to find, and a share of visits are revisits of earlier URLs (as in real history).
+"""
+
+import random
+from datetime import datetime, timedelta
+from typing import Iterator, List, Tuple
+
+THEMES = {
+    "python": ["asyncio", "pandas", "typing", "packaging", "performance", "decorators"],
+    "gaming": ["speedrun", "patch", "review", "builds", "multiplayer", "indie"],
+    "cooking": ["recipe", "sourdough", "knife", "fermentation", "braise", "spices"],
+    "finance": ["etf", "budget", "mortgage", "dividends", "inflation", "savings"],
+    "fitness": ["running", "mobility", "protein", "strength", "marathon", "injury"],
+    "travel": ["itinerary", "hostel", "visa", "backpacking", "japan", "rail"],
+    "music": ["synth", "guitar", "vinyl", "mixing", "jazz", "theory"],
+    "science": ["astronomy", "genetics", "climate", "physics", "telescope", "fusion"],
+    "movies": ["trailer", "director", "streaming", "horror", "soundtrack", "festival"],
+    "career": ["interview", "salary", "resume", "remote", "promotion", "burnout"],
+    "parenting": ["toddler", "sleep", "daycare", "school", "screen", "tantrum"],
+    "diy": ["woodworking", "paint", "plumbing", "drywall", "tools", "garden"],
+}
+NOISE_TITLES = ["", "Home", "Notifications", "Popular", "Log in", "Search results"]
+
+
+def generate_history(
+    n: int,
+    domain: str = "reddit.com",
+    seed: int = 0,
+    revisit_rate: float = 0.15,
+    noise_rate: float = 0.05,
+    start: datetime = datetime(2025, 1, 1),
+) -> Iterator[Tuple[str, str, str, str]]:
+    """Yield `n` (datetime, title, url, domain) rows in chronological order."""
+    rng = random.Random(seed)
+    themes = list(THEMES)
+    ts = start
+    recent: List[Tuple[str, str]] = []
+
+    for i in range(n):
+        # Mostly short gaps (browsing sessions) with occasional long breaks
+        gap = rng.expovariate(1 / 45) if rng.random() < 0.9 else rng.uniform(1_200, 40_000)
+        ts += timedelta(seconds=gap)
+
+        if recent and rng.random() < revisit_rate:
+            title, url = recent[rng.randrange(len(recent))]
+        elif rng.random() < noise_rate:
+            title = rng.choice(NOISE_TITLES)
+            url = f"https://www.{domain}/{rng.choice(['', 'notifications', 'r/popular', 'login'])}?ref={i}"
+        else:
+            theme = rng.choice(themes)
+            a, b = rng.sample(THEMES[theme], 2)
+            title = f"{a.capitalize()} and {b}: {theme} question #{i}"
+            url = f"https://www.{domain}/r/{theme}/comments/{i:x}/{a}_{b}/"
+
+        recent.append((title, url))
+        if len(recent) > 5_000:
+            recent = recent[-2_500:]
+        yield ts.isoformat(sep=" "), title, url, domain
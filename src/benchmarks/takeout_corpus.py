@@ -0,0 +1,183 @@
+"""
+takeout_corpus.py
+
+Format-faithful synthetic Google Takeout exports for parser benchmarks:
+
+- Chrome `Historique.json` ({"Browser History": [...]}, time in microseconds)
+- YouTube `MonActivité.html` (French "Vous avez regardé" layout)
+- Google Analytics `MonActivité.html` (French layout, Google redirect links)
+
+Files are streamed to disk until they reach a target size, so multi-GB inputs
+can be produced with constant memory. Output is deterministic for a given seed.
+
+Usage (from the repository root):
+    python -m src.benchmarks.takeout_corpus --kind chrome --size-mb 100 --out /tmp/Historique.json
+"""
+
+import argparse
+import html
+import json
+import random
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, Iterator
+
+from src.benchmarks.synthetic_history import THEMES
+
+# Takeout (fr) month abbreviations, as they appear in MonActivité.html
+FR_MONTHS = ["janv.", "févr.", "mars", "avr.", "mai", "juin",
+             "juil.", "août", "sept.", "oct.", "nov.", "déc."]
+
+SITES = ["www.reddit.com", "m.facebook.com", "search.brave.com", "www.jeuxvideo.com",
+         "github.com", "stackoverflow.com", "fr.wikipedia.org", "www.lemonde.fr"]
+TRANSITIONS = ["LINK", "TYPED", "AUTO_BOOKMARK", "RELOAD", "GENERATED", "FORM_SUBMIT"]
+QUALIFIERS = ["CLIENT_REDIRECT", "SERVER_REDIRECT", "FORWARD_BACK", "CHAIN_START", "CHAIN_END"]
+
+HTML_HEAD = (
+    '<html><head><meta charset="UTF-8"><title>Mon activité</title>'
+    "<style>.header-cell{}.content-cell{}.outer-cell{}.mdl-grid{}</style></head>"
+    '<body><div class="mdl-grid">'
+)
+HTML_TAIL = "</div></body></html>"
+
+
+def _fr_timestamp(ts: datetime) -> str:
+    """'12 août 2025, 14:03:22 CEST' as written by Takeout (fr)."""
+    # Rough European DST window, enough for realistic CET/CEST mixes
+    tz = "CEST" if 4 <= ts.month <= 10 else "CET"
+    return f"{ts.day} {FR_MONTHS[ts.month - 1]} {ts.year}, {ts:%H:%M:%S} {tz}"
+
+
+def _title(rng: random.Random, i: int) -> str:
+    theme = rng.choice(list(THEMES))
+    a, b = rng.sample(THEMES[theme], 2)
+    return f"{a.capitalize()} & {b} – {theme} #{i}"
+
+
+def _timestamps(rng: random.Random, start: datetime, newest_first: bool) -> Iterator[datetime]:
+    ts = start
+    step = -1 if newest_first else 1
+    while True:
+        ts += timedelta(seconds=step * rng.expovariate(1 / 90))
+        yield ts
+
+
+# ---- Chrome ----
+def chrome_records(seed: int = 0) -> Iterator[str]:
+    rng = random.Random(seed)
+    times = _timestamps(rng, datetime(2025, 10, 1, tzinfo=timezone.utc), newest_first=True)
+    i = 0
+    while True:
+        ts = next(times)
+        site = rng.choice(SITES)
+        record = {
+            "favicon_url": f"https://{site}/favicon.ico",
+            "page_transition": rng.choice(TRANSITIONS),
+            "page_transition_qualifier": rng.choice(QUALIFIERS),
+            "title": _title(rng, i),
+            "url": f"https://{site}/{rng.choice(list(THEMES))}/{i:x}?utm_source=synthetic",
+            "client_id": f"{rng.getrandbits(64):016x}==",
+            "time_usec": int(ts.timestamp() * 1_000_000),
+        }
+        yield "\n".join("        " + line for line in json.dumps(record, ensure_ascii=False, indent=4).splitlines())
+        i += 1
+
+
+# ---- YouTube ----
+def youtube_records(seed: int = 0) -> Iterator[str]:
+    rng = random.Random(seed)
+    times = _timestamps(rng, datetime(2025, 10, 1), newest_first=True)
+    i = 0
+    while True:
+        ts = next(times)
+        title = html.escape(_title(rng, i))
+        if rng.random() < 0.85:
+            video = "".join(rng.choices("ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-_", k=11))
+            channel_id = f"UC{rng.getrandbits(96):024x}"
+            body = (
+                f'Vous avez regardé <a href="https://www.youtube.com/watch?v={video}">{title}</a><br>'
+                f'<a href="https://www.youtube.com/channel/{channel_id}">Chaîne {rng.randrange(500)}</a><br>'
+            )
+        else:
+            body = (
+                f'Vous avez recherché <a href="https://www.youtube.com/results?search_query='
+                f'{title.replace(" ", "+")}">{title}</a><br>'
+            )
+        yield _outer_cell("YouTube", body + f"{_fr_timestamp(ts)}<br>", "YouTube")
+        i += 1
+
+
+# ---- Google Analytics ----
+def google_analytics_records(seed: int = 0) -> Iterator[str]:
+    rng = random.Random(seed)
+    times = _timestamps(rng, datetime(2025, 10, 1), newest_first=True)
+    i = 0
+    while True:
+        ts = next(times)
+        target = f"https://analytics.google.com/analytics/web/#/p{rng.randrange(10**9)}/reports/{rng.choice(['home', 'explorer', 'realtime'])}"
+        usg = "".join(rng.choices("ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789", k=28))
+        body = (
+            f'A consulté <a href="https://www.google.com/url?q={target}&amp;usg=AOvVaw{usg}">{target}</a><br>'
+            f"{_fr_timestamp(ts)}<br>"
+        )
+        yield _outer_cell("Google Analytics", body, "Google Analytics")
+        i += 1
+
+
+def _outer_cell(header: str, body: str, product: str) -> str:
+    return (
+        '<div class="outer-cell mdl-cell mdl-cell--12-col mdl-shadow--2dp"><div class="mdl-grid">'
+        f'<div class="header-cell mdl-cell mdl-cell--12-col"><p class="mdl-typography--title">{header}<br></p></div>'
+        f'<div class="content-cell mdl-cell mdl-cell--6-col mdl-typography--body-1">{body}</div>'
+        '<div class="content-cell mdl-cell mdl-cell--6-col mdl-typography--body-1 mdl-typography--text-right"></div>'
+        '<div class="content-cell mdl-cell mdl-cell--12-col mdl-typography--caption">'
+        f"<b>Produits :</b><br>&emsp;{product}<br>"
+        "<b>Pourquoi cette activité ?</b><br>&emsp;Cette activité a été enregistrée dans votre compte Google, car le paramètre "
+        "suivant était activé&nbsp;:&nbsp;Activité sur le Web et les applications.<br></div>"
+        "</div></div>"
+    )
+
+
+GENERATORS: Dict[str, Callable[[int], Iterator[str]]] = {
+    "chrome": chrome_records,
+    "youtube": youtube_records,
+    "google_analytics": google_analytics_records,
+}
+
+
+def write_corpus(kind: str, path: str, size_mb: float, seed: int = 0) -> int:
+    """Stream records of `kind` to `path` until it reaches `size_mb`; returns the record count."""
+    target = int(size_mb * 1024 * 1024)
+    records = GENERATORS[kind](seed)
+    if kind == "chrome":
+        head, sep, tail = '{\n    "Browser History": [\n', ",\n", "\n    ]\n}\n"
+    else:
+        head, sep, tail = HTML_HEAD, "", HTML_TAIL
+
+    n = 0
+    with open(path, "w", encoding="utf-8", newline="\n") as f:
+        written = f.write(head)
+        for record in records:
+            if n:
+                written += f.write(sep)
+            # Character count is a close-enough proxy for bytes here (mostly ASCII)
+            written += f.write(record)
+            n += 1
+            if written >= target:
+                break
+        f.write(tail)
+    return n
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--kind", choices=sorted(GENERATORS), required=True)
+    parser.add_argument("--size-mb", type=float, required=True)
+    parser.add_argument("--out", required=True)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+    n = write_corpus(args.kind, args.out, args.size_mb, args.seed)
+    print(f"✅ {n} {args.kind} records written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
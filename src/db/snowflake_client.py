@@ -1,71 +1,153 @@
-"""
-snowflake_client.py
-Reusable Snowflake ORM client.
-"""
-
-import os
-from contextlib import contextmanager
-from sqlalchemy import create_engine
-from sqlalchemy.orm import declarative_base, sessionmaker
-from dotenv import load_dotenv
-
-load_dotenv()
-
-Base = declarative_base()
-
-class SnowflakeORM:
-    """
-    Snowflake ORM client using SQLAlchemy.
-    Provides an ACID-compliant interface to interact with Snowflake tables.
-    """
-
-    def __init__(self, user=None, password=None, account=None,
-                 database=None, schema=None, warehouse=None):
-        """
-        Initialize the Snowflake ORM connection.
-        Falls back to environment variables if arguments are not provided.
-        """
-        self.user = user or os.getenv("SNOWFLAKE_USER")
-        self.password = password or os.getenv("SNOWFLAKE_PASSWORD")
-        self.account = account or os.getenv("SNOWFLAKE_ACCOUNT")
-        self.database = database or os.getenv("SNOWFLAKE_DATABASE")
-        self.schema = schema or os.getenv("SNOWFLAKE_SCHEMA")
-        self.warehouse = warehouse or os.getenv("SNOWFLAKE_WAREHOUSE")
-
-        if not all([self.user, self.password, self.account,
-                    self.database, self.schema, self.warehouse]):
-            raise ValueError("Missing required Snowflake connection parameters.")
-
-        connection_string = (
-            f"snowflake://{self.user}:{self.password}"
-            f"@{self.account}/{self.database}/{self.schema}"
-            f"?warehouse={self.warehouse}"
-        )
-
-        self.engine = create_engine(connection_string)
-        self.SessionLocal = sessionmaker(bind=self.engine)
-
-    @contextmanager
-    def session_scope(self):
-        """
-        Provide a transactional scope for database operations.
-        Ensures ACID compliance by committing on success
-        and rolling back on error.
-        """
-        session = self.SessionLocal()
-        try:
-            yield session
-            session.commit()
-        except Exception:
-            session.rollback()
-            raise
-        finally:
-            session.close()
-
-    def create_tables(self):
-        """Create all tables defined in ORM models."""
-        Base.metadata.create_all(self.engine)
-
-    def drop_tables(self):
-        """Drop all tables defined in ORM models."""
-        Base.metadata.drop_all(self.engine)
+"""
+snowflake_client.py
+Reusable Snowflake ORM client.
+"""
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import declarative_base, sessionmaker
+
+from src.topic_modeling.config import load_env
+
+Base = declarative_base()
+
+# ===================
+# Engine registry
+# ===================
+# One engine (and connection pool) per connection string for the whole process,
+# so every SnowflakeORM / repository instance reuses already-authenticated
+# connections instead of paying login + warehouse resume again.
+_ENGINES = {}
+_ENGINES_LOCK = threading.Lock()
+_STATS = {"engines": 0, "connects": 0, "connect_seconds": 0.0, "checkouts": 0}
+_STATS_LOCK = threading.Lock()
+
+
+def _bump(key, value=1):
+    with _STATS_LOCK:
+        _STATS[key] += value
+
+
+def _instrument(engine):
+    """Count physical connections (and their setup time) and pool checkouts."""
+    @event.listens_for(engine, "do_connect")
+    def _before_connect(dialect, conn_rec, cargs, cparams):
+        conn_rec.info["connect_started"] = time.perf_counter()
+
+    @event.listens_for(engine, "connect")
+    def _after_connect(dbapi_connection, conn_rec):
+        started = conn_rec.info.pop("connect_started", None)
+        _bump("connects")
+        if started is not None:
+            _bump("connect_seconds", time.perf_counter() - started)
+
+    @event.listens_for(engine, "checkout")
+    def _on_checkout(dbapi_connection, conn_rec, conn_proxy):
+        _bump("checkouts")
+
+
+def get_engine(connection_string, **kwargs) -> Engine:
+    """
+    Return the process-wide engine for `connection_string`, creating it on first use.
+    Pool defaults keep a couple of warm connections alive between pipeline stages;
+    `kwargs` override them (only applied when the engine is created).
+    """
+    with _ENGINES_LOCK:
+        engine = _ENGINES.get(connection_string)
+        if engine is None:
+            options = {
+                "pool_size": int(os.getenv("SNOWFLAKE_POOL_SIZE", "2")),
+                "max_overflow": int(os.getenv("SNOWFLAKE_POOL_MAX_OVERFLOW", "2")),
+                "pool_recycle": int(os.getenv("SNOWFLAKE_POOL_RECYCLE", "3600")),
+                "pool_pre_ping": True,
+            }
+            if connection_string.startswith("snowflake://"):
+                # Heartbeat so idle pooled sessions are not expired by Snowflake mid-run
+                options["connect_args"] = {"client_session_keep_alive": True}
+            options.update(kwargs)
+            engine = create_engine(connection_string, **options)
+            _instrument(engine)
+            _ENGINES[connection_string] = engine
+            _bump("engines")
+        return engine
+
+
+def connection_stats():
+    """Snapshot of engines created, physical connections opened (and setup time) and pool checkouts."""
+    with _STATS_LOCK:
+        return dict(_STATS)
+
+
+def dispose_engines():
+    """Close every pooled connection and forget the engines (e.g. after fork or at exit)."""
+    with _ENGINES_LOCK:
+        for engine in _ENGINES.values():
+            engine.dispose()
+        _ENGINES.clear()
+
+class SnowflakeORM:
+    """
+    Snowflake ORM client using SQLAlchemy.
+    Provides an ACID-compliant interface to interact with Snowflake tables.
+    """
+
+    def __init__(self, user=None, password=None, account=None,
+                 database=None, schema=None, warehouse=None):
+        """
+        Initialize the Snowflake ORM connection.
+        Falls back to environment variables if arguments are not provided.
+        """
+        load_env()
+        self.user = user or os.getenv("SNOWFLAKE_USER")
+        self.password = password or os.getenv("SNOWFLAKE_PASSWORD")
+        self.account = account or os.getenv("SNOWFLAKE_ACCOUNT")
+        self.database = database or os.getenv("SNOWFLAKE_DATABASE")
+        self.schema = schema or os.getenv("SNOWFLAKE_SCHEMA")
+        self.warehouse = warehouse or os.getenv("SNOWFLAKE_WAREHOUSE")
+
+        if not all([self.user, self.password, self.account,
+                    self.database, self.schema, self.warehouse]):
+            raise ValueError("Missing required Snowflake connection parameters.")
+
+        connection_string = (
+            f"snowflake://{self.user}:{self.password}"
+            f"@{self.account}/{self.database}/{self.schema}"
+            f"?warehouse={self.warehouse}"
+        )
+
+        self.engine = get_engine(connection_string)
+        self.SessionLocal = sessionmaker(bind=self.engine)
+
+    @contextmanager
+    def session_scope(self, session=None):
+        """
+        Provide a transactional scope for database operations.
+        Ensures ACID compliance by committing on success
+        and rolling back on error.
+        If an active `session` is given it is used as-is: the caller owns
+        its transaction, so nothing is committed or closed here.
+        """
+        if session is not None:
+            yield session
+            return
+        session = self.SessionLocal()
+        try:
+            yield session
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+
+    def create_tables(self):
+        """Create all tables defined in ORM models."""
+        Base.metadata.create_all(self.engine)
+
+    def drop_tables(self):
+        """Drop all tables defined in ORM models."""
+        Base.metadata.drop_all(self.engine)
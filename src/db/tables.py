@@ -1,29 +1,51 @@
-from dotenv import load_dotenv
-import os
-from sqlalchemy import Column, Integer, String, TIMESTAMP, JSON
-from src.db.snowflake_client import Base
-
-load_dotenv()
-
-class ChromeHistory(Base):
-    """chrome_history mapping for Snowflake."""
-    __tablename__ = os.getenv("SNOWFLAKE_TAKEOUT_EXPORT_TABLE_NAME", "")
-
-    id = Column(Integer, primary_key=True)
-    datetime = Column(TIMESTAMP)
-    title = Column(String)
-    url = Column(String)
-    page_transition_qualifier = Column(String)
-    favicon_url = Column(String)
-    client_id = Column(String)
-    domain = Column(String)
-    time_since_last_visit = Column(String)
-
-class DiscoveredTopics(Base):
-    """Topics output by gemini2.5."""
-    __tablename__ = "DISCOVERED_TOPICS_IN_HISTORY"
-
-    description = Column(String, primary_key=True)
-    example_domains = Column(JSON)
-    example_titles = Column(JSON)
-    topic_name = Column(String, primary_key=True)
+import os
+from sqlalchemy import Column, Float, Integer, String, TIMESTAMP, JSON
+from src.db.snowflake_client import Base
+from src.topic_modeling.config import load_env
+
+# Table names below are read from the environment at import
+load_env()
+
+class ChromeHistory(Base):
+    """chrome_history mapping for Snowflake."""
+    __tablename__ = os.getenv("SNOWFLAKE_TAKEOUT_EXPORT_TABLE_NAME", "")
+
+    id = Column(Integer, primary_key=True)
+    datetime = Column(TIMESTAMP)
+    title = Column(String)
+    url = Column(String)
+    page_transition_qualifier = Column(String)
+    favicon_url = Column(String)
+    client_id = Column(String)
+    domain = Column(String)
+    time_since_last_visit = Column(String)
+
+    # Ingest-time enrichment (src/parsers/enrich_history.py)
+    seconds_since_last_visit = Column(Float)
+    minutes_since_last_visit = Column(Float)
+    seconds_until_next_visit = Column(Float)
+    seconds_since_last_visit_categories = Column(String)
+    attention_span = Column(String)
+    session_id_5_min = Column(Integer)
+    session_id_20_min = Column(Integer)
+    day_of_week = Column(Integer)
+    hour_of_day = Column(Integer)
+    time_of_day = Column(String)
+    path_level_1 = Column(String)
+    path_level_2 = Column(String)
+    path_level_3 = Column(String)
+    path_level_4 = Column(String)
+    path_level_5 = Column(String)
+    path_level_6 = Column(String)
+    domain_depth_1 = Column(String)
+    domain_depth_2 = Column(String)
+    domain_depth_3 = Column(String)
+
+class DiscoveredTopics(Base):
+    """Topics output by gemini2.5."""
+    __tablename__ = "DISCOVERED_TOPICS_IN_HISTORY"
+
+    description = Column(String, primary_key=True)
+    example_domains = Column(JSON)
+    example_titles = Column(JSON)
+    topic_name = Column(String, primary_key=True)
@@ -0,0 +1,285 @@
+"""
+enrich_history.py
+
+Ingest-time enrichment of parsed Chrome history, replacing the window and URL
+functions the dbt staging models used to recompute over the whole table:
+
+- sessions: seconds/minutes since last visit, seconds until next visit,
+  5/20-minute session ids, gap categories and attention span (stg_sessions)
+- time: day of week, hour of day, time of day (stg_time_enrichment)
+- URL: domain, path levels and progressive domain depths (stg_url_parts)
+
+Rows are processed in chronologically sorted chunks with NumPy operations.
+State (last timestamp, session counters, the row still waiting for its
+successor) is carried across chunks and, through a JSON state file, across
+delta loads, so results match a full recompute.
+
+Semantics follow Snowflake: DATEDIFF counts unit boundaries crossed,
+DAYOFWEEK is 0 for Sunday, PARSE_URL paths have no leading slash, the host
+keeps its case and a URL without a path has NULL path levels (and NULL
+domain_depth_2/3, as the SQL concatenation did). `domain` is the lower-case
+host without "www.", the key the topic pipeline filters on.
+
+Usage (from the repository root):
+    python -m src.parsers.enrich_history chrome_history_parsed.csv chrome_history_enriched.csv
+    python -m src.parsers.enrich_history delta.csv delta_enriched.csv --state data/enrich_state.json
+"""
+
+import argparse
+import json
+import os
+from dataclasses import asdict, dataclass, field
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+import numpy as np
+import pandas as pd
+
+SESSION_GAPS_MINUTES = (5, 20)
+PATH_LEVELS = 5  # path_level_2 .. path_level_6
+
+SESSION_COLUMNS = [
+    "seconds_since_last_visit",
+    "minutes_since_last_visit",
+    "seconds_until_next_visit",
+    "seconds_since_last_visit_categories",
+    "attention_span",
+    "session_id_5_min",
+    "session_id_20_min",
+    "time_since_last_visit",
+]
+TIME_COLUMNS = ["day_of_week", "hour_of_day", "time_of_day"]
+URL_COLUMNS = (
+    ["domain"]
+    + [f"path_level_{i}" for i in range(1, PATH_LEVELS + 2)]
+    + [f"domain_depth_{i}" for i in range(1, 4)]
+)
+ENRICHED_COLUMNS = SESSION_COLUMNS + TIME_COLUMNS + URL_COLUMNS
+
+_GAP_CATEGORIES = (
+    (15, "<15 seconds"),
+    (60, "15-60 seconds"),
+    (180, "1 min to 3 min"),
+)
+_TIME_OF_DAY = np.array(
+    ["Night"] * 7 + ["Morning"] * 5 + ["Lunch"] * 3 + ["Afternoon"] * 4 + ["Evening"] * 5, dtype=object
+)
+
+
+@dataclass
+class EnrichmentState:
+    """Everything needed to continue enrichment where the previous chunk stopped.
+
+    `pending` is the last raw row seen, not yet emitted because its
+    seconds_until_next_visit needs its successor. `prev_epoch` and
+    `session_ids` describe the history *before* that row.
+    """
+
+    prev_epoch: Optional[int] = None
+    session_ids: Dict[str, int] = field(default_factory=lambda: {str(g): 0 for g in SESSION_GAPS_MINUTES})
+    pending: Optional[Dict[str, object]] = None
+
+    def save(self, path: str) -> None:
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(asdict(self), f, default=str)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str) -> "EnrichmentState":
+        if not os.path.exists(path):
+            return cls()
+        with open(path, encoding="utf-8") as f:
+            return cls(**json.load(f))
+
+
+class HistoryEnricher:
+    """Incremental enricher over chronologically sorted chunks.
+
+    `enrich(chunk)` returns the rows it can finalize with the enrichment
+    columns added: the previously held-back row plus the chunk, minus the
+    chunk's last row, which is held back until its successor is known.
+    `flush()` releases that row (with no next visit) at the very end of the
+    data; for delta loads, save `state` instead so the next delta releases it.
+    """
+
+    def __init__(self, state: Optional[EnrichmentState] = None, datetime_col: str = "datetime"):
+        self.state = state or EnrichmentState()
+        self.datetime_col = datetime_col
+
+    def enrich(self, chunk: pd.DataFrame) -> pd.DataFrame:
+        if chunk.empty:
+            return chunk.iloc[0:0]
+        df = chunk
+        if self.state.pending is not None:
+            df = pd.concat([pd.DataFrame([self.state.pending]), chunk], ignore_index=True)
+        out, epoch = self._enrich_frame(df)
+
+        # Hold back the last row and move the state to just before it
+        n = len(out)
+        self.state.pending = {c: _jsonable(v) for c, v in df.iloc[-1].items()}
+        if n > 1:
+            self.state.prev_epoch = int(epoch[-2])
+            for gap in SESSION_GAPS_MINUTES:
+                self.state.session_ids[str(gap)] = int(out[f"session_id_{gap}_min"].iloc[-2])
+        return out.iloc[:-1].reset_index(drop=True)
+
+    def flush(self) -> pd.DataFrame:
+        """Emit the held-back last row; call once when no more history will follow."""
+        if self.state.pending is None:
+            return pd.DataFrame(columns=ENRICHED_COLUMNS)
+        out, epoch = self._enrich_frame(pd.DataFrame([self.state.pending]))
+        self.state.prev_epoch = int(epoch[-1])
+        for gap in SESSION_GAPS_MINUTES:
+            self.state.session_ids[str(gap)] = int(out[f"session_id_{gap}_min"].iloc[-1])
+        self.state.pending = None
+        return out
+
+    def _enrich_frame(self, df: pd.DataFrame) -> Tuple[pd.DataFrame, np.ndarray]:
+        out = df.copy()
+        out[self.datetime_col] = pd.to_datetime(out[self.datetime_col])
+        epoch = out[self.datetime_col].to_numpy(dtype="datetime64[s]").astype(np.int64)
+        prev_epoch = self.state.prev_epoch
+        if np.any(np.diff(epoch) < 0) or (prev_epoch is not None and epoch[0] < prev_epoch):
+            raise ValueError("History chunks must be sorted by datetime and newer than the carried state")
+        out = self._sessions(out, epoch)
+        out = _time_parts(out, self.datetime_col)
+        return _url_parts(out), epoch
+
+    # ---- Sessions ----
+    def _sessions(self, df: pd.DataFrame, epoch: np.ndarray) -> pd.DataFrame:
+        n = len(epoch)
+        prev = np.empty(n, dtype=np.float64)
+        prev[1:] = epoch[:-1]
+        prev[0] = np.nan if self.state.prev_epoch is None else self.state.prev_epoch
+
+        since = epoch - prev
+        # DATEDIFF(minute, ...) counts minute boundaries crossed, not elapsed minutes
+        minutes = np.floor(epoch / 60) - np.floor(prev / 60)
+        until = np.empty(n, dtype=np.float64)
+        until[:-1] = np.diff(epoch)
+        until[-1] = np.nan  # known once the next row arrives
+
+        df["seconds_since_last_visit"] = since
+        df["minutes_since_last_visit"] = minutes
+        df["seconds_until_next_visit"] = until
+        df["seconds_since_last_visit_categories"] = _gap_category(since)
+        df["attention_span"] = np.select(
+            [since <= 60, since <= 12000], ["Quick Switching", "Sustained Engagement"], "Session Break"
+        )
+        for gap in SESSION_GAPS_MINUTES:
+            new_session = (minutes >= gap) | np.isnan(prev)
+            df[f"session_id_{gap}_min"] = self.state.session_ids[str(gap)] + np.cumsum(new_session)
+        df["time_since_last_visit"] = np.where(np.isnan(since), "", np.nan_to_num(since).astype(np.int64).astype(str))
+        return df
+
+
+def _gap_category(since: np.ndarray) -> np.ndarray:
+    # NULL gaps (first visit) fall through to '>20 min' like the SQL CASE
+    conditions = [since <= bound for bound, _ in _GAP_CATEGORIES] + [since < 12000]
+    labels = [label for _, label in _GAP_CATEGORIES] + ["3 min to 20 min"]
+    return np.select(conditions, labels, ">20 min")
+
+
+# ---- Time ----
+def _time_parts(df: pd.DataFrame, datetime_col: str) -> pd.DataFrame:
+    ts = df[datetime_col].dt
+    hours = ts.hour.to_numpy()
+    df["day_of_week"] = (ts.dayofweek.to_numpy() + 1) % 7  # Snowflake: Sunday = 0
+    df["hour_of_day"] = hours
+    df["time_of_day"] = _TIME_OF_DAY[hours]
+    return df
+
+
+# ---- URL ----
+@lru_cache(maxsize=1 << 16)
+def _host_to_domain(host: str) -> str:
+    return host[4:] if host.startswith("www.") else host
+
+
+def _host(netloc: str) -> str:
+    """Host of a netloc as PARSE_URL returns it: case kept, without userinfo and port."""
+    host = netloc.rpartition("@")[2]
+    if host.startswith("["):  # IPv6 literal
+        return host[: host.find("]") + 1] if "]" in host else host
+    return host.partition(":")[0]
+
+
+@lru_cache(maxsize=1 << 18)
+def _split_url(url: str) -> Tuple[Optional[str], ...]:
+    parts = urlsplit(url or "")
+    host = _host(parts.netloc)
+    domain = _host_to_domain(host.lower())
+    if not parts.path:
+        # PARSE_URL gives a NULL path, and SPLIT_PART / || propagate it
+        return (domain, host, *[None] * PATH_LEVELS, host, None, None)
+    segments = parts.path.lstrip("/").split("/")
+    levels = [segments[i] if i < len(segments) else "" for i in range(PATH_LEVELS)]
+    return (
+        domain,
+        host,
+        *levels,
+        host,
+        f"{host}/{levels[0]}",
+        f"{host}/{levels[0]}/{levels[1]}",
+    )
+
+
+def _url_parts(df: pd.DataFrame) -> pd.DataFrame:
+    # Parse each distinct URL once, then broadcast back with the inverse index
+    codes, uniques = pd.factorize(df["url"].fillna(""))
+    table = np.array([_split_url(u) for u in uniques], dtype=object).reshape(len(uniques), len(URL_COLUMNS))
+    rows = table[codes]
+    for i, col in enumerate(URL_COLUMNS):
+        df[col] = rows[:, i]
+    return df
+
+
+def _jsonable(value):
+    if isinstance(value, (pd.Timestamp, np.datetime64)):
+        return str(pd.Timestamp(value))
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, float) and np.isnan(value):
+        return None
+    return value
+
+
+def enrich_csv(input_csv: str, output_csv: str, state_path: Optional[str] = None, chunksize: int = 200_000) -> int:
+    """Enrich a parsed (sorted) history CSV chunk by chunk; returns rows written.
+
+    With `state_path`, state is loaded before and saved after, and the last row
+    is carried to the next delta instead of being flushed.
+    """
+    state = EnrichmentState.load(state_path) if state_path else EnrichmentState()
+    enricher = HistoryEnricher(state)
+    written = 0
+    header = True
+    for chunk in pd.read_csv(input_csv, chunksize=chunksize, keep_default_na=False, na_values=[""]):
+        out = enricher.enrich(chunk)
+        out.to_csv(output_csv, mode="w" if header else "a", header=header, index=False)
+        header = False
+        written += len(out)
+    if not state_path:
+        out = enricher.flush()
+        out.to_csv(output_csv, mode="w" if header else "a", header=header, index=False)
+        written += len(out)
+    else:
+        enricher.state.save(state_path)
+    return written
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Add session, time and URL features to parsed Chrome history.")
+    parser.add_argument("input_csv")
+    parser.add_argument("output_csv")
+    parser.add_argument("--state", help="JSON state file carried across delta loads")
+    parser.add_argument("--chunksize", type=int, default=200_000)
+    args = parser.parse_args(argv)
+    rows = enrich_csv(args.input_csv, args.output_csv, args.state, args.chunksize)
+    print(f"✅ {rows} enriched rows written to {args.output_csv}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,28 +1,40 @@
-import json
-import pandas as pd
-from datetime import datetime
-
-# Load JSON file
-with open('data/raw_data/Historique.json', 'r') as file:
-    data = json.load(file)
-
-# Extract browser history
-history = data.get("Browser History", [])
-
-# Convert time_usec to human-readable datetime
-def convert_time_usec(usec):
-    # time_usec is in microseconds since epoch
-    return datetime.utcfromtimestamp(usec / 1e6)
-
-# Create DataFrame
-df = pd.DataFrame(history)
-
-df['datetime'] = df['time_usec'].apply(convert_time_usec)
-
-columns = ['datetime', 'title', 'url', 'page_transition_qualifier', 'favicon_url', 'client_id']
-df = df[columns]
-
-# Save to CSV
-df.to_csv('chrome_history_parsed.csv', index=False)
-
-print("✅ Chrome history exported to chrome_history_parsed.csv")
+import json
+import pandas as pd
+from datetime import datetime
+
+from src.parsers.enrich_history import HistoryEnricher
+
+# Convert time_usec to human-readable datetime
+def convert_time_usec(usec):
+    # time_usec is in microseconds since epoch
+    return datetime.utcfromtimestamp(usec / 1e6)
+
+def parse_chrome_history(json_file, csv_file, enrich=True):
+    # Load JSON file
+    with open(json_file, 'r') as file:
+        data = json.load(file)
+
+    # Extract browser history
+    history = data.get("Browser History", [])
+
+    # Create DataFrame
+    df = pd.DataFrame(history)
+
+    df['datetime'] = df['time_usec'].apply(convert_time_usec)
+
+    columns = ['datetime', 'title', 'url', 'page_transition_qualifier', 'favicon_url', 'client_id']
+    df = df[columns]
+
+    # Takeout lists newest first; enrichment needs chronological order
+    if enrich:
+        df = df.sort_values('datetime', kind='stable', ignore_index=True)
+        enricher = HistoryEnricher()
+        df = pd.concat([enricher.enrich(df), enricher.flush()], ignore_index=True)
+
+    # Save to CSV
+    df.to_csv(csv_file, index=False)
+    return len(df)
+
+if __name__ == "__main__":
+    parse_chrome_history('data/raw_data/Historique.json', 'chrome_history_parsed.csv')
+    print("✅ Chrome history exported to chrome_history_parsed.csv")
@@ -0,0 +1,336 @@
+"""
+classifier_artifact.py
+
+Versioned, memory-mapped format for the local topic classifier
+(TF-IDF + one-vs-rest logistic regression trained in pipeline.py).
+
+`MODEL_PATH` is a directory of artifact versions plus a `CURRENT` file naming
+the live one. A save writes a new version directory, then swaps `CURRENT`
+with `os.replace`, so concurrent readers and writers (e.g. several workers on
+a shared volume) always see a complete artifact; superseded versions are
+deleted once older than `PRUNE_AFTER_SECONDS`. Each version holds plain arrays plus a manifest:
+
+- manifest.json   – format/version, vectorizer settings, labels, threshold
+- vocab.npy       – sorted UTF-8 vocabulary (fixed-width bytes), looked up with searchsorted
+- idf.npy         – idf weight per feature, in vocabulary order
+- coef.npy        – stacked coefficients, shape (n_features, n_labels)
+- intercept.npy   – intercept per label
+- constant.npy    – fixed score for labels seen with a single class at training
+                    time (NaN for regular labels)
+
+Arrays are opened with `np.load(mmap_mode="r")`, so loading costs a few page
+mappings and every worker process shares one copy of the pages. Inference
+needs NumPy only; sklearn/joblib are required to train or convert.
+
+Usage (from the repository root):
+    python -m src.topic_modeling.classifier_artifact convert topic_classifier.joblib
+    python -m src.topic_modeling.classifier_artifact verify topic_classifier.joblib --titles titles.txt
+"""
+
+import argparse
+import json
+import os
+import random
+import re
+import shutil
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+FORMAT_NAME = "topic-classifier"
+FORMAT_VERSION = 1
+ARRAYS = ("vocab", "idf", "coef", "intercept", "constant")
+CURRENT = "CURRENT"
+# Minimum age before a non-live version is deleted, so a concurrent save between
+# its directory rename and its CURRENT swap never loses its version
+PRUNE_AFTER_SECONDS = 60
+
+
+def artifact_path(model_path: str) -> str:
+    """Artifact directory for `MODEL_PATH` (a legacy `x.joblib` maps to `x`)."""
+    root, ext = os.path.splitext(model_path)
+    return root if ext == ".joblib" else model_path
+
+
+def legacy_path(model_path: str) -> str:
+    """Path of the joblib file older versions wrote for the same `MODEL_PATH`."""
+    return artifact_path(model_path) + ".joblib"
+
+
+def current_version(path: str) -> Optional[str]:
+    """Directory of the live version of the artifact at `path`; None if nothing was saved yet.
+
+    Artifacts written before versioning (manifest directly in `path`) resolve to `path` itself.
+    """
+    try:
+        with open(os.path.join(path, CURRENT), encoding="utf-8") as f:
+            return os.path.join(path, f.read().strip())
+    except FileNotFoundError:
+        return path if os.path.exists(os.path.join(path, "manifest.json")) else None
+
+
+def artifact_exists(path: str) -> bool:
+    return current_version(path) is not None
+
+
+class ClassifierArtifact:
+    """Memory-mapped classifier; `predict` reproduces the sklearn pipeline it was built from."""
+
+    def __init__(self, path: str, manifest: Dict[str, object], arrays: Dict[str, np.ndarray]):
+        self.path = path
+        self.manifest = manifest
+        self.vocab = arrays["vocab"]
+        self.idf = arrays["idf"]
+        self.coef = arrays["coef"]
+        self.intercept = arrays["intercept"]
+        self.constant = arrays["constant"]
+        self.labels = np.array(manifest["labels"], dtype=object)
+        self.threshold = float(manifest["threshold"])
+        self._token_re = re.compile(manifest["token_pattern"])
+        self._min_n, self._max_n = manifest["ngram_range"]
+        self._constant_mask = ~np.isnan(self.constant)
+
+    @classmethod
+    def load(cls, path: str) -> "ClassifierArtifact":
+        version = current_version(path)
+        if version is None:
+            raise FileNotFoundError(f"No classifier artifact in {path}")
+        try:
+            return cls._load_version(version)
+        except FileNotFoundError:
+            # Pruned between reading CURRENT and opening it (superseded meanwhile): resolve again
+            return cls._load_version(current_version(path))
+
+    @classmethod
+    def _load_version(cls, path: str) -> "ClassifierArtifact":
+        with open(os.path.join(path, "manifest.json"), encoding="utf-8") as f:
+            manifest = json.load(f)
+        if manifest.get("format") != FORMAT_NAME or manifest.get("version") != FORMAT_VERSION:
+            raise ValueError(
+                f"Unsupported classifier artifact {path}: "
+                f"{manifest.get('format')} v{manifest.get('version')} (expected {FORMAT_NAME} v{FORMAT_VERSION})"
+            )
+        arrays = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r") for name in ARRAYS}
+        return cls(path, manifest, arrays)
+
+    # ---- Vectorizer ----
+    def _terms(self, text: str) -> List[str]:
+        """Word n-grams exactly as TfidfVectorizer's default word analyzer builds them."""
+        if self.manifest["lowercase"]:
+            text = text.lower()
+        tokens = self._token_re.findall(text)
+        if self._max_n == 1:
+            return tokens
+        terms = list(tokens) if self._min_n == 1 else []
+        for n in range(max(self._min_n, 2), self._max_n + 1):
+            terms.extend(" ".join(tokens[i : i + n]) for i in range(len(tokens) - n + 1))
+        return terms
+
+    def _features(self, titles: Sequence[str]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Sparse TF-IDF rows as (row, column, value) triplets sorted by row."""
+        width = self.vocab.dtype.itemsize
+        rows: List[int] = []
+        encoded: List[bytes] = []
+        for i, title in enumerate(titles):
+            for term in self._terms(title or ""):
+                b = term.encode("utf-8")
+                if len(b) <= width:  # longer terms cannot be in the vocabulary
+                    rows.append(i)
+                    encoded.append(b)
+        if not encoded:
+            empty = np.empty(0, dtype=np.int64)
+            return empty, empty, np.empty(0, dtype=np.float64)
+
+        terms = np.array(encoded, dtype=self.vocab.dtype)
+        cols = np.searchsorted(self.vocab, terms)
+        found = cols < len(self.vocab)
+        found[found] = self.vocab[cols[found]] == terms[found]
+        row_arr = np.asarray(rows, dtype=np.int64)[found]
+        cols = cols[found]
+
+        # Term counts per (row, column)
+        n_features = len(self.vocab)
+        keys, tf = np.unique(row_arr * n_features + cols, return_counts=True)
+        row_arr, cols = keys // n_features, keys % n_features
+        values = tf.astype(np.float64)
+        if self.manifest["binary"]:
+            values[:] = 1.0
+        elif self.manifest["sublinear_tf"]:
+            values = np.log(values) + 1.0
+        if self.manifest["use_idf"]:
+            values *= self.idf[cols]
+
+        norm = self.manifest["norm"]
+        if norm:
+            per_row = np.abs(values) if norm == "l1" else values * values
+            totals = np.bincount(row_arr, weights=per_row, minlength=len(titles))
+            if norm == "l2":
+                totals = np.sqrt(totals)
+            totals[totals == 0.0] = 1.0
+            values /= totals[row_arr]
+        return row_arr, cols, values
+
+    # ---- Inference ----
+    def decision_function(self, titles: Sequence[str]) -> np.ndarray:
+        """Per-label scores, shape (len(titles), n_labels)."""
+        rows, cols, values = self._features(titles)
+        scores = np.tile(np.asarray(self.intercept, dtype=np.float64), (len(titles), 1))
+        if len(rows):
+            contrib = self.coef[cols] * values[:, None]
+            starts = np.flatnonzero(np.r_[True, rows[1:] != rows[:-1]])
+            scores[rows[starts]] += np.add.reduceat(contrib, starts, axis=0)
+        scores[:, self._constant_mask] = self.constant[self._constant_mask]
+        return scores
+
+    def predict(self, titles: Sequence[str]) -> List[List[str]]:
+        """Topic names per title, in label order (as `MultiLabelBinarizer.inverse_transform`)."""
+        if not len(titles):
+            return []
+        hits = self.decision_function(titles) > self.threshold
+        return [list(self.labels[row]) for row in hits]
+
+
+# ===================
+# Building artifacts
+# ===================
+
+def save_artifact(clf, mlb, path: str) -> str:
+    """Write a fitted TF-IDF + OneVsRest(LogisticRegression) pipeline and its binarizer to `path`."""
+    from sklearn.multiclass import _threshold_for_binary_predict
+
+    tfidf, ovr = clf.steps[0][1], clf.steps[-1][1]
+    unsupported = {
+        "analyzer": tfidf.analyzer != "word",
+        "tokenizer": tfidf.tokenizer is not None,
+        "preprocessor": tfidf.preprocessor is not None,
+        "stop_words": tfidf.stop_words is not None,
+        "strip_accents": tfidf.strip_accents is not None,
+        "multilabel": ovr.label_binarizer_.y_type_ != "multilabel-indicator",
+    }
+    if any(unsupported.values()):
+        bad = ", ".join(k for k, v in unsupported.items() if v)
+        raise ValueError(f"Classifier cannot be converted to an artifact (unsupported: {bad})")
+
+    # Reorder features by their UTF-8 bytes so the vocabulary can be binary-searched
+    terms = sorted(tfidf.vocabulary_.items(), key=lambda kv: kv[0].encode("utf-8"))
+    order = np.array([col for _, col in terms], dtype=np.int64)
+    vocab = np.array([t.encode("utf-8") for t, _ in terms], dtype=bytes)
+
+    n_labels = len(ovr.estimators_)
+    coef = np.zeros((len(order), n_labels), dtype=np.float64)
+    intercept = np.zeros(n_labels, dtype=np.float64)
+    constant = np.full(n_labels, np.nan, dtype=np.float64)
+    for j, est in enumerate(ovr.estimators_):
+        if hasattr(est, "coef_"):
+            coef[:, j] = np.ravel(est.coef_)[order]
+            intercept[j] = np.ravel(est.intercept_)[0]
+        else:  # _ConstantPredictor: label had a single class in the training data
+            constant[j] = float(np.ravel(est.y_)[0])
+
+    idf = tfidf.idf_[order] if tfidf.use_idf else np.ones(len(order), dtype=np.float64)
+    manifest = {
+        "format": FORMAT_NAME,
+        "version": FORMAT_VERSION,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "n_features": len(order),
+        "labels": [str(label) for label in mlb.classes_],
+        "threshold": float(_threshold_for_binary_predict(ovr.estimators_[0])),
+        "lowercase": bool(tfidf.lowercase),
+        "token_pattern": tfidf.token_pattern,
+        "ngram_range": list(tfidf.ngram_range),
+        "binary": bool(tfidf.binary),
+        "sublinear_tf": bool(tfidf.sublinear_tf),
+        "use_idf": bool(tfidf.use_idf),
+        "norm": tfidf.norm,
+    }
+
+    # Write a new version directory, then swap the CURRENT pointer: readers never see a
+    # half-written or half-deleted artifact, and concurrent saves cannot collide
+    os.makedirs(path, exist_ok=True)
+    version = f"v{time.time_ns()}-{os.getpid()}"
+    tmp = os.path.join(path, f".{version}.tmp")
+    os.makedirs(tmp)
+    for name, arr in zip(ARRAYS, (vocab, idf, coef, intercept, constant)):
+        np.save(os.path.join(tmp, f"{name}.npy"), np.ascontiguousarray(arr))
+    with open(os.path.join(tmp, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.rename(tmp, os.path.join(path, version))
+    pointer = os.path.join(path, f".{CURRENT}.tmp-{os.getpid()}")
+    with open(pointer, "w", encoding="utf-8") as f:
+        f.write(version)
+    os.replace(pointer, os.path.join(path, CURRENT))
+    _prune_versions(path)
+    return path
+
+
+def _prune_versions(path: str) -> None:
+    """Delete superseded versions older than `PRUNE_AFTER_SECONDS`.
+
+    Readers that already mapped a deleted version keep working (the mapping
+    holds the pages); one that resolved it but had not opened it yet re-resolves.
+    """
+    live = os.path.basename(current_version(path) or "")
+    cutoff = time.time_ns() - PRUNE_AFTER_SECONDS * 1_000_000_000
+    for d in os.listdir(path):
+        if d == live or not d.startswith("v") or not os.path.isdir(os.path.join(path, d)):
+            continue
+        if int(d[1:].split("-")[0]) < cutoff:
+            shutil.rmtree(os.path.join(path, d), ignore_errors=True)
+
+
+def convert_joblib(joblib_path: str, path: Optional[str] = None) -> str:
+    """Convert a `(Pipeline, MultiLabelBinarizer)` joblib file into an artifact directory."""
+    import joblib
+
+    clf, mlb = joblib.load(joblib_path)
+    return save_artifact(clf, mlb, path or artifact_path(joblib_path))
+
+
+def probe_titles(artifact: ClassifierArtifact, n: int = 2000, seed: int = 0) -> List[str]:
+    """Pseudo-titles mixing vocabulary terms with unknown words, for `verify_artifact`."""
+    rng = random.Random(seed)
+    vocab = [v.decode("utf-8") for v in artifact.vocab[: min(len(artifact.vocab), 50_000)]]
+    titles = []
+    for _ in range(n):
+        words = rng.choices(vocab, k=rng.randint(1, 6)) + rng.choices(["zzz", "Lorem", "42"], k=rng.randint(0, 2))
+        rng.shuffle(words)
+        titles.append(" ".join(words).title() if rng.random() < 0.5 else " ".join(words))
+    return titles + ["", "   "]
+
+
+def verify_artifact(joblib_path: str, path: Optional[str] = None, titles: Optional[Sequence[str]] = None) -> int:
+    """Count titles whose artifact predictions differ from the original joblib model."""
+    import joblib
+
+    clf, mlb = joblib.load(joblib_path)
+    artifact = ClassifierArtifact.load(path or artifact_path(joblib_path))
+    titles = list(titles) if titles is not None else probe_titles(artifact)
+    expected = [list(t) for t in mlb.inverse_transform(clf.predict(titles))]
+    return sum(1 for a, b in zip(expected, artifact.predict(titles)) if a != b)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Convert and verify memory-mapped classifier artifacts.")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    for name, help_text in (("convert", "Convert a .joblib classifier (and verify it)"),
+                            ("verify", "Compare artifact predictions with the .joblib classifier")):
+        p = sub.add_parser(name, help=help_text)
+        p.add_argument("joblib_path")
+        p.add_argument("--out", help="Artifact directory (default: joblib path without extension)")
+        p.add_argument("--titles", help="File with one title per line (default: generated probes)")
+    args = parser.parse_args(argv)
+
+    if args.cmd == "convert":
+        print(f"✅ Artifact written to {convert_joblib(args.joblib_path, args.out)}")
+    titles = None
+    if args.titles:
+        with open(args.titles, encoding="utf-8") as f:
+            titles = [line.rstrip("\n") for line in f]
+    mismatches = verify_artifact(args.joblib_path, args.out, titles)
+    print(("✅" if not mismatches else "❌") + f" {mismatches} prediction mismatch(es)")
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,30 +1,79 @@
-import os
-from dataclasses import dataclass
-from typing import List
-
-from dotenv import load_dotenv
-
-load_dotenv()
-
-@dataclass(frozen=True)
-class AppConfig:
-    # table suffixes
-    DISCOVERED_TOPICS_SUFFIX: str = os.getenv("DISCOVERED_TOPICS_SUFFIX", "DISCOVERED_TOPICS_IN_HISTORY")
-    REFINED_TOPICS_SUFFIX: str = os.getenv("REFINED_TOPICS_SUFFIX", "REFINED_TOPICS")
-    CLASSIFICATION_SUFFIX: str = os.getenv("CLASSIFICATION_SUFFIX", "CLASSIFICATION_HISTORY_TABLE")
-
-    # batching
-    DISCOVERY_BATCH: int = int(os.getenv("DISCOVERY_BATCH", "1000"))
-    CLASSIFY_BATCH: int = int(os.getenv("CLASSIFY_BATCH", "20"))
-    INSERT_BATCH: int = int(os.getenv("INSERT_BATCH", "10")) # interesting to modify if difficulties with api timeout
-    LLM_LIMIT: int = int(os.getenv("LLM_LIMIT", "10000"))
-
-    # model persistence
-    MODEL_PATH: str = os.getenv("MODEL_PATH", "topic_classifier.joblib")
-
-    # miscellaneous
-    SCROLLING_URLS: str = os.getenv("SCROLLING_URLS", "")
-
-    @property
-    def scrolling_list(self) -> List[str]:
-        return [u.strip() for u in self.SCROLLING_URLS.split(",") if u.strip()]
+import logging
+import os
+from dataclasses import dataclass
+from typing import List
+
+from dotenv import load_dotenv
+
+_ENV_LOADED = False
+
+
+def load_env() -> None:
+    """Load `.env` into the environment once per process; later calls are no-ops."""
+    global _ENV_LOADED
+    if not _ENV_LOADED:
+        load_dotenv()
+        _ENV_LOADED = True
+
+
+def setup_logging(level=logging.INFO) -> None:
+    """Configure root logging for entry points (library modules only create loggers)."""
+    logging.basicConfig(level=level, format="%(levelname)s:%(name)s:%(message)s")
+
+
+# AppConfig defaults read the environment at class creation
+load_env()
+
+@dataclass(frozen=True)
+class AppConfig:
+    # table suffixes
+    DISCOVERED_TOPICS_SUFFIX: str = os.getenv("DISCOVERED_TOPICS_SUFFIX", "DISCOVERED_TOPICS_IN_HISTORY")
+    REFINED_TOPICS_SUFFIX: str = os.getenv("REFINED_TOPICS_SUFFIX", "REFINED_TOPICS")
+    CLASSIFICATION_SUFFIX: str = os.getenv("CLASSIFICATION_SUFFIX", "CLASSIFICATION_HISTORY_TABLE")  # legacy per-domain tables
+
+    # classifications of every domain, keyed by (domain, url)
+    CLASSIFICATION_TABLE: str = os.getenv("CLASSIFICATION_TABLE", "URL_CLASSIFICATIONS")
+
+    # storage backend: "snowflake" or "duckdb" (local file, exported to Snowflake afterwards)
+    STORAGE_BACKEND: str = os.getenv("STORAGE_BACKEND", "snowflake")
+    LOCAL_DB_PATH: str = os.getenv("LOCAL_DB_PATH", "takeout_local.duckdb")
+
+    # discovery: "sequential", or "mapreduce" (concurrent batches, local merge, tree refinement)
+    DISCOVERY_MODE: str = os.getenv("DISCOVERY_MODE", "sequential")
+    DISCOVERY_WORKERS: int = int(os.getenv("DISCOVERY_WORKERS", "4"))
+    REFINE_GROUP_SIZE: int = int(os.getenv("REFINE_GROUP_SIZE", "50"))  # max topics per refinement prompt
+    TOPIC_MERGE_THRESHOLD: float = float(os.getenv("TOPIC_MERGE_THRESHOLD", "0.8"))  # name-token Jaccard
+
+    # batching
+    DISCOVERY_BATCH: int = int(os.getenv("DISCOVERY_BATCH", "1000"))
+    CLASSIFY_BATCH: int = int(os.getenv("CLASSIFY_BATCH", "20"))
+    INSERT_BATCH: int = int(os.getenv("INSERT_BATCH", "10")) # interesting to modify if difficulties with api timeout
+    LLM_LIMIT: int = int(os.getenv("LLM_LIMIT", "10000"))
+    RULES_BATCH: int = int(os.getenv("RULES_BATCH", "10000"))  # entries per rule-engine scan
+
+    # sharded workers (see leases.py): URLs are split into CLASSIFY_SHARDS hash shards
+    # claimed under LEASE_SECONDS leases recorded in LEASE_TABLE; LLM_LIMIT and the
+    # local model training are shared through BUDGET_TABLE
+    CLASSIFY_SHARDS: int = int(os.getenv("CLASSIFY_SHARDS", "16"))
+    LEASE_TABLE: str = os.getenv("LEASE_TABLE", "CLASSIFICATION_LEASES")
+    LEASE_SECONDS: float = float(os.getenv("LEASE_SECONDS", "300"))
+    BUDGET_TABLE: str = os.getenv("BUDGET_TABLE", "CLASSIFICATION_BUDGET")
+
+    # model persistence: artifact directory (see classifier_artifact.py), on a volume shared
+    # by every worker of a domain; a legacy "<name>.joblib" file next to it is converted on first load
+    MODEL_PATH: str = os.getenv("MODEL_PATH", "topic_classifier")
+
+    # instrumentation
+    METRICS_DIR: str = os.getenv("METRICS_DIR", "metrics")
+    LLM_INPUT_COST_PER_M: float = float(os.getenv("LLM_INPUT_COST_PER_M", "0.30"))  # USD per 1M input tokens
+    LLM_OUTPUT_COST_PER_M: float = float(os.getenv("LLM_OUTPUT_COST_PER_M", "2.50"))  # USD per 1M output tokens
+
+    # deterministic pre-classification (see rules.py); SCROLLING_URLS becomes a non-final rule
+    RULES_PATH: str = os.getenv("RULES_PATH", "topic_rules.json")
+
+    # miscellaneous
+    SCROLLING_URLS: str = os.getenv("SCROLLING_URLS", "")
+
+    @property
+    def scrolling_list(self) -> List[str]:
+        return [u.strip() for u in self.SCROLLING_URLS.split(",") if u.strip()]
@@ -1,7 +1,7 @@
-from dataclasses import dataclass
-
-
-@dataclass
-class HistoryEntry:
-    title: str
+from dataclasses import dataclass
+
+
+@dataclass
+class HistoryEntry:
+    title: str
     url: str
\ No newline at end of file
@@ -1,79 +1,417 @@
-import json
-from typing import Dict, Iterator, Optional, Sequence, Set
-
-from sqlalchemy import text
-
-from src.db.snowflake_client import SnowflakeORM
-from src.db.tables import ChromeHistory
-from src.topic_modeling.data_models import HistoryEntry
-
-
-class SnowflakeRepository:
-    """Thin repository around SnowflakeORM.
-
-    - Owns a single session (context-managed)
-    - Exposes helpers for common patterns
-    - Allows both ORM queries and Core text() SQL
-    """
-
-    def __init__(self, orm: Optional[SnowflakeORM] = None):
-        self._orm = orm or SnowflakeORM()
-        self.session = None
-
-    def __enter__(self) -> "SnowflakeRepository":
-        self._ctx = self._orm.session_scope()
-        self.session = self._ctx.__enter__()
-        return self
-
-    def __exit__(self, exc_type, exc, tb):
-        self._ctx.__exit__(exc_type, exc, tb)
-        self.session = None
-
-    # ---- Helpers ----
-    def ensure_classification_table(self, table: str) -> None:
-        self.session.execute(
-            text(
-                f"""
-                CREATE TABLE IF NOT EXISTS {table} (
-                    title STRING,
-                    url STRING,
-                    topics ARRAY
-                )
-                """
-            )
-        )
-
-    def distinct_classified_urls(self, table: str) -> Set[str]:
-        rows = self.session.execute(text(f"SELECT url FROM {table}")).fetchall()
-        return {r[0] for r in rows}
-
-    def count_classified_urls(self, table: str) -> int:
-        row = self.session.execute(text(f"SELECT COUNT(DISTINCT url) FROM {table}")).fetchone()
-        return (row[0] or 0) if row else 0
-
-    def write_classifications(self, table: str, entries: Sequence[Dict[str, object]]) -> None:
-        if not entries:
-            return
-        sql = text(
-            f"""
-            INSERT INTO {table} (title, url, topics)
-            SELECT $1, $2, PARSE_JSON($3)
-            FROM VALUES (:title, :url, :topics)
-            """
-        )
-        params = [
-            {"title": e["title"], "url": e["url"], "topics": json.dumps(e.get("topics", []))}
-            for e in entries
-        ]
-        self.session.execute(sql, params)
-
-    def fetch_history_by_domain(self, domain: str, limit: Optional[int] = None) -> Iterator[HistoryEntry]:
-        q = (
-            self.session.query(ChromeHistory.title, ChromeHistory.url)
-            .filter(ChromeHistory.domain == domain)
-        )
-        if limit:
-            q = q.limit(limit)
-        # Stream to avoid high memory; iterate and yield
-        for row in q:
-            yield HistoryEntry(title=row.title, url=row.url)
+import json
+import time
+from typing import Dict, Iterator, List, Optional, Sequence, Set, Tuple
+
+from sqlalchemy import distinct, func, text
+
+from src.db.snowflake_client import SnowflakeORM
+from src.db.tables import ChromeHistory
+from src.topic_modeling.data_models import HistoryEntry
+from src.topic_modeling.leases import claim_order
+from src.topic_modeling.metrics import metrics
+from src.topic_modeling.storage import StorageBackend
+from src.topic_modeling.utils import (fetch_topics, has_existing_topics,
+                                      write_topics_to_snowflake)
+
+# Shard of a URL for sharded workers; must match the filter in fetch_history_by_domain
+_SHARD_SQL = "MOD(ABS(HASH(url)), :n_shards)"
+
+
+class SnowflakeRepository(StorageBackend):
+    """Thin repository around SnowflakeORM.
+
+    - Owns a single session (context-managed, re-entrant)
+    - Exposes helpers for common patterns
+    - Allows both ORM queries and Core text() SQL
+
+    Nested `with repo:` blocks reuse the outer session; leaving a nested block
+    commits its work. The session is bound to one connection checked out for
+    the whole outer block, so these commits do not hand it back to the pool
+    (and the next statement pays no checkout and pre-ping), and a whole domain
+    run goes through one Snowflake session.
+    """
+
+    def __init__(self, orm: Optional[SnowflakeORM] = None):
+        self._orm = orm or SnowflakeORM()
+        self.session = None
+        self._conn = None
+        self._depth = 0
+
+    def __enter__(self) -> "SnowflakeRepository":
+        if self._depth == 0:
+            self._conn = self._orm.engine.connect()
+            self.session = self._orm.SessionLocal(bind=self._conn)
+        self._depth += 1
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._depth -= 1
+        if self._depth:
+            # Nested block: checkpoint on success, let the outer block handle errors
+            if exc_type is None:
+                self.session.commit()
+            return
+        try:
+            if exc_type is None:
+                self.session.commit()
+            else:
+                self.session.rollback()
+        finally:
+            self.session.close()
+            self._conn.close()
+            self.session = self._conn = None
+
+    # ---- Helpers ----
+    @metrics.timed("repo.ensure_classification_table")
+    def ensure_classification_table(self, table: str) -> None:
+        # Clustered on the key so per-domain reads, MERGEs and the mart join prune micro-partitions
+        self.session.execute(
+            text(
+                f"""
+                CREATE TABLE IF NOT EXISTS {table} (
+                    domain STRING NOT NULL,
+                    url STRING NOT NULL,
+                    title STRING,
+                    topics ARRAY,
+                    source STRING,
+                    classified_at TIMESTAMP_NTZ DEFAULT CURRENT_TIMESTAMP(),
+                    PRIMARY KEY (domain, url)
+                )
+                CLUSTER BY (domain, url)
+                """
+            )
+        )
+        # Tables created before rows recorded their source
+        self.session.execute(text(f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS source STRING"))
+
+    @metrics.timed("repo.distinct_classified_urls")
+    def distinct_classified_urls(
+        self, table: str, domain: str, shard: Optional[int] = None, n_shards: int = 1
+    ) -> Set[str]:
+        sql = f"SELECT url FROM {table} WHERE domain = :domain"
+        params = {"domain": domain}
+        if shard is not None:
+            sql += f" AND {_SHARD_SQL} = :shard"
+            params.update(shard=shard, n_shards=n_shards)
+        return {r[0] for r in self.session.execute(text(sql), params).fetchall()}
+
+    @metrics.timed("repo.count_classified_urls")
+    def count_classified_urls(self, table: str, domain: str) -> int:
+        row = self.session.execute(
+            text(f"SELECT COUNT(*) FROM {table} WHERE domain = :domain"), {"domain": domain}
+        ).fetchone()
+        return (row[0] or 0) if row else 0
+
+    @metrics.timed("repo.write_classifications")
+    def write_classifications(self, table: str, domain: str, entries: Sequence[Dict[str, object]]) -> None:
+        """Stage the rows in a session temp table, then upsert them with one MERGE."""
+        if not entries:
+            return
+        metrics.inc("rows_written_total", len(entries), table=table)
+        stage = self._classification_stage(table)
+        self.session.execute(
+            text(
+                f"INSERT INTO {stage} (seq, domain, url, title, topics, source) "
+                "VALUES (:seq, :domain, :url, :title, :topics, :source)"
+            ),
+            [
+                {
+                    "seq": i, "domain": domain, "url": e["url"], "title": e["title"],
+                    "topics": json.dumps(e.get("topics", [])), "source": e.get("source"),
+                }
+                for i, e in enumerate(entries)
+            ],
+        )
+        self.merge_staged_classifications(table, stage)
+        self.session.execute(text(f"DELETE FROM {stage}"))
+
+    def merge_staged_classifications(self, table: str, stage: str) -> None:
+        """Upsert (seq, domain, url, title, topics JSON, source) rows of `stage` into `table`; the copy of a key with the highest seq wins."""
+        self.session.execute(
+            text(
+                f"""
+                MERGE INTO {table} AS t
+                USING (
+                    SELECT domain, url, title, PARSE_JSON(topics) AS topics, source
+                    FROM {stage}
+                    QUALIFY ROW_NUMBER() OVER (PARTITION BY domain, url ORDER BY seq DESC) = 1
+                ) AS s
+                ON t.domain = s.domain AND t.url = s.url
+                WHEN MATCHED THEN UPDATE SET
+                    title = s.title, topics = s.topics, source = s.source, classified_at = CURRENT_TIMESTAMP()
+                WHEN NOT MATCHED THEN INSERT (domain, url, title, topics, source, classified_at)
+                    VALUES (s.domain, s.url, s.title, s.topics, s.source, CURRENT_TIMESTAMP())
+                """
+            )
+        )
+
+    @metrics.timed("repo.migrate_classifications")
+    def migrate_classifications(self, legacy_table: str, table: str, domain: str) -> bool:
+        exists = self.session.execute(
+            text(
+                "SELECT COUNT(*) FROM information_schema.tables "
+                "WHERE table_schema = CURRENT_SCHEMA() AND table_name = UPPER(:name)"
+            ),
+            {"name": legacy_table},
+        ).scalar()
+        if not exists:
+            return False
+        self.session.execute(
+            text(
+                f"""
+                MERGE INTO {table} AS t
+                USING (
+                    SELECT :domain AS domain, url, ANY_VALUE(title) AS title, ANY_VALUE(topics) AS topics
+                    FROM {legacy_table}
+                    WHERE url IS NOT NULL
+                    GROUP BY url
+                ) AS s
+                ON t.domain = s.domain AND t.url = s.url
+                WHEN NOT MATCHED THEN INSERT (domain, url, title, topics, classified_at)
+                    VALUES (s.domain, s.url, s.title, s.topics, CURRENT_TIMESTAMP())
+                """
+            ),
+            {"domain": domain},
+        )
+        return True
+
+    @metrics.timed("repo.fetch_classifications")
+    def fetch_classifications(
+        self, table: str, domain: str, limit: int, source: Optional[str] = None
+    ) -> List[Tuple[str, List[str]]]:
+        sql = f"SELECT title, topics FROM {table} WHERE domain = :domain"
+        params = {"domain": domain, "limit": limit}
+        if source is not None:
+            sql += " AND source = :source"
+            params["source"] = source
+        rows = self.session.execute(text(sql + " ORDER BY classified_at DESC LIMIT :limit"), params).fetchall()
+        # ARRAY columns come back as JSON text
+        return [(r[0], json.loads(r[1]) if isinstance(r[1], str) else list(r[1] or [])) for r in rows]
+
+    def _classification_stage(self, table: str) -> str:
+        # Temporary tables live as long as the Snowflake session, so the DDL (which commits
+        # the open transaction) runs once per pooled connection
+        stage = f"{table}_STAGE"
+        conn = self.session.connection()
+        if stage not in conn.info.setdefault("classification_stages", set()):
+            self.session.execute(
+                text(f"CREATE TEMPORARY TABLE IF NOT EXISTS {stage} (seq INTEGER, domain STRING, url STRING, title STRING, topics STRING, source STRING)")
+            )
+            conn.info["classification_stages"].add(stage)
+        return stage
+
+    # ---- Shard leases ----
+    @metrics.timed("repo.ensure_lease_table")
+    def ensure_lease_table(self, table: str) -> None:
+        self.session.execute(
+            text(
+                f"""
+                CREATE TABLE IF NOT EXISTS {table} (
+                    domain STRING NOT NULL,
+                    shard INTEGER NOT NULL,
+                    owner STRING,
+                    expires_at FLOAT NOT NULL DEFAULT 0,
+                    done BOOLEAN NOT NULL DEFAULT FALSE,
+                    PRIMARY KEY (domain, shard)
+                )
+                """
+            )
+        )
+
+    @metrics.timed("repo.init_shards")
+    def init_shards(self, table: str, domain: str, n_shards: int) -> int:
+        count_sql = text(f"SELECT COUNT(*) FROM {table} WHERE domain = :domain")
+        count = self.session.execute(count_sql, {"domain": domain}).scalar()
+        if count:
+            return count
+        # MERGE on the key: workers initialising concurrently create each shard once
+        self.session.execute(
+            text(
+                f"""
+                MERGE INTO {table} AS t
+                USING (
+                    SELECT :domain AS domain, ROW_NUMBER() OVER (ORDER BY SEQ4()) - 1 AS shard
+                    FROM TABLE(GENERATOR(ROWCOUNT => {int(n_shards)}))
+                ) AS s
+                ON t.domain = s.domain AND t.shard = s.shard
+                WHEN NOT MATCHED THEN INSERT (domain, shard, owner, expires_at, done)
+                    VALUES (s.domain, s.shard, NULL, 0, FALSE)
+                """
+            ),
+            {"domain": domain},
+        )
+        return self.session.execute(count_sql, {"domain": domain}).scalar()
+
+    @metrics.timed("repo.reset_shards")
+    def reset_shards(self, table: str, domain: str) -> None:
+        self.session.execute(
+            text(f"UPDATE {table} SET owner = NULL, expires_at = 0, done = FALSE WHERE domain = :domain"),
+            {"domain": domain},
+        )
+
+    @metrics.timed("repo.claim_shard")
+    def claim_shard(self, table: str, domain: str, worker: str, lease_seconds: float) -> Optional[int]:
+        now = time.time()
+        free = dict(
+            self.session.execute(
+                text(
+                    f"SELECT shard, owner FROM {table}"
+                    " WHERE domain = :domain AND NOT done AND (owner IS NULL OR expires_at < :now) ORDER BY shard"
+                ),
+                {"domain": domain, "now": now},
+            ).fetchall()
+        )
+        for shard in claim_order(list(free), worker):
+            # Conditional UPDATE: only one of several racing workers sees rowcount 1
+            result = self.session.execute(
+                text(
+                    f"UPDATE {table} SET owner = :worker, expires_at = :expires_at"
+                    " WHERE domain = :domain AND shard = :shard AND NOT done AND (owner IS NULL OR expires_at < :now)"
+                ),
+                {"worker": worker, "expires_at": now + lease_seconds, "domain": domain, "shard": shard, "now": now},
+            )
+            if result.rowcount == 1:
+                if free[shard] is not None:
+                    metrics.inc("shard_takeovers_total")
+                return shard
+        return None
+
+    @metrics.timed("repo.renew_lease")
+    def renew_lease(self, table: str, domain: str, shard: int, worker: str, lease_seconds: float) -> bool:
+        result = self.session.execute(
+            text(
+                f"UPDATE {table} SET expires_at = :expires_at"
+                " WHERE domain = :domain AND shard = :shard AND owner = :worker AND NOT done"
+            ),
+            {"expires_at": time.time() + lease_seconds, "domain": domain, "shard": shard, "worker": worker},
+        )
+        return result.rowcount == 1
+
+    @metrics.timed("repo.complete_shard")
+    def complete_shard(self, table: str, domain: str, shard: int, worker: str) -> bool:
+        result = self.session.execute(
+            text(
+                f"UPDATE {table} SET done = TRUE, expires_at = 0"
+                " WHERE domain = :domain AND shard = :shard AND owner = :worker AND NOT done"
+            ),
+            {"domain": domain, "shard": shard, "worker": worker},
+        )
+        return result.rowcount == 1
+
+    @metrics.timed("repo.release_shard")
+    def release_shard(self, table: str, domain: str, shard: int, worker: str) -> None:
+        self.session.execute(
+            text(
+                f"UPDATE {table} SET owner = NULL, expires_at = 0"
+                " WHERE domain = :domain AND shard = :shard AND owner = :worker AND NOT done"
+            ),
+            {"domain": domain, "shard": shard, "worker": worker},
+        )
+
+    # ---- Shared LLM budget ----
+    @metrics.timed("repo.ensure_budget_table")
+    def ensure_budget_table(self, table: str) -> None:
+        self.session.execute(
+            text(
+                f"""
+                CREATE TABLE IF NOT EXISTS {table} (
+                    domain STRING NOT NULL,
+                    llm_rows INTEGER NOT NULL DEFAULT 0,
+                    trainer STRING,
+                    trainer_expires_at FLOAT NOT NULL DEFAULT 0,
+                    PRIMARY KEY (domain)
+                )
+                """
+            )
+        )
+
+    @metrics.timed("repo.init_budget")
+    def init_budget(self, table: str, domain: str, used: int, reset: bool = False) -> None:
+        matched = "WHEN MATCHED THEN UPDATE SET llm_rows = s.used, trainer = NULL, trainer_expires_at = 0" if reset else ""
+        self.session.execute(
+            text(
+                f"""
+                MERGE INTO {table} AS t
+                USING (SELECT :domain AS domain, :used AS used) AS s
+                ON t.domain = s.domain
+                {matched}
+                WHEN NOT MATCHED THEN INSERT (domain, llm_rows, trainer, trainer_expires_at)
+                    VALUES (s.domain, s.used, NULL, 0)
+                """
+            ),
+            {"domain": domain, "used": used},
+        )
+
+    @metrics.timed("repo.take_budget")
+    def take_budget(self, table: str, domain: str, n: int, limit: int) -> bool:
+        result = self.session.execute(
+            text(f"UPDATE {table} SET llm_rows = llm_rows + :n WHERE domain = :domain AND llm_rows < :limit"),
+            {"n": n, "domain": domain, "limit": limit},
+        )
+        return result.rowcount == 1
+
+    @metrics.timed("repo.claim_training")
+    def claim_training(self, table: str, domain: str, worker: str, lease_seconds: float) -> bool:
+        now = time.time()
+        result = self.session.execute(
+            text(
+                f"UPDATE {table} SET trainer = :worker, trainer_expires_at = :expires_at"
+                " WHERE domain = :domain AND (trainer IS NULL OR trainer = :worker OR trainer_expires_at < :now)"
+            ),
+            {"worker": worker, "expires_at": now + lease_seconds, "domain": domain, "now": now},
+        )
+        return result.rowcount == 1
+
+    @metrics.timed("repo.release_training")
+    def release_training(self, table: str, domain: str, worker: str) -> None:
+        self.session.execute(
+            text(f"UPDATE {table} SET trainer = NULL, trainer_expires_at = 0 WHERE domain = :domain AND trainer = :worker"),
+            {"domain": domain, "worker": worker},
+        )
+
+    # ---- Topic tables ----
+    @metrics.timed("repo.has_topics")
+    def has_topics(self, table: str, min_count: int = 20) -> bool:
+        return has_existing_topics(self._orm, table, min_count=min_count, session=self.session)
+
+    @metrics.timed("repo.fetch_topics")
+    def fetch_topics(self, table: str) -> List[Tuple[str, str]]:
+        return [(r[0], r[1]) for r in fetch_topics(self._orm, table, session=self.session)]
+
+    @metrics.timed("repo.write_topics")
+    def write_topics(self, table: str, topics: Dict[str, Dict[str, object]]) -> None:
+        write_topics_to_snowflake(self._orm, topics, table, session=self.session)
+
+    # ---- History ----
+    @metrics.timed("repo.count_history_urls")
+    def count_history_urls(self, domain: str) -> int:
+        q = self.session.query(func.count(distinct(ChromeHistory.url))).filter(ChromeHistory.domain == domain)
+        return q.scalar() or 0
+
+    def fetch_history_by_domain(
+        self, domain: str, limit: Optional[int] = None, shard: Optional[int] = None, n_shards: int = 1
+    ) -> Iterator[HistoryEntry]:
+        q = (
+            self.session.query(ChromeHistory.title, ChromeHistory.url)
+            .filter(ChromeHistory.domain == domain)
+        )
+        if shard is not None:
+            q = q.filter(func.mod(func.abs(func.hash(ChromeHistory.url)), n_shards) == shard)
+        if limit:
+            q = q.limit(limit)
+        # Stream to avoid high memory; iterate and yield.
+        # Only time spent in the driver is recorded, not the consumer's work between rows;
+        # it is accumulated locally so the per-row overhead stays at one perf_counter() pair.
+        rows = iter(q)
+        fetched = 0
+        driver_time = 0.0
+        while True:
+            start = time.perf_counter()
+            row = next(rows, None)
+            driver_time += time.perf_counter() - start
+            if row is None:
+                break
+            fetched += 1
+            yield HistoryEntry(title=row.title, url=row.url)
+        metrics.observe("stage_seconds", driver_time, stage="repo.fetch_history_by_domain")
+        metrics.inc("rows_fetched_total", fetched)
@@ -0,0 +1,537 @@
+"""
+duckdb_repository.py
+
+Embedded columnar backend for the topic pipeline. History, topics and
+classifications live in a local DuckDB file; reads are streamed in large
+vectors and writes go through a registered DataFrame (one bulk INSERT per
+call), so a whole domain can be classified at disk speed. Results are pushed
+to Snowflake afterwards with `export_to_snowflake`, one bulk load per table.
+
+Requires the optional `duckdb` package (`pip install duckdb`).
+
+Usage (from the repository root):
+    python -m src.topic_modeling.duckdb_repository import chrome_history_parsed.csv
+    python -m src.topic_modeling.duckdb_repository export
+"""
+
+import argparse
+import json
+import logging
+import time
+from typing import Dict, Iterator, List, Optional, Sequence, Set, Tuple
+
+import pandas as pd
+
+from src.topic_modeling.config import AppConfig, setup_logging
+from src.topic_modeling.data_models import HistoryEntry
+from src.topic_modeling.leases import claim_order
+from src.topic_modeling.metrics import metrics
+from src.topic_modeling.storage import StorageBackend
+
+try:
+    import duckdb
+except ImportError:  # pragma: no cover - optional dependency
+    duckdb = None
+
+log = logging.getLogger("topic_pipeline")
+
+HISTORY_TABLE = "raw_history"
+
+# Same host → domain rule as the ingestion side: host without a leading "www."
+_DOMAIN_SQL = r"regexp_replace(lower(split_part(split_part(url, '://', 2), '/', 1)), '^www\.', '')"
+# Shard of a URL for sharded workers; the same expression filters history and classifications
+_SHARD_SQL = "hash(url) % ?"
+
+
+class DuckDBRepository(StorageBackend):
+    """`StorageBackend` over a local DuckDB database file."""
+
+    def __init__(self, path: str = "takeout_local.duckdb", fetch_size: int = 50_000):
+        if duckdb is None:
+            raise ImportError("DuckDBRepository requires the 'duckdb' package: pip install duckdb")
+        self.path = path
+        self.fetch_size = fetch_size
+        self.conn = duckdb.connect(path)
+        self.conn.execute(
+            f"""
+            CREATE TABLE IF NOT EXISTS {HISTORY_TABLE} (
+                id BIGINT,
+                datetime TIMESTAMP,
+                title VARCHAR,
+                url VARCHAR,
+                domain VARCHAR
+            )
+            """
+        )
+        self.session = None
+        self._depth = 0
+
+    def __enter__(self) -> "DuckDBRepository":
+        # Re-entrant: nested `with repo:` blocks join the outer transaction
+        if self._depth == 0:
+            self.conn.begin()
+            self.session = self.conn
+        self._depth += 1
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._depth -= 1
+        if self._depth:
+            # Nested block: checkpoint on success, let the outer block handle errors
+            if exc_type is None:
+                self.conn.commit()
+                self.conn.begin()
+            return
+        if exc_type is None:
+            self.conn.commit()
+        else:
+            self.conn.rollback()
+        self.session = None
+
+    def close(self) -> None:
+        self.conn.close()
+
+    # ---- Loading ----
+    def import_history(self, source) -> int:
+        """Append history from a CSV/Parquet path or a DataFrame; returns the row count added.
+
+        A missing `domain` column is derived from the URL host; a missing `id`
+        continues the existing numbering.
+        """
+        if isinstance(source, pd.DataFrame):
+            self.conn.register("_history_src", source)
+            relation = "_history_src"
+        elif str(source).endswith(".parquet"):
+            relation = f"read_parquet('{source}')"
+        else:
+            relation = f"read_csv_auto('{source}', header=true)"
+
+        columns = {c.lower() for c in self.conn.execute(f"SELECT * FROM {relation} LIMIT 0").df().columns}
+        start_id = self.conn.execute(f"SELECT COALESCE(MAX(id), 0) FROM {HISTORY_TABLE}").fetchone()[0]
+        id_expr = "id" if "id" in columns else f"{start_id} + row_number() OVER ()"
+        domain_expr = "domain" if "domain" in columns else _DOMAIN_SQL
+
+        before = self._count(HISTORY_TABLE)
+        self.conn.execute(
+            f"""
+            INSERT INTO {HISTORY_TABLE}
+            SELECT {id_expr}, CAST(datetime AS TIMESTAMP), title, url, {domain_expr}
+            FROM {relation}
+            """
+        )
+        if isinstance(source, pd.DataFrame):
+            self.conn.unregister("_history_src")
+        return self._count(HISTORY_TABLE) - before
+
+    def _count(self, table: str) -> int:
+        return self.conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+    # ---- Classification table ----
+    @metrics.timed("repo.ensure_classification_table")
+    def ensure_classification_table(self, table: str) -> None:
+        self.session.execute(
+            f"""
+            CREATE TABLE IF NOT EXISTS {table} (
+                domain VARCHAR NOT NULL,
+                url VARCHAR NOT NULL,
+                title VARCHAR,
+                topics VARCHAR[],
+                source VARCHAR,
+                classified_at TIMESTAMP DEFAULT current_timestamp,
+                PRIMARY KEY (domain, url)
+            )
+            """
+        )
+        # Tables created before rows recorded their source
+        self.session.execute(f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS source VARCHAR")
+
+    @metrics.timed("repo.distinct_classified_urls")
+    def distinct_classified_urls(
+        self, table: str, domain: str, shard: Optional[int] = None, n_shards: int = 1
+    ) -> Set[str]:
+        sql, params = f"SELECT url FROM {table} WHERE domain = ?", [domain]
+        if shard is not None:
+            sql += f" AND {_SHARD_SQL} = ?"
+            params += [n_shards, shard]
+        urls = self.session.execute(sql, params).fetchnumpy()["url"]
+        return set(urls.tolist())
+
+    @metrics.timed("repo.count_classified_urls")
+    def count_classified_urls(self, table: str, domain: str) -> int:
+        row = self.session.execute(f"SELECT COUNT(*) FROM {table} WHERE domain = ?", [domain]).fetchone()
+        return (row[0] or 0) if row else 0
+
+    @metrics.timed("repo.write_classifications")
+    def write_classifications(self, table: str, domain: str, entries: Sequence[Dict[str, object]]) -> None:
+        if not entries:
+            return
+        metrics.inc("rows_written_total", len(entries), table=table)
+        # ON CONFLICT cannot update one key twice in a statement: keep the last entry per URL
+        latest = list({e["url"]: e for e in entries}.values())
+        df = pd.DataFrame(
+            {
+                "domain": domain,
+                "url": [e["url"] for e in latest],
+                "title": [e["title"] for e in latest],
+                "topics": [list(e.get("topics", [])) for e in latest],
+                "source": [e.get("source") for e in latest],
+            }
+        )
+        self.session.register("_bulk_src", df)
+        try:
+            self.session.execute(
+                f"""
+                INSERT INTO {table} (domain, url, title, topics, source)
+                SELECT domain, url, title, topics, source FROM _bulk_src
+                ON CONFLICT (domain, url) DO UPDATE SET
+                    title = excluded.title, topics = excluded.topics, source = excluded.source, classified_at = now()
+                """
+            )
+        finally:
+            self.session.unregister("_bulk_src")
+
+    @metrics.timed("repo.migrate_classifications")
+    def migrate_classifications(self, legacy_table: str, table: str, domain: str) -> bool:
+        if not self._table_exists(legacy_table):
+            return False
+        self.session.execute(
+            f"""
+            INSERT INTO {table} (domain, url, title, topics)
+            SELECT ?, url, any_value(title), any_value(topics)
+            FROM {legacy_table}
+            WHERE url IS NOT NULL
+            GROUP BY url
+            ON CONFLICT DO NOTHING
+            """,
+            [domain],
+        )
+        return True
+
+    @metrics.timed("repo.fetch_classifications")
+    def fetch_classifications(
+        self, table: str, domain: str, limit: int, source: Optional[str] = None
+    ) -> List[Tuple[str, List[str]]]:
+        sql, params = f"SELECT title, topics FROM {table} WHERE domain = ?", [domain]
+        if source is not None:
+            sql += " AND source = ?"
+            params.append(source)
+        rows = self.session.execute(sql + " ORDER BY classified_at DESC LIMIT ?", params + [limit]).fetchall()
+        return [(title, list(topics or [])) for title, topics in rows]
+
+    # ---- Shard leases ----
+    # DuckDB allows one writing process per file, so leases here only coordinate
+    # workers of one process (or resume after a crash); use a shared store across nodes.
+    @metrics.timed("repo.ensure_lease_table")
+    def ensure_lease_table(self, table: str) -> None:
+        self.session.execute(
+            f"""
+            CREATE TABLE IF NOT EXISTS {table} (
+                domain VARCHAR NOT NULL,
+                shard INTEGER NOT NULL,
+                owner VARCHAR,
+                expires_at DOUBLE NOT NULL DEFAULT 0,
+                done BOOLEAN NOT NULL DEFAULT false,
+                PRIMARY KEY (domain, shard)
+            )
+            """
+        )
+
+    @metrics.timed("repo.init_shards")
+    def init_shards(self, table: str, domain: str, n_shards: int) -> int:
+        count = self.session.execute(f"SELECT COUNT(*) FROM {table} WHERE domain = ?", [domain]).fetchone()[0]
+        if count:
+            return count
+        self.session.execute(
+            f"INSERT INTO {table} (domain, shard) SELECT ?, range FROM range(?) ON CONFLICT DO NOTHING",
+            [domain, n_shards],
+        )
+        return self.session.execute(f"SELECT COUNT(*) FROM {table} WHERE domain = ?", [domain]).fetchone()[0]
+
+    @metrics.timed("repo.reset_shards")
+    def reset_shards(self, table: str, domain: str) -> None:
+        self.session.execute(f"UPDATE {table} SET owner = NULL, expires_at = 0, done = false WHERE domain = ?", [domain])
+
+    @metrics.timed("repo.claim_shard")
+    def claim_shard(self, table: str, domain: str, worker: str, lease_seconds: float) -> Optional[int]:
+        now = time.time()
+        free = dict(
+            self.session.execute(
+                f"SELECT shard, owner FROM {table} WHERE domain = ? AND NOT done AND (owner IS NULL OR expires_at < ?)"
+                " ORDER BY shard",
+                [domain, now],
+            ).fetchall()
+        )
+        for shard in claim_order(list(free), worker):
+            # UPDATE returns the number of changed rows
+            changed = self.session.execute(
+                f"UPDATE {table} SET owner = ?, expires_at = ?"
+                " WHERE domain = ? AND shard = ? AND NOT done AND (owner IS NULL OR expires_at < ?)",
+                [worker, now + lease_seconds, domain, shard, now],
+            ).fetchone()[0]
+            if changed == 1:
+                if free[shard] is not None:
+                    metrics.inc("shard_takeovers_total")
+                return shard
+        return None
+
+    @metrics.timed("repo.renew_lease")
+    def renew_lease(self, table: str, domain: str, shard: int, worker: str, lease_seconds: float) -> bool:
+        changed = self.session.execute(
+            f"UPDATE {table} SET expires_at = ? WHERE domain = ? AND shard = ? AND owner = ? AND NOT done",
+            [time.time() + lease_seconds, domain, shard, worker],
+        ).fetchone()[0]
+        return changed == 1
+
+    @metrics.timed("repo.complete_shard")
+    def complete_shard(self, table: str, domain: str, shard: int, worker: str) -> bool:
+        changed = self.session.execute(
+            f"UPDATE {table} SET done = true, expires_at = 0 WHERE domain = ? AND shard = ? AND owner = ? AND NOT done",
+            [domain, shard, worker],
+        ).fetchone()[0]
+        return changed == 1
+
+    @metrics.timed("repo.release_shard")
+    def release_shard(self, table: str, domain: str, shard: int, worker: str) -> None:
+        self.session.execute(
+            f"UPDATE {table} SET owner = NULL, expires_at = 0 WHERE domain = ? AND shard = ? AND owner = ? AND NOT done",
+            [domain, shard, worker],
+        )
+
+    # ---- Shared LLM budget ----
+    @metrics.timed("repo.ensure_budget_table")
+    def ensure_budget_table(self, table: str) -> None:
+        self.session.execute(
+            f"""
+            CREATE TABLE IF NOT EXISTS {table} (
+                domain VARCHAR PRIMARY KEY,
+                llm_rows BIGINT NOT NULL DEFAULT 0,
+                trainer VARCHAR,
+                trainer_expires_at DOUBLE NOT NULL DEFAULT 0
+            )
+            """
+        )
+
+    @metrics.timed("repo.init_budget")
+    def init_budget(self, table: str, domain: str, used: int, reset: bool = False) -> None:
+        conflict = (
+            "DO UPDATE SET llm_rows = excluded.llm_rows, trainer = NULL, trainer_expires_at = 0" if reset else "DO NOTHING"
+        )
+        self.session.execute(f"INSERT INTO {table} (domain, llm_rows) VALUES (?, ?) ON CONFLICT (domain) {conflict}", [domain, used])
+
+    @metrics.timed("repo.take_budget")
+    def take_budget(self, table: str, domain: str, n: int, limit: int) -> bool:
+        changed = self.session.execute(
+            f"UPDATE {table} SET llm_rows = llm_rows + ? WHERE domain = ? AND llm_rows < ?", [n, domain, limit]
+        ).fetchone()[0]
+        return changed == 1
+
+    @metrics.timed("repo.claim_training")
+    def claim_training(self, table: str, domain: str, worker: str, lease_seconds: float) -> bool:
+        now = time.time()
+        changed = self.session.execute(
+            f"UPDATE {table} SET trainer = ?, trainer_expires_at = ?"
+            " WHERE domain = ? AND (trainer IS NULL OR trainer = ? OR trainer_expires_at < ?)",
+            [worker, now + lease_seconds, domain, worker, now],
+        ).fetchone()[0]
+        return changed == 1
+
+    @metrics.timed("repo.release_training")
+    def release_training(self, table: str, domain: str, worker: str) -> None:
+        self.session.execute(
+            f"UPDATE {table} SET trainer = NULL, trainer_expires_at = 0 WHERE domain = ? AND trainer = ?", [domain, worker]
+        )
+
+    # ---- Topic tables ----
+    @metrics.timed("repo.has_topics")
+    def has_topics(self, table: str, min_count: int = 20) -> bool:
+        if not self._table_exists(table):
+            return False
+        return self._count(table) >= min_count
+
+    @metrics.timed("repo.fetch_topics")
+    def fetch_topics(self, table: str) -> List[Tuple[str, str]]:
+        return self.session.execute(f"SELECT topic_name, description FROM {table}").fetchall()
+
+    @metrics.timed("repo.write_topics")
+    def write_topics(self, table: str, topics: Dict[str, Dict[str, object]]) -> None:
+        self.session.execute(
+            f"""
+            CREATE TABLE IF NOT EXISTS {table} (
+                topic_name VARCHAR,
+                description VARCHAR,
+                example_domains VARCHAR[],
+                example_titles VARCHAR[]
+            )
+            """
+        )
+        if not topics:
+            return
+        df = pd.DataFrame(
+            {
+                "topic_name": list(topics),
+                "description": [d.get("description") for d in topics.values()],
+                "example_domains": [[str(x) for x in d.get("example_domains", [])] for d in topics.values()],
+                "example_titles": [[str(x) for x in d.get("example_titles", [])] for d in topics.values()],
+            }
+        )
+        self._bulk_insert(table, df)
+
+    # ---- History ----
+    @metrics.timed("repo.count_history_urls")
+    def count_history_urls(self, domain: str) -> int:
+        sql = f"SELECT COUNT(DISTINCT url) FROM {HISTORY_TABLE} WHERE domain = ?"
+        return self.conn.execute(sql, [domain]).fetchone()[0] or 0
+
+    def fetch_history_by_domain(
+        self, domain: str, limit: Optional[int] = None, shard: Optional[int] = None, n_shards: int = 1
+    ) -> Iterator[HistoryEntry]:
+        sql = f"SELECT title, url FROM {HISTORY_TABLE} WHERE domain = ?"
+        params: list = [domain]
+        if shard is not None:
+            sql += f" AND {_SHARD_SQL} = ?"
+            params += [n_shards, shard]
+        sql += " ORDER BY id"
+        if limit:
+            sql += " LIMIT ?"
+            params.append(limit)
+        # Separate cursor so writes on the session while streaming do not invalidate it
+        cur = self.conn.cursor()
+        start = time.perf_counter()
+        cur.execute(sql, params)
+        driver_time = time.perf_counter() - start
+        fetched = 0
+        while True:
+            start = time.perf_counter()
+            rows = cur.fetchmany(self.fetch_size)
+            driver_time += time.perf_counter() - start
+            if not rows:
+                break
+            fetched += len(rows)
+            for title, url in rows:
+                yield HistoryEntry(title=title, url=url)
+        cur.close()
+        metrics.observe("stage_seconds", driver_time, stage="repo.fetch_history_by_domain")
+        metrics.inc("rows_fetched_total", fetched)
+
+    # ---- Internals ----
+    def _bulk_insert(self, table: str, df: pd.DataFrame) -> None:
+        self.session.register("_bulk_src", df)
+        try:
+            self.session.execute(f"INSERT INTO {table} SELECT * FROM _bulk_src")
+        finally:
+            self.session.unregister("_bulk_src")
+
+    def _table_exists(self, table: str) -> bool:
+        row = self.conn.execute(
+            "SELECT COUNT(*) FROM information_schema.tables WHERE lower(table_name) = lower(?)", [table]
+        ).fetchone()
+        return bool(row and row[0])
+
+    def list_tables(self) -> List[str]:
+        return [r[0] for r in self.conn.execute("SELECT table_name FROM information_schema.tables").fetchall()]
+
+    # ---- Export ----
+    def export_to_snowflake(self, orm=None, suffixes: Optional[Sequence[str]] = None) -> Dict[str, int]:
+        """Bulk-export every local topic table and the classification table to Snowflake.
+
+        Each table is uploaded once with `write_pandas` (a single PUT + COPY into a
+        transient stage table), then upserted with one MERGE: topic tables on
+        topic_name (list columns converted with PARSE_JSON), the classification
+        table on (domain, url), so re-exporting is idempotent.
+        Returns rows exported per table.
+        """
+        from snowflake.connector.pandas_tools import write_pandas
+        from sqlalchemy import text
+
+        from src.db.snowflake_client import SnowflakeORM
+        from src.topic_modeling.db import SnowflakeRepository
+
+        cfg = AppConfig()
+        orm = orm or SnowflakeORM()
+        suffixes = suffixes or (cfg.DISCOVERED_TOPICS_SUFFIX, cfg.REFINED_TOPICS_SUFFIX)
+        tables = [
+            t for t in self.list_tables()
+            if any(t.upper().endswith(s.upper()) for s in suffixes) or t.upper() == cfg.CLASSIFICATION_TABLE.upper()
+        ]
+
+        exported: Dict[str, int] = {}
+        raw = orm.engine.raw_connection()
+        try:
+            for table in tables:
+                is_classification = table.upper() == cfg.CLASSIFICATION_TABLE.upper()
+                # seq orders copies of a key for the MERGE: the latest classification wins
+                columns = (
+                    "row_number() OVER (ORDER BY classified_at) AS seq, domain, url, title, topics, source"
+                    if is_classification else "*"
+                )
+                df = self.conn.execute(f"SELECT {columns} FROM {table}").df()
+                list_cols = [c for c in df.columns if c in ("topics", "example_domains", "example_titles")]
+                for c in list_cols:
+                    df[c] = df[c].map(lambda v: json.dumps(list(v) if v is not None else []))
+                df.columns = [c.upper() for c in df.columns]
+                target = table.upper()
+                # Not "{table}_STAGE": that is the session temp stage of write_classifications,
+                # which would shadow this table in a session that has written classifications
+                stage = f"{target}_EXPORT_STAGE"
+
+                with metrics.timer("export.snowflake", table=target):
+                    write_pandas(raw.driver_connection, df, stage, auto_create_table=True, overwrite=True, table_type="transient")
+                    if is_classification:
+                        with SnowflakeRepository(orm) as repo:
+                            repo.ensure_classification_table(target)
+                            repo.merge_staged_classifications(target, stage)
+                            repo.session.execute(text(f"DROP TABLE IF EXISTS {stage}"))
+                        exported[target] = len(df)
+                        log.info("✅ Merged %d rows into %s", len(df), target)
+                        continue
+                    col_defs = ", ".join(f"{c} {'ARRAY' if c.lower() in list_cols else 'STRING'}" for c in df.columns)
+                    select = ", ".join(f"PARSE_JSON({c}) AS {c}" if c.lower() in list_cols else c for c in df.columns)
+                    others = [c for c in df.columns if c != "TOPIC_NAME"]
+                    with orm.session_scope() as session:
+                        session.execute(text(f"CREATE TABLE IF NOT EXISTS {target} ({col_defs})"))
+                        session.execute(
+                            text(
+                                f"""
+                                MERGE INTO {target} AS t
+                                USING (
+                                    SELECT {select} FROM {stage}
+                                    QUALIFY ROW_NUMBER() OVER (PARTITION BY TOPIC_NAME ORDER BY TOPIC_NAME) = 1
+                                ) AS s
+                                ON t.TOPIC_NAME = s.TOPIC_NAME
+                                WHEN MATCHED THEN UPDATE SET {', '.join(f"{c} = s.{c}" for c in others)}
+                                WHEN NOT MATCHED THEN INSERT ({', '.join(df.columns)})
+                                    VALUES ({', '.join(f"s.{c}" for c in df.columns)})
+                                """
+                            )
+                        )
+                        session.execute(text(f"DROP TABLE IF EXISTS {stage}"))
+                exported[target] = len(df)
+                log.info("✅ Exported %d rows to %s", len(df), target)
+        finally:
+            raw.close()
+        return exported
+
+
+def main(argv=None) -> None:
+    cfg = AppConfig()
+    parser = argparse.ArgumentParser(description="Manage the local DuckDB backend.")
+    parser.add_argument("--path", default=cfg.LOCAL_DB_PATH)
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    imp = sub.add_parser("import", help="Load history from a parsed CSV/Parquet file")
+    imp.add_argument("source")
+    sub.add_parser("export", help="Bulk-export local topic tables and the classification table to Snowflake")
+    args = parser.parse_args(argv)
+
+    repo = DuckDBRepository(args.path)
+    try:
+        if args.cmd == "import":
+            log.info("✅ Imported %d history rows into %s", repo.import_history(args.source), args.path)
+        else:
+            repo.export_to_snowflake()
+    finally:
+        repo.close()
+
+
+if __name__ == "__main__":
+    setup_logging()
+    main()
@@ -1,23 +1,62 @@
-import os
-
-from dotenv import load_dotenv
-from google import genai
-from google.genai import types
-
-load_dotenv()
-
-def call_llm(prompt):
-    client = genai.Client(api_key=os.getenv("GOOGLE_API_KEY"))
-    response = client.models.generate_content(
-        model="gemini-2.5-flash", 
-        contents=prompt,
-        config=types.GenerateContentConfig(
-            safety_settings=[
-                types.SafetySetting(
-                    category=types.HarmCategory.HARM_CATEGORY_HATE_SPEECH,
-                    threshold=types.HarmBlockThreshold.BLOCK_LOW_AND_ABOVE,
-                ),
-            ]
-            )
-    )
-    return response.text
+import os
+import time
+from functools import lru_cache
+
+from src.topic_modeling.config import AppConfig
+from src.topic_modeling.metrics import TOKEN_BUCKETS, metrics
+
+MODEL_NAME = "gemini-2.5-flash"
+
+
+@lru_cache(maxsize=1)
+def _client():
+    # google.genai is slow to import: load it with the first prompt, not with the module
+    from google import genai
+
+    return genai.Client(api_key=os.getenv("GOOGLE_API_KEY"))
+
+
+def call_llm(prompt):
+    from google.genai import types
+
+    client = _client()
+    start = time.perf_counter()
+    try:
+        response = client.models.generate_content(
+            model=MODEL_NAME,
+            contents=prompt,
+            config=types.GenerateContentConfig(
+                safety_settings=[
+                    types.SafetySetting(
+                        category=types.HarmCategory.HARM_CATEGORY_HATE_SPEECH,
+                        threshold=types.HarmBlockThreshold.BLOCK_LOW_AND_ABOVE,
+                    ),
+                ]
+                )
+        )
+    except Exception:
+        metrics.inc("llm_errors_total", model=MODEL_NAME)
+        raise
+    finally:
+        metrics.observe("stage_seconds", time.perf_counter() - start, stage="llm.call")
+        metrics.inc("llm_calls_total", model=MODEL_NAME)
+    _record_usage(response)
+    return response.text
+
+
+def _record_usage(response) -> None:
+    """Record token counts and estimated cost from the response usage metadata."""
+    usage = getattr(response, "usage_metadata", None)
+    if usage is None:
+        return
+    tokens_in = getattr(usage, "prompt_token_count", None) or 0
+    tokens_out = getattr(usage, "candidates_token_count", None) or 0
+    cfg = AppConfig()
+    metrics.inc("llm_tokens_total", tokens_in, direction="input", model=MODEL_NAME)
+    metrics.inc("llm_tokens_total", tokens_out, direction="output", model=MODEL_NAME)
+    metrics.observe("llm_tokens_per_call", tokens_in + tokens_out, buckets=TOKEN_BUCKETS, model=MODEL_NAME)
+    metrics.inc(
+        "llm_cost_usd_total",
+        (tokens_in * cfg.LLM_INPUT_COST_PER_M + tokens_out * cfg.LLM_OUTPUT_COST_PER_M) / 1_000_000,
+        model=MODEL_NAME,
+    )
@@ -0,0 +1,114 @@
+"""
+leases.py
+
+Shard leases for running several classification workers on one domain.
+
+A domain's URLs are split into `CLASSIFY_SHARDS` hash shards. The hash is
+computed in SQL by the backend (`HASH` in Snowflake, `hash` in DuckDB, `crc32`
+in SQLite), so a worker only reads its own shard of the history and of the
+classified URLs, and all workers on one store agree on the split. One row
+per shard in `LEASE_TABLE` records its owner, the lease expiry (epoch seconds) and whether
+it is done. A worker claims a free or expired shard with one conditional
+UPDATE, renews the lease while it works and marks the shard done at the end;
+a crashed worker's shard is taken over once its lease expires. Rows written
+for a shard are upserts (see `CLASSIFICATION_TABLE`), so a takeover can redo
+work but never duplicate rows.
+
+`LLM_LIMIT` is shared by every worker of a domain: one row in `BUDGET_TABLE`
+counts the rows sent to the LLM, and each batch is reserved with a conditional
+UPDATE, so the workers together overshoot the limit by at most one batch each.
+Past the limit, one worker (holding the training claim of the same row) trains
+the local model from the classifications written so far and saves it to the
+shared `MODEL_PATH`; the others keep their shard and wait for the model.
+
+Expiry uses the workers' clocks: keep `LEASE_SECONDS` well above the clock
+skew between containers and above the time of one classification batch.
+"""
+
+import os
+import socket
+import time
+import zlib
+from typing import List, Sequence
+
+from src.topic_modeling.metrics import metrics
+from src.topic_modeling.storage import StorageBackend
+
+
+class LeaseLost(RuntimeError):
+    """The shard lease expired and was taken over, or the shard was completed by another worker."""
+
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+def claim_order(shards: Sequence[int], worker: str) -> List[int]:
+    """Candidate shards rotated by a per-worker offset, so workers starting together try different rows first."""
+    if not shards:
+        return []
+    start = zlib.crc32(worker.encode("utf-8")) % len(shards)
+    return list(shards[start:]) + list(shards[:start])
+
+
+class ShardLease:
+    """A claimed shard. Pass `heartbeat` to `classify`: it is called once per batch."""
+
+    def __init__(self, db: StorageBackend, table: str, domain: str, shard: int, worker: str, lease_seconds: float):
+        self.db = db
+        self.table = table
+        self.domain = domain
+        self.shard = shard
+        self.worker = worker
+        self.lease_seconds = lease_seconds
+        self.expires_at = time.time() + lease_seconds
+
+    def heartbeat(self) -> None:
+        """Commit the rows written so far; renew the lease once half of it has elapsed."""
+        with self.db:  # nested block: checkpoint, so other workers are not blocked on our writes
+            due = time.time() >= self.expires_at - self.lease_seconds / 2
+            renewed = due and self.db.renew_lease(self.table, self.domain, self.shard, self.worker, self.lease_seconds)
+        if not due:
+            return
+        if not renewed:
+            metrics.inc("lease_lost_total")
+            raise LeaseLost(f"{self.worker} lost the lease on shard {self.shard} of {self.domain}")
+        self.expires_at = time.time() + self.lease_seconds
+        metrics.inc("lease_renewals_total")
+
+    def complete(self) -> bool:
+        with self.db:
+            return self.db.complete_shard(self.table, self.domain, self.shard, self.worker)
+
+    def release(self) -> None:
+        with self.db:
+            self.db.release_shard(self.table, self.domain, self.shard, self.worker)
+
+
+class LLMBudget:
+    """The `LLM_LIMIT` of a domain, shared by all of its workers through `BUDGET_TABLE`."""
+
+    def __init__(self, db: StorageBackend, table: str, domain: str, worker: str, limit: int, lease_seconds: float):
+        self.db = db
+        self.table = table
+        self.domain = domain
+        self.worker = worker
+        self.limit = limit
+        self.lease_seconds = lease_seconds
+        self.exhausted = False
+
+    def take(self, n: int) -> bool:
+        """Reserve `n` LLM rows; False (and from then on without asking again) once the limit is reached."""
+        if self.exhausted:
+            return False
+        with self.db:
+            self.exhausted = not self.db.take_budget(self.table, self.domain, n, self.limit)
+        return not self.exhausted
+
+    def claim_training(self) -> bool:
+        with self.db:
+            return self.db.claim_training(self.table, self.domain, self.worker, self.lease_seconds)
+
+    def release_training(self) -> None:
+        with self.db:
+            self.db.release_training(self.table, self.domain, self.worker)
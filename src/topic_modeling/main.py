@@ -1,25 +1,42 @@
-import os
-from typing import Optional
-
-from dotenv import load_dotenv
-
-from src.topic_modeling.pipeline import TopicModelingPipeline
-
-load_dotenv()
-DOMAIN_TO_MODEL = os.getenv("DOMAIN_NAMES_FOR_TOPIC_MODELING", "")
-DOMAIN_TO_MODEL_LIST = [u.strip() for u in DOMAIN_TO_MODEL.split(",") if u.strip()]
-
-def run_for_domain(domain: str, sample_limit: Optional[int] = None):
-    """Example end-to-end runner keeping the API surface tiny."""
-    pipe = TopicModelingPipeline(domain)
-    pipe.discover_topics(sample_limit=sample_limit)
-    pipe.refine_topics()
-
-    # Stream history for classification to avoid high memory usage
-    with pipe.repo as db:
-        entries = db.fetch_history_by_domain(domain)
-        pipe.classify(entries)
-
-if __name__ == '__main__':
-    for domain in DOMAIN_TO_MODEL_LIST:
-        run_for_domain(domain)
+import logging
+import os
+from typing import Optional
+
+# Keep module-level imports light: sklearn, google.genai and the Snowflake
+# dialect are imported on first use (see src/benchmarks/bench_imports.py)
+from src.topic_modeling.config import AppConfig, setup_logging
+from src.topic_modeling.metrics import metrics, record_connection_stats
+from src.topic_modeling.pipeline import TopicModelingPipeline
+from src.topic_modeling.storage import close_connections
+
+DOMAIN_TO_MODEL = os.getenv("DOMAIN_NAMES_FOR_TOPIC_MODELING", "")
+DOMAIN_TO_MODEL_LIST = [u.strip() for u in DOMAIN_TO_MODEL.split(",") if u.strip()]
+log = logging.getLogger("topic_pipeline")
+
+def run_for_domain(domain: str, sample_limit: Optional[int] = None):
+    """Example end-to-end runner keeping the API surface tiny."""
+    pipe = TopicModelingPipeline(domain)
+    # One session for the whole domain: each stage re-enters it and commits its own work
+    with pipe.repo as db:
+        if pipe.is_up_to_date():
+            log.info("✅ %s is up to date; nothing to do.", domain)
+            return
+        pipe.discover_topics(sample_limit=sample_limit)
+        pipe.refine_topics()
+
+        # Stream history for classification to avoid high memory usage
+        entries = db.fetch_history_by_domain(domain)
+        pipe.classify(entries)
+
+
+if __name__ == '__main__':
+    setup_logging()
+    try:
+        for domain in DOMAIN_TO_MODEL_LIST:
+            run_for_domain(domain)
+    finally:
+        record_connection_stats()
+        # Export even on failure: the partial profile is what we need to debug a slow run
+        if AppConfig().METRICS_DIR:
+            metrics.export(AppConfig().METRICS_DIR)
+        close_connections()
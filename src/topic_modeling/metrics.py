@@ -0,0 +1,289 @@
+"""
+metrics.py
+
+Lightweight in-process instrumentation for the topic modeling pipeline.
+
+Timers and counters are kept in plain dicts keyed by (metric, labels) so the
+per-call overhead is a `perf_counter()` pair and a dict update; it is safe to
+leave enabled in production. At the end of a run the registry can be exported
+as a Prometheus text-format file and as a JSON run summary.
+"""
+
+import bisect
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from functools import wraps
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+# Latency buckets (seconds) shared by every histogram: from local inference
+# (sub-millisecond) up to slow LLM calls.
+DEFAULT_BUCKETS: Tuple[float, ...] = (
+    0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+    1.0, 2.5, 5.0, 10.0, 30.0, 60.0,
+)
+
+# Token-count buckets for per-call prompt + completion sizes
+TOKEN_BUCKETS: Tuple[float, ...] = (
+    100, 250, 500, 1_000, 2_500, 5_000, 10_000, 25_000, 50_000, 100_000, 250_000, 1_000_000,
+)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+# Labels of the enclosing `scope()` blocks (e.g. domain, phase); added to every observation.
+_scope_labels: ContextVar[Dict[str, str]] = ContextVar("topic_metrics_scope", default={})
+
+
+@dataclass
+class Histogram:
+    buckets: Tuple[float, ...] = DEFAULT_BUCKETS
+    counts: List[int] = field(default_factory=list)
+    total: float = 0.0
+    n: int = 0
+    max: float = 0.0
+
+    def __post_init__(self):
+        if not self.counts:
+            # One slot per bucket plus the +Inf overflow slot
+            self.counts = [0] * (len(self.buckets) + 1)
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.total += value
+        self.n += 1
+        if value > self.max:
+            self.max = value
+
+    def quantile(self, q: float) -> float:
+        """Approximate quantile: upper bound of the bucket holding the q-th observation."""
+        if not self.n:
+            return 0.0
+        rank = q * self.n
+        seen = 0
+        for i, c in enumerate(self.counts):
+            seen += c
+            if seen >= rank:
+                return self.buckets[i] if i < len(self.buckets) else self.max
+        return self.max
+
+
+class MetricsRegistry:
+    """Process-wide store of counters and latency histograms."""
+
+    def __init__(self, prefix: str = "topic_pipeline"):
+        self.prefix = prefix
+        self._counters: Dict[str, Dict[LabelKey, float]] = {}
+        self._histograms: Dict[str, Dict[LabelKey, Histogram]] = {}
+        self._lock = threading.Lock()
+        self.started_at = time.time()
+
+    # ---- Labels ----
+    @staticmethod
+    def _key(labels: Dict[str, object]) -> LabelKey:
+        for k, v in _scope_labels.get().items():
+            labels.setdefault(k, v)
+        return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+    @contextmanager
+    def scope(self, **labels) -> Iterator[None]:
+        """Attach `labels` (e.g. domain=..., phase=...) to everything recorded inside the block."""
+        token = _scope_labels.set({**_scope_labels.get(), **{k: str(v) for k, v in labels.items()}})
+        try:
+            yield
+        finally:
+            _scope_labels.reset(token)
+
+    # ---- Recording ----
+    def inc(self, name: str, value: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def observe(self, name: str, value: float, buckets: Optional[Tuple[float, ...]] = None, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            hist = series.get(key)
+            if hist is None:
+                hist = series[key] = Histogram(buckets or DEFAULT_BUCKETS)
+            hist.observe(value)
+
+    @contextmanager
+    def timer(self, stage: str, **labels) -> Iterator[None]:
+        """Record the wall time of the block in the `stage_seconds` histogram."""
+        start = time.perf_counter()
+        status = "ok"
+        try:
+            yield
+        except BaseException:
+            status = "error"
+            raise
+        finally:
+            self.observe("stage_seconds", time.perf_counter() - start, stage=stage, status=status, **labels)
+
+    def timed(self, stage: str) -> Callable:
+        """Decorator form of `timer`."""
+        def decorator(fn: Callable) -> Callable:
+            @wraps(fn)
+            def wrapper(*args, **kwargs):
+                with self.timer(stage):
+                    return fn(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+            self.started_at = time.time()
+
+    # ---- Reading ----
+    def counter_value(self, name: str, **labels) -> float:
+        """Sum of a counter over every series matching the given labels."""
+        wanted = {k: str(v) for k, v in labels.items()}
+        with self._lock:
+            series = dict(self._counters.get(name, {}))
+        return sum(v for key, v in series.items() if wanted.items() <= dict(key).items())
+
+    def histogram(self, name: str, **labels) -> Histogram:
+        """Merge every series of a histogram matching the given labels."""
+        wanted = {k: str(v) for k, v in labels.items()}
+        with self._lock:
+            series = dict(self._histograms.get(name, {}))
+        merged = Histogram(next(iter(series.values())).buckets if series else DEFAULT_BUCKETS)
+        for key, hist in series.items():
+            if not wanted.items() <= dict(key).items():
+                continue
+            merged.counts = [a + b for a, b in zip(merged.counts, hist.counts)]
+            merged.total += hist.total
+            merged.n += hist.n
+            merged.max = max(merged.max, hist.max)
+        return merged
+
+    # ---- Export ----
+    def to_prometheus(self) -> str:
+        """Render every metric in the Prometheus text exposition format."""
+        lines: List[str] = []
+        with self._lock:
+            counters = {n: dict(s) for n, s in self._counters.items()}
+            histograms = {n: dict(s) for n, s in self._histograms.items()}
+
+        for name, series in sorted(counters.items()):
+            full = f"{self.prefix}_{name}"
+            lines.append(f"# TYPE {full} counter")
+            for key, value in sorted(series.items()):
+                lines.append(f"{full}{_fmt_labels(key)} {_fmt_value(value)}")
+
+        for name, series in sorted(histograms.items()):
+            full = f"{self.prefix}_{name}"
+            lines.append(f"# TYPE {full} histogram")
+            for key, hist in sorted(series.items()):
+                cumulative = 0
+                for bound, count in zip(hist.buckets, hist.counts):
+                    cumulative += count
+                    lines.append(f"{full}_bucket{_fmt_labels(key, le=repr(bound))} {cumulative}")
+                lines.append(f"{full}_bucket{_fmt_labels(key, le='+Inf')} {hist.n}")
+                lines.append(f"{full}_sum{_fmt_labels(key)} {_fmt_value(hist.total)}")
+                lines.append(f"{full}_count{_fmt_labels(key)} {hist.n}")
+        return "\n".join(lines) + "\n"
+
+    def summary(self) -> Dict[str, object]:
+        """JSON-serializable run summary: per-stage latency and counter totals."""
+        with self._lock:
+            counters = {n: dict(s) for n, s in self._counters.items()}
+            histograms = {n: dict(s) for n, s in self._histograms.items()}
+
+        stages: Dict[str, Dict[str, object]] = {}
+        for name, series in histograms.items():
+            for key, hist in series.items():
+                labels = dict(key)
+                stage_id = "|".join(f"{k}={v}" for k, v in key)
+                stages[f"{name}{{{stage_id}}}"] = {
+                    "labels": labels,
+                    "count": hist.n,
+                    "total_s": round(hist.total, 6),
+                    "mean_s": round(hist.total / hist.n, 6) if hist.n else 0.0,
+                    "p50_s": hist.quantile(0.5),
+                    "p95_s": hist.quantile(0.95),
+                    "max_s": round(hist.max, 6),
+                }
+
+        counter_rows = [
+            {"name": name, "labels": dict(key), "value": value}
+            for name, series in sorted(counters.items())
+            for key, value in sorted(series.items())
+        ]
+
+        elapsed = time.time() - self.started_at
+        rows = self.counter_value("rows_classified_total")
+        return {
+            "started_at": self.started_at,
+            "elapsed_s": round(elapsed, 3),
+            "rows_classified": rows,
+            "rows_per_second": round(rows / elapsed, 3) if elapsed > 0 else 0.0,
+            "llm_calls": self.counter_value("llm_calls_total"),
+            "llm_errors": self.counter_value("llm_errors_total"),
+            "tokens_in": self.counter_value("llm_tokens_total", direction="input"),
+            "tokens_out": self.counter_value("llm_tokens_total", direction="output"),
+            "cost_usd": round(self.counter_value("llm_cost_usd_total"), 6),
+            "stages": stages,
+            "counters": counter_rows,
+        }
+
+    def export(self, out_dir: str, run_name: str = "topic_pipeline") -> Tuple[str, str]:
+        """Write `<run_name>.prom` and `<run_name>.json` into `out_dir`."""
+        os.makedirs(out_dir, exist_ok=True)
+        prom_path = os.path.join(out_dir, f"{run_name}.prom")
+        json_path = os.path.join(out_dir, f"{run_name}.json")
+        # Write-then-rename so a node_exporter textfile collector never reads a partial file
+        tmp = prom_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(self.to_prometheus())
+        os.replace(tmp, prom_path)
+        with open(json_path, "w", encoding="utf-8") as f:
+            json.dump(self.summary(), f, indent=2, ensure_ascii=False)
+        return prom_path, json_path
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _fmt_labels(key: LabelKey, le: Optional[str] = None) -> str:
+    pairs = [f'{k}="{_escape(v)}"' for k, v in key]
+    if le is not None:
+        pairs.append(f'le="{le}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _fmt_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+# Shared registry used by the pipeline, the repository and the LLM client
+metrics = MetricsRegistry()
+
+log = logging.getLogger("topic_pipeline")
+
+
+def record_connection_stats() -> None:
+    """Copy Snowflake engine/connection counters into the run metrics and log them."""
+    client = sys.modules.get("src.db.snowflake_client")
+    if client is None:
+        return  # Never imported, so no engine was created
+    stats = client.connection_stats()
+    metrics.inc("db_engines_total", stats["engines"])
+    metrics.inc("db_connections_total", stats["connects"])
+    metrics.inc("db_connect_seconds_total", stats["connect_seconds"])
+    metrics.inc("db_pool_checkouts_total", stats["checkouts"])
+    log.info(
+        "🔌 %d engine(s), %d connection(s) opened in %.2fs, %d pool checkout(s)",
+        stats["engines"], stats["connects"], stats["connect_seconds"], stats["checkouts"],
+    )
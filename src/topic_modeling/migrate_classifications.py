@@ -0,0 +1,65 @@
+"""
+migrate_classifications.py
+
+One-off migration from the legacy per-domain `<DOMAIN>_CLASSIFICATION_HISTORY_TABLE`
+tables into the consolidated `CLASSIFICATION_TABLE`, keyed by (domain, url).
+Each legacy table is copied with one set-based upsert that keeps rows already
+present in the consolidated table and collapses duplicate URLs, so the
+migration can be rerun safely. Legacy tables are left in place; drop them once
+the counts check out.
+
+Usage (from the repository root):
+    python -m src.topic_modeling.migrate_classifications                  # DOMAIN_NAMES_FOR_TOPIC_MODELING
+    python -m src.topic_modeling.migrate_classifications reddit.com m.facebook.com
+    STORAGE_BACKEND=duckdb python -m src.topic_modeling.migrate_classifications reddit.com
+"""
+
+import argparse
+import logging
+import os
+from typing import Dict, Optional, Sequence
+
+from src.topic_modeling.config import AppConfig, setup_logging
+from src.topic_modeling.storage import StorageBackend, make_repository
+from src.topic_modeling.utils import table_name
+
+log = logging.getLogger("topic_pipeline")
+
+
+def migrate_domains(
+    domains: Sequence[str], repo: Optional[StorageBackend] = None, cfg: Optional[AppConfig] = None
+) -> Dict[str, int]:
+    """Copy each domain's legacy table into the consolidated one; returns URLs added per domain."""
+    cfg = cfg or AppConfig()
+    repo = repo or make_repository(cfg)
+    added: Dict[str, int] = {}
+    with repo as db:
+        db.ensure_classification_table(cfg.CLASSIFICATION_TABLE)
+        for domain in domains:
+            legacy = table_name(domain, cfg.CLASSIFICATION_SUFFIX)
+            with db:
+                before = db.count_classified_urls(cfg.CLASSIFICATION_TABLE, domain)
+                if not db.migrate_classifications(legacy, cfg.CLASSIFICATION_TABLE, domain):
+                    log.info("⏭️ %s: no legacy table %s", domain, legacy)
+                    continue
+                added[domain] = db.count_classified_urls(cfg.CLASSIFICATION_TABLE, domain) - before
+            log.info("✅ %s: %d URLs migrated from %s into %s", domain, added[domain], legacy, cfg.CLASSIFICATION_TABLE)
+    return added
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Migrate per-domain classification tables into CLASSIFICATION_TABLE.")
+    parser.add_argument("domains", nargs="*", help="Domains as passed to the pipeline (default: DOMAIN_NAMES_FOR_TOPIC_MODELING)")
+    args = parser.parse_args(argv)
+
+    domains = args.domains or [
+        d.strip() for d in os.getenv("DOMAIN_NAMES_FOR_TOPIC_MODELING", "").split(",") if d.strip()
+    ]
+    if not domains:
+        parser.error("no domains given and DOMAIN_NAMES_FOR_TOPIC_MODELING is empty")
+    migrate_domains(domains)
+
+
+if __name__ == "__main__":
+    setup_logging()
+    main()
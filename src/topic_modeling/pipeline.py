@@ -1,226 +1,541 @@
-import json
-import logging
-import os
-import random
-from typing import (Dict, Iterable, Iterator, List, Optional, Sequence, Set,
-                    Tuple)
-
-import joblib
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.linear_model import LogisticRegression
-from sklearn.multiclass import OneVsRestClassifier
-from sklearn.pipeline import Pipeline
-from sklearn.preprocessing import MultiLabelBinarizer
-
-from src.topic_modeling.config import AppConfig
-from src.topic_modeling.data_models import HistoryEntry
-from src.topic_modeling.db import SnowflakeRepository
-from src.topic_modeling.gemini import call_llm
-from src.topic_modeling.prompts import (BATCH_TOPIC_ASSIGNMENT_PROMPT,
-                                        TOPIC_DISCOVERY_PROMPT,
-                                        TOPIC_REFINMENT_PROMPT)
-from src.topic_modeling.utils import (extract_json, fetch_topics,
-                                      format_topics, has_existing_topics,
-                                      table_name, write_topics_to_snowflake)
-
-logging.basicConfig(level=logging.INFO, format="%(levelname)s:%(name)s:%(message)s")
-log = logging.getLogger("topic_pipeline")
-
-
-class TopicModelingPipeline:
-    def __init__(self, domain: str, cfg: Optional[AppConfig] = None):
-        self.domain = domain
-        self.cfg = cfg or AppConfig()
-        self.repo = SnowflakeRepository()
-        # Precompute table names
-        self.discovered_table = table_name(domain, self.cfg.DISCOVERED_TOPICS_SUFFIX)
-        self.refined_table = table_name(domain, self.cfg.REFINED_TOPICS_SUFFIX)
-        self.classification_table = table_name(domain, self.cfg.CLASSIFICATION_SUFFIX)
-
-    # ---------- Discovery ----------
-    def discover_topics(self, sample_limit: Optional[int] = None) -> None:
-        with self.repo as db:
-            # Optional sampling to keep LLM cost bounded
-            entries = list(db.fetch_history_by_domain(self.domain, limit=sample_limit))
-            random.shuffle(entries)
-
-            if has_existing_topics(db._orm, self.discovered_table, min_count=max(1, len(entries) // self.cfg.DISCOVERY_BATCH)):
-                log.info("Discovered topics already present; skipping discovery.")
-                return
-
-            batches = _chunk(entries, self.cfg.DISCOVERY_BATCH)
-            log.info("🔍 Processing %d discovery batches…", len(batches))
-
-            seen: Set[str] = set()
-            for i, batch in enumerate(batches, start=1):
-                prompt = TOPIC_DISCOVERY_PROMPT.format(
-                    history_sample=json.dumps([e.__dict__ for e in batch], ensure_ascii=False),
-                    domain=self.domain,
-                )
-                resp = call_llm(prompt)
-                try:
-                    topics = extract_json(resp)
-                except Exception:
-                    log.warning("⚠️ Invalid JSON in discovery batch %s; skipping.", i)
-                    continue
-
-                new_topics = {k: v for k, v in topics.items() if k not in seen}
-                if not new_topics:
-                    log.info("ℹ️ No new topics in batch %s", i)
-                    continue
-
-                write_topics_to_snowflake(db._orm, new_topics, self.discovered_table)
-                seen.update(new_topics)
-                log.info("✅ Batch %s written (%d new topics)", i, len(new_topics))
-
-    # ---------- Refinement ----------
-    def refine_topics(self) -> List[Tuple[str, str]]:
-        with self.repo as db:
-            if has_existing_topics(db._orm, self.refined_table, min_count=3):
-                return fetch_topics(db._orm, self.refined_table)
-
-            topics = fetch_topics(db._orm, self.discovered_table)
-            prompt = TOPIC_REFINMENT_PROMPT.format(
-                all_topics=format_topics(topics),
-                domain=self.domain,
-            )
-            resp = call_llm(prompt)
-            refined = extract_json(resp)
-            write_topics_to_snowflake(db._orm, refined, self.refined_table)
-            log.info("✅ %d refined topics written", len(refined))
-            # Return normalized list[(name, description)] for reuse
-            return [(k, v) for k, v in refined.items()]
-
-    # ---------- Classification ----------
-    def classify(self, entries: Iterable[HistoryEntry]) -> None:
-        with self.repo as db:
-            db.ensure_classification_table(self.classification_table)
-
-            already = db.distinct_classified_urls(self.classification_table)
-            done_count = db.count_classified_urls(self.classification_table)
-            log.info("Skipping %d already-classified URLs.", len(already))
-
-            topics_json = json.dumps(
-                [
-                    {"name": name, "description": desc}
-                    for name, desc in fetch_topics(db._orm, self.refined_table)
-                ]
-            )
-
-            # Local classifier cache
-            titles: List[str] = []
-            labels: List[List[str]] = []
-            clf, mlb = _load_local_classifier(self.cfg.MODEL_PATH)
-
-            buffer: List[Dict[str, object]] = []
-
-            # Deduplicate + filter
-            def _distinct(elems: Iterable[HistoryEntry]) -> Iterator[HistoryEntry]:
-                seen_urls: Set[str] = set()
-                for e in elems:
-                    if e.url in seen_urls or e.url in already:
-                        continue
-                    seen_urls.add(e.url)
-                    yield e
-
-            for batch in _chunk_iter(_distinct(entries), self.cfg.CLASSIFY_BATCH):
-                if done_count < self.cfg.LLM_LIMIT:
-                    mapping = _classify_batch_llm(batch, topics_json, self.domain, self.cfg.scrolling_list)
-                    for e in batch:
-                        topics = mapping.get(e.url, [])
-                        buffer.append({"title": e.title, "url": e.url, "topics": topics})
-                        if topics:
-                            titles.append(e.title)
-                            labels.append(topics)
-                    done_count += len(batch)
-                else:
-                    if clf is None or mlb is None:
-                        if not titles:
-                            log.warning("⚠️ No training data available for classifier; stopping.")
-                            break
-                        clf, mlb = _train_local_classifier(titles, labels, self.cfg.MODEL_PATH)
-                    for e in batch:
-                        topics = ["None"]
-                        if e.title:
-                            pred = clf.predict([e.title])
-                            topics = list(mlb.inverse_transform(pred)[0])
-                        buffer.append({"title": e.title, "url": e.url, "topics": topics})
-
-                if len(buffer) >= self.cfg.INSERT_BATCH:
-                    db.write_classifications(self.classification_table, buffer)
-                    buffer.clear()
-
-            if buffer:
-                db.write_classifications(self.classification_table, buffer)
-
-
-# ===================
-# Helper functions
-# ===================
-
-def _chunk(data: Sequence, size: int) -> List[Sequence]:
-    return [data[i : i + size] for i in range(0, len(data), size)]
-
-
-def _chunk_iter(it: Iterable, size: int) -> Iterator[List]:
-    buf: List = []
-    for x in it:
-        buf.append(x)
-        if len(buf) == size:
-            yield buf
-            buf = []
-    if buf:
-        yield buf
-
-
-def _classify_batch_llm(
-    batch: Sequence[HistoryEntry], topics_json: str, domain: str, scrolling_list: List[str]
-) -> Dict[str, List[str]]:
-    mapping: Dict[str, List[str]] = {}
-    payload = [{"title": e.title, "url": e.url} for e in batch]
-
-    if payload:
-        prompt = BATCH_TOPIC_ASSIGNMENT_PROMPT.format(
-            urls=json.dumps(payload, indent=2), topics_json=topics_json, domain=domain
-        )
-        resp = call_llm(prompt)
-        try:
-            out = extract_json(resp)
-            for url, obj in out.items():
-                mapping[url] = obj.get("classes", ["None"]) or ["None"]
-        except Exception as exc:
-            log.warning("⚠️ Failed batch classification: %s", exc)
-
-    # heuristics: mark scrolling
-    for e in batch:
-        if any(bad in e.url for bad in scrolling_list):
-            mapping.setdefault(e.url, [])
-            if "Scrolling" not in mapping[e.url]:
-                mapping[e.url].append("Scrolling")
-
-    return mapping
-
-
-def _train_local_classifier(
-    titles: List[str], labels: List[List[str]], model_path: str
-) -> Tuple[Pipeline, MultiLabelBinarizer]:
-    mlb = MultiLabelBinarizer()
-    y = mlb.fit_transform(labels)
-
-    clf = Pipeline(
-        [
-            ("tfidf", TfidfVectorizer(max_features=20_000, ngram_range=(1, 2))),
-            ("clf", OneVsRestClassifier(LogisticRegression(max_iter=1000))),
-        ]
-    )
-    clf.fit(titles, y)
-    joblib.dump((clf, mlb), model_path)
-    log.info("✅ Classifier trained and saved to %s", model_path)
-    return clf, mlb
-
-
-def _load_local_classifier(model_path: str) -> Tuple[Optional[Pipeline], Optional[MultiLabelBinarizer]]:
-    if os.path.exists(model_path):
-        log.info("📂 Loading classifier from %s", model_path)
-        return joblib.load(model_path)
-    return None, None
\ No newline at end of file
+import contextvars
+import json
+import logging
+import os
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import (TYPE_CHECKING, Callable, Dict, Iterable, Iterator, List,
+                    Optional, Sequence, Set, Tuple)
+
+from src.topic_modeling.config import AppConfig
+from src.topic_modeling.data_models import HistoryEntry
+from src.topic_modeling.gemini import call_llm
+from src.topic_modeling.leases import (LeaseLost, LLMBudget, ShardLease,
+                                       default_worker_id)
+from src.topic_modeling.metrics import metrics
+from src.topic_modeling.prompts import (BATCH_TOPIC_ASSIGNMENT_PROMPT,
+                                        TOPIC_DISCOVERY_PROMPT,
+                                        TOPIC_REFINMENT_PROMPT)
+from src.topic_modeling.rules import load_rules
+from src.topic_modeling.storage import StorageBackend, make_repository
+from src.topic_modeling.topic_merge import merge_similar_topics
+from src.topic_modeling.utils import extract_json, format_topics, table_name
+
+if TYPE_CHECKING:
+    # NumPy/sklearn are imported lazily, when local inference actually starts
+    from src.topic_modeling.classifier_artifact import ClassifierArtifact
+
+log = logging.getLogger("topic_pipeline")
+
+
+class TopicModelingPipeline:
+    def __init__(
+        self,
+        domain: str,
+        cfg: Optional[AppConfig] = None,
+        repo: Optional[StorageBackend] = None,
+        llm: Optional[Callable[[str], str]] = None,
+    ):
+        self.domain = domain
+        self.cfg = cfg or AppConfig()
+        # Both are injectable so the pipeline can run against local stand-ins (see src/benchmarks)
+        self.repo = repo or make_repository(self.cfg)
+        self.llm = llm or call_llm
+        # Precompute table names
+        self.discovered_table = table_name(domain, self.cfg.DISCOVERED_TOPICS_SUFFIX)
+        self.refined_table = table_name(domain, self.cfg.REFINED_TOPICS_SUFFIX)
+        self.classification_table = self.cfg.CLASSIFICATION_TABLE
+
+    # ---------- Status ----------
+    def is_up_to_date(self) -> bool:
+        """True when topics are refined and every history URL of the domain is classified.
+
+        Costs a few COUNT queries, so scheduled runs can skip a finished domain
+        before fetching history or loading the classifier.
+        """
+        with metrics.timer("pipeline.is_up_to_date"), self.repo as db:
+            if not db.has_topics(self.refined_table, min_count=3):
+                return False
+            db.ensure_classification_table(self.classification_table)
+            return db.count_classified_urls(self.classification_table, self.domain) >= db.count_history_urls(self.domain)
+
+    # ---------- Discovery ----------
+    def discover_topics(self, sample_limit: Optional[int] = None) -> None:
+        with metrics.scope(domain=self.domain, phase="discovery"), metrics.timer("pipeline.discover_topics"), self.repo as db:
+            # Discovered topics are only an input to refinement
+            if db.has_topics(self.refined_table, min_count=3):
+                log.info("Refined topics already present; skipping discovery.")
+                return
+
+            # Map-reduce writes all merged topics in one INSERT, so any row means a
+            # finished discovery (rerunning it would append a second topic set)
+            if self.cfg.DISCOVERY_MODE == "mapreduce" and db.has_topics(self.discovered_table, min_count=1):
+                log.info("Discovered topics already present; skipping discovery.")
+                return
+
+            # Optional sampling to keep LLM cost bounded
+            entries = list(db.fetch_history_by_domain(self.domain, limit=sample_limit))
+            random.shuffle(entries)
+
+            if self.cfg.DISCOVERY_MODE != "mapreduce" and db.has_topics(
+                self.discovered_table, min_count=max(1, len(entries) // self.cfg.DISCOVERY_BATCH)
+            ):
+                log.info("Discovered topics already present; skipping discovery.")
+                return
+
+            batches = _chunk(entries, self.cfg.DISCOVERY_BATCH)
+            log.info("🔍 Processing %d discovery batches…", len(batches))
+
+            if self.cfg.DISCOVERY_MODE == "mapreduce":
+                self._discover_mapreduce(db, batches)
+                return
+
+            seen: Set[str] = set()
+            for i, batch in enumerate(batches, start=1):
+                resp = self.llm(self._discovery_prompt(batch))
+                try:
+                    topics = extract_json(resp)
+                except Exception:
+                    log.warning("⚠️ Invalid JSON in discovery batch %s; skipping.", i)
+                    continue
+
+                new_topics = {k: v for k, v in topics.items() if k not in seen}
+                if not new_topics:
+                    log.info("ℹ️ No new topics in batch %s", i)
+                    continue
+
+                db.write_topics(self.discovered_table, new_topics)
+                seen.update(new_topics)
+                metrics.inc("topics_discovered_total", len(new_topics))
+                log.info("✅ Batch %s written (%d new topics)", i, len(new_topics))
+
+    def _discover_mapreduce(self, db: StorageBackend, batches: List[Sequence[HistoryEntry]]) -> None:
+        """Concurrent discovery calls, local near-duplicate merge, one bulk write."""
+        with metrics.timer("discovery.map"):
+            results = self._map_llm([self._discovery_prompt(b) for b in batches])
+        found = [r for r in results if r]
+        with metrics.timer("discovery.merge"):
+            merged = merge_similar_topics(found, self.cfg.TOPIC_MERGE_THRESHOLD)
+        raw = sum(len(r) for r in found)
+        metrics.inc("topics_merged_total", raw - len(merged))
+        if not merged:
+            log.warning("⚠️ No topics discovered (%d batches failed).", len(batches) - len(found))
+            return
+        db.write_topics(self.discovered_table, merged)
+        metrics.inc("topics_discovered_total", len(merged))
+        log.info(
+            "✅ %d topics from %d/%d batches merged into %d and written",
+            raw, len(found), len(batches), len(merged),
+        )
+
+    def _discovery_prompt(self, batch: Sequence[HistoryEntry]) -> str:
+        return TOPIC_DISCOVERY_PROMPT.format(
+            history_sample=json.dumps([e.__dict__ for e in batch], ensure_ascii=False),
+            domain=self.domain,
+        )
+
+    # ---------- Refinement ----------
+    def refine_topics(self) -> List[Tuple[str, str]]:
+        with metrics.scope(domain=self.domain, phase="refinement"), metrics.timer("pipeline.refine_topics"), self.repo as db:
+            if db.has_topics(self.refined_table, min_count=3):
+                return db.fetch_topics(self.refined_table)
+
+            topics = db.fetch_topics(self.discovered_table)
+            if self.cfg.DISCOVERY_MODE == "mapreduce":
+                refined = self._refine_tree(topics)
+            else:
+                prompt = TOPIC_REFINMENT_PROMPT.format(
+                    all_topics=format_topics(topics),
+                    domain=self.domain,
+                )
+                resp = self.llm(prompt)
+                refined = extract_json(resp)
+            db.write_topics(self.refined_table, refined)
+            log.info("✅ %d refined topics written", len(refined))
+            # Return normalized list[(name, description)] for reuse
+            return [(k, v) for k, v in refined.items()]
+
+    def _refine_tree(self, topics: Sequence[Tuple[str, str]]) -> Dict[str, Dict[str, object]]:
+        """Refine in levels of bounded prompts (REFINE_GROUP_SIZE topics each) until one call fits.
+
+        No prompt ever holds more than REFINE_GROUP_SIZE topics: if a level does not
+        shrink the set even after a looser local merge, the locally merged set is returned.
+        """
+        group_size = max(2, self.cfg.REFINE_GROUP_SIZE)
+        current: Dict[str, Dict[str, object]] = {name: {"description": desc} for name, desc in topics}
+        level = 0
+        while len(current) > group_size:
+            level += 1
+            groups = _chunk(list(current.items()), group_size)
+            with metrics.timer("refine.level", level=level):
+                results = self._map_llm([self._refinement_prompt(g) for g in groups])
+            # A failed group keeps its topics, so nothing is lost on a bad answer
+            reduced = merge_similar_topics(
+                [r if r else dict(g) for r, g in zip(results, groups)], self.cfg.TOPIC_MERGE_THRESHOLD
+            )
+            log.info("🌳 Refinement level %d: %d topics in %d groups -> %d", level, len(current), len(groups), len(reduced))
+            if len(reduced) >= len(current):
+                # Retry the local merge with a looser threshold rather than sending an unbounded prompt
+                reduced = merge_similar_topics([reduced], self.cfg.TOPIC_MERGE_THRESHOLD / 2)
+                if len(reduced) >= len(current):
+                    log.warning(
+                        "⚠️ Refinement level %d did not shrink the topic set; keeping %d locally merged topics.",
+                        level, len(reduced),
+                    )
+                    return reduced
+            current = reduced
+        return extract_json(self.llm(self._refinement_prompt(list(current.items()))))
+
+    def _refinement_prompt(self, topics: Sequence[Tuple[str, Dict[str, object]]]) -> str:
+        return TOPIC_REFINMENT_PROMPT.format(
+            all_topics=format_topics([(name, details.get("description")) for name, details in topics]),
+            domain=self.domain,
+        )
+
+    # ---------- Map helpers ----------
+    def _map_llm(self, prompts: List[str]) -> List[Optional[Dict[str, Dict[str, object]]]]:
+        """Send topic prompts concurrently (DISCOVERY_WORKERS threads); parsed answers in prompt order."""
+        with ThreadPoolExecutor(max_workers=max(1, self.cfg.DISCOVERY_WORKERS)) as ex:
+            # Each task runs in a copy of the caller's context so metrics keep the domain/phase scope
+            futures = [ex.submit(contextvars.copy_context().run, self._ask_topics, p) for p in prompts]
+            return [f.result() for f in futures]
+
+    def _ask_topics(self, prompt: str) -> Optional[Dict[str, Dict[str, object]]]:
+        """One topic prompt; None when the call fails or the answer is not a topic object."""
+        try:
+            topics = extract_json(self.llm(prompt))
+        except Exception as exc:
+            log.warning("⚠️ Topic call failed: %s", exc)
+            return None
+        if not isinstance(topics, dict) or not topics:
+            log.warning("⚠️ Invalid JSON in topic answer; skipping.")
+            return None
+        return topics
+
+    # ---------- Classification ----------
+    def classify(
+        self,
+        entries: Iterable[HistoryEntry],
+        heartbeat: Optional[Callable[[], None]] = None,
+        shard: Optional[Tuple[int, int]] = None,
+        budget: Optional[LLMBudget] = None,
+    ) -> bool:
+        """Classify and write `entries`; False if stopped early (no training data for the local model).
+
+        `heartbeat` is called after every batch (shard workers renew their lease there);
+        `shard` = (shard, n_shards) limits the already-classified lookup to that shard.
+        With `budget`, LLM_LIMIT and the local model are shared with the other workers;
+        otherwise the limit counts the already-classified URLs read here.
+        """
+        with metrics.scope(domain=self.domain, phase="classification"), metrics.timer("pipeline.classify"), self.repo as db:
+            db.ensure_classification_table(self.classification_table)
+
+            already = db.distinct_classified_urls(self.classification_table, self.domain, *(shard or (None, 1)))
+            done_count = len(already)
+            log.info("Skipping %d already-classified URLs.", len(already))
+
+            topics_json = json.dumps(
+                [
+                    {"name": name, "description": desc}
+                    for name, desc in db.fetch_topics(self.refined_table)
+                ]
+            )
+
+            # Local classifier cache, loaded on the first batch past the LLM limit
+            titles: List[str] = []
+            labels: List[List[str]] = []
+            clf: Optional["ClassifierArtifact"] = None
+
+            buffer: List[Dict[str, object]] = []
+
+            def _flush() -> None:
+                if len(buffer) >= self.cfg.INSERT_BATCH:
+                    db.write_classifications(self.classification_table, self.domain, buffer)
+                    buffer.clear()
+
+            # Deduplicate + filter
+            def _distinct(elems: Iterable[HistoryEntry]) -> Iterator[HistoryEntry]:
+                seen_urls: Set[str] = set()
+                for e in elems:
+                    if e.url in seen_urls or e.url in already:
+                        continue
+                    seen_urls.add(e.url)
+                    yield e
+
+            # Deterministic rules before any model/LLM call: entries hit by a final
+            # rule are written directly, topics of other hits are merged in later
+            rules = load_rules(self.cfg.RULES_PATH, self.domain, self.cfg.scrolling_list)
+            rule_topics: Dict[str, Tuple[str, ...]] = {}
+
+            def _pre_classify(elems: Iterable[HistoryEntry]) -> Iterator[HistoryEntry]:
+                for block in _chunk_iter(elems, self.cfg.RULES_BATCH):
+                    if rules is None:
+                        yield from block
+                        continue
+                    with metrics.timer("rules.match"):
+                        matches = rules.match([e.url for e in block], [e.title for e in block])
+                    ruled = 0
+                    for e, m in zip(block, matches):
+                        if m is not None and m.final:
+                            buffer.append({"title": e.title, "url": e.url, "topics": list(m.topics), "source": "rules"})
+                            ruled += 1
+                            _flush()
+                            continue
+                        if m is not None:
+                            rule_topics[e.url] = m.topics
+                        yield e
+                    metrics.inc("rows_classified_total", ruled, source="rules")
+
+            def _with_rules(url: str, topics: List[str]) -> List[str]:
+                extra = rule_topics.pop(url, ())
+                return topics + [t for t in extra if t not in topics]
+
+            finished = True
+            for batch in _chunk_iter(_pre_classify(_distinct(entries)), self.cfg.CLASSIFY_BATCH):
+                use_llm = budget.take(len(batch)) if budget is not None else done_count < self.cfg.LLM_LIMIT
+                if use_llm:
+                    mapping = _classify_batch_llm(batch, topics_json, self.domain, self.llm)
+                    for e in batch:
+                        topics = _with_rules(e.url, mapping.get(e.url, []))
+                        buffer.append({"title": e.title, "url": e.url, "topics": topics, "source": "llm"})
+                        if topics:
+                            titles.append(e.title)
+                            labels.append(topics)
+                    done_count += len(batch)
+                    metrics.inc("rows_classified_total", len(batch), source="llm")
+                else:
+                    if clf is None:
+                        clf = _load_local_classifier(self.cfg.MODEL_PATH)
+                    if clf is None and budget is not None:
+                        clf = self._shared_classifier(db, budget, heartbeat)
+                    elif clf is None and titles:
+                        clf = _train_local_classifier(titles, labels, self.cfg.MODEL_PATH)
+                    if clf is None:
+                        log.warning("⚠️ No training data available for classifier; stopping.")
+                        finished = False
+                        break
+                    with metrics.timer("classifier.predict"):
+                        predicted = iter(clf.predict([e.title for e in batch if e.title]))
+                        for e in batch:
+                            topics = _with_rules(e.url, next(predicted) if e.title else ["None"])
+                            buffer.append({"title": e.title, "url": e.url, "topics": topics, "source": "local"})
+                    metrics.inc("rows_classified_total", len(batch), source="local")
+
+                _flush()
+                if heartbeat is not None:
+                    heartbeat()
+
+            if buffer:
+                db.write_classifications(self.classification_table, self.domain, buffer)
+            return finished
+
+    def _shared_classifier(
+        self, db: StorageBackend, budget: LLMBudget, heartbeat: Optional[Callable[[], None]]
+    ) -> Optional["ClassifierArtifact"]:
+        """Past the shared LLM budget: train the shared local model, or wait while another worker does.
+
+        Training uses the latest LLM_LIMIT LLM classifications of the domain, whichever
+        worker wrote them (not the rows labelled by rules or the local model). None when
+        there is nothing to train on.
+        """
+        poll = min(2.0, self.cfg.LEASE_SECONDS / 4)
+        waiting = False
+        while True:
+            if budget.claim_training():
+                try:
+                    # The previous claim holder may have saved it in the meantime
+                    clf = _load_local_classifier(self.cfg.MODEL_PATH)
+                    if clf is not None:
+                        return clf
+                    with db:
+                        rows = db.fetch_classifications(
+                            self.classification_table, self.domain, self.cfg.LLM_LIMIT, source="llm"
+                        )
+                    labelled = [(title, topics) for title, topics in rows if title and topics]
+                    if not labelled:
+                        return None
+                    return self._train_keeping_leases(labelled, budget, heartbeat, poll)
+                finally:
+                    budget.release_training()
+            if not waiting:
+                log.info("⏳ LLM budget of %s spent; waiting for the local classifier.", self.domain)
+                waiting = True
+            with metrics.timer("classifier.wait"):
+                time.sleep(poll)
+            if heartbeat is not None:
+                heartbeat()  # keep the shard while waiting
+            clf = _load_local_classifier(self.cfg.MODEL_PATH)
+            if clf is not None:
+                return clf
+
+    def _train_keeping_leases(
+        self,
+        labelled: List[Tuple[str, List[str]]],
+        budget: LLMBudget,
+        heartbeat: Optional[Callable[[], None]],
+        poll: float,
+    ) -> "ClassifierArtifact":
+        """Train in a background thread while this one renews the training claim and the shard lease.
+
+        The repository session stays on this thread; training never touches it.
+        """
+        titles = [title for title, _ in labelled]
+        labels = [topics for _, topics in labelled]
+        with ThreadPoolExecutor(max_workers=1) as ex:
+            future = ex.submit(
+                contextvars.copy_context().run, _train_local_classifier, titles, labels, self.cfg.MODEL_PATH
+            )
+            while not wait([future], timeout=poll).done:
+                if not budget.claim_training():
+                    # Another worker may train too; the artifact swap keeps that safe
+                    log.warning("⚠️ %s lost the training claim of %s", budget.worker, self.domain)
+                if heartbeat is not None:
+                    heartbeat()
+            return future.result()
+
+    # ---------- Sharded workers ----------
+    def run_worker(self, worker: Optional[str] = None) -> int:
+        """Claim and classify shards of the domain until none is left; returns the number completed.
+
+        Any number of workers (processes, containers) can run this on the same
+        domain against a shared store; see leases.py. Topics must be refined first.
+        """
+        worker = worker or default_worker_id()
+        table = self.cfg.LEASE_TABLE
+        completed = 0
+        with metrics.scope(domain=self.domain, phase="classification"), self.repo as db:
+            with db:
+                db.ensure_lease_table(table)
+                n_shards = db.init_shards(table, self.domain, self.cfg.CLASSIFY_SHARDS)
+                db.ensure_classification_table(self.classification_table)
+                db.ensure_budget_table(self.cfg.BUDGET_TABLE)
+                # Starts at the URLs already classified, as LLM_LIMIT does for a single process
+                used = db.count_classified_urls(self.classification_table, self.domain)
+                db.init_budget(self.cfg.BUDGET_TABLE, self.domain, used)
+            budget = LLMBudget(db, self.cfg.BUDGET_TABLE, self.domain, worker, self.cfg.LLM_LIMIT, self.cfg.LEASE_SECONDS)
+            while True:
+                with db:
+                    shard = db.claim_shard(table, self.domain, worker, self.cfg.LEASE_SECONDS)
+                if shard is None:
+                    break
+                lease = ShardLease(db, table, self.domain, shard, worker, self.cfg.LEASE_SECONDS)
+                log.info("🔒 %s claimed shard %d/%d of %s", worker, shard, n_shards, self.domain)
+                # Materialized so the lease checkpoints never commit under an open cursor
+                entries = list(db.fetch_history_by_domain(self.domain, shard=shard, n_shards=n_shards))
+                try:
+                    finished = self.classify(entries, heartbeat=lease.heartbeat, shard=(shard, n_shards), budget=budget)
+                except LeaseLost as exc:
+                    log.warning("⚠️ %s; moving on.", exc)
+                    continue
+                if not finished:
+                    lease.release()
+                    break
+                if lease.complete():
+                    completed += 1
+                    metrics.inc("shards_completed_total")
+                    log.info("✅ %s completed shard %d/%d (%d URLs)", worker, shard, n_shards, len(entries))
+                else:
+                    log.warning("⚠️ %s lost shard %d before completing it", worker, shard)
+        return completed
+
+    def reset_shards(self) -> None:
+        """Reopen every shard of the domain, e.g. after new history was loaded; the LLM budget restarts too."""
+        with self.repo as db:
+            db.ensure_lease_table(self.cfg.LEASE_TABLE)
+            db.reset_shards(self.cfg.LEASE_TABLE, self.domain)
+            db.ensure_classification_table(self.classification_table)
+            db.ensure_budget_table(self.cfg.BUDGET_TABLE)
+            used = db.count_classified_urls(self.classification_table, self.domain)
+            db.init_budget(self.cfg.BUDGET_TABLE, self.domain, used, reset=True)
+
+
+# ===================
+# Helper functions
+# ===================
+
+def _chunk(data: Sequence, size: int) -> List[Sequence]:
+    return [data[i : i + size] for i in range(0, len(data), size)]
+
+
+def _chunk_iter(it: Iterable, size: int) -> Iterator[List]:
+    buf: List = []
+    for x in it:
+        buf.append(x)
+        if len(buf) == size:
+            yield buf
+            buf = []
+    if buf:
+        yield buf
+
+
+def _classify_batch_llm(
+    batch: Sequence[HistoryEntry],
+    topics_json: str,
+    domain: str,
+    llm: Callable[[str], str] = call_llm,
+) -> Dict[str, List[str]]:
+    mapping: Dict[str, List[str]] = {}
+    payload = [{"title": e.title, "url": e.url} for e in batch]
+
+    if payload:
+        prompt = BATCH_TOPIC_ASSIGNMENT_PROMPT.format(
+            urls=json.dumps(payload, indent=2), topics_json=topics_json, domain=domain
+        )
+        resp = llm(prompt)
+        try:
+            out = extract_json(resp)
+            for url, obj in out.items():
+                mapping[url] = obj.get("classes", ["None"]) or ["None"]
+        except Exception as exc:
+            metrics.inc("llm_batch_failures_total")
+            log.warning("⚠️ Failed batch classification: %s", exc)
+        metrics.inc("llm_missing_urls_total", sum(1 for e in batch if e.url not in mapping))
+
+    return mapping
+
+
+@metrics.timed("classifier.train")
+def _train_local_classifier(titles: List[str], labels: List[List[str]], model_path: str) -> "ClassifierArtifact":
+    # sklearn is only needed to train; inference runs on the memory-mapped artifact
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.multiclass import OneVsRestClassifier
+    from sklearn.pipeline import Pipeline
+    from sklearn.preprocessing import MultiLabelBinarizer
+
+    from src.topic_modeling.classifier_artifact import (ClassifierArtifact,
+                                                        artifact_path,
+                                                        save_artifact)
+
+    mlb = MultiLabelBinarizer()
+    y = mlb.fit_transform(labels)
+
+    clf = Pipeline(
+        [
+            ("tfidf", TfidfVectorizer(max_features=20_000, ngram_range=(1, 2))),
+            ("clf", OneVsRestClassifier(LogisticRegression(max_iter=1000))),
+        ]
+    )
+    clf.fit(titles, y)
+    path = save_artifact(clf, mlb, artifact_path(model_path))
+    log.info("✅ Classifier trained and saved to %s", path)
+    return ClassifierArtifact.load(path)
+
+
+@metrics.timed("classifier.load")
+def _load_local_classifier(model_path: str) -> Optional["ClassifierArtifact"]:
+    from src.topic_modeling.classifier_artifact import (ClassifierArtifact,
+                                                        artifact_exists,
+                                                        artifact_path,
+                                                        convert_joblib,
+                                                        legacy_path)
+
+    path = artifact_path(model_path)
+    if not artifact_exists(path) and os.path.exists(legacy_path(model_path)):
+        log.info("🔄 Converting %s to a memory-mapped artifact", legacy_path(model_path))
+        convert_joblib(legacy_path(model_path), path)
+    if artifact_exists(path):
+        log.info("📂 Loading classifier from %s", path)
+        return ClassifierArtifact.load(path)
+    return None
\ No newline at end of file
@@ -0,0 +1,296 @@
+"""
+rules.py
+
+Deterministic pre-classification from a declarative per-domain rules file,
+applied before the local model or the LLM sees an entry.
+
+Rules file (JSON, `RULES_PATH`): keys are domains as passed to the pipeline,
+"*" applies to every domain. Each rule has a name, topics, one matcher and an
+optional `final` flag:
+
+    {
+      "*": [
+        {"name": "login", "path": "/(login|signin)\\b", "topics": ["Account"], "final": true}
+      ],
+      "reddit.com": [
+        {"name": "feed", "url_contains": ["/r/popular", "/r/all"], "topics": ["Scrolling"]},
+        {"name": "patch_notes", "title": "patch notes", "ignore_case": true, "topics": ["Gaming"], "final": true}
+      ]
+    }
+
+- `url_contains`: literal substring(s) anywhere in the URL
+- `path`: regex matched at the start of the URL path, right after "scheme://host"
+- `title`: regex searched anywhere in the title (`^`/`$` anchor to the title)
+
+Entries hit by a `final` rule are labelled with the rule topics and skip the
+model/LLM. Topics of non-final rules are added to whatever the model/LLM
+returns. `SCROLLING_URLS` is migrated into a non-final "scrolling_urls" rule.
+
+Rules of each kind are compiled into one alternation, and a block of entries
+is scanned in one pass per kind over the newline-joined URLs (resp. titles),
+so the regex engine's prefix search does the work; rules hitting most of a
+block are checked per entry instead (see `_Kind`). Results do not depend on
+rule order, and a match never spans two entries.
+"""
+
+import json
+import os
+import re
+from collections import Counter
+from dataclasses import dataclass
+from itertools import compress, repeat
+from operator import contains
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from src.topic_modeling.metrics import metrics
+
+# Host after "://", in front of the alternation of `path` rules in the scan; it
+# may also hit a "://" later in the URL, which the per-line check rejects
+_HOST = r"://[^/?#\n]*"
+# "scheme://host" at the start of the URL, in front of each `path` rule in the check
+_URL_PREFIX = r"(?i:[a-z][a-z0-9+.-]*)://[^/?#]*"
+
+# Share of a block's entries above which a rule is checked per entry
+_DENSE = 0.15
+
+
+@dataclass(frozen=True)
+class Rule:
+    name: str
+    topics: Tuple[str, ...]
+    final: bool = False
+    url_contains: Tuple[str, ...] = ()
+    path: Optional[str] = None
+    title: Optional[str] = None
+    ignore_case: bool = False
+
+    @classmethod
+    def from_dict(cls, d: Dict[str, object]) -> "Rule":
+        url_contains = d.get("url_contains") or ()
+        if isinstance(url_contains, str):
+            url_contains = (url_contains,)
+        rule = cls(
+            name=str(d["name"]),
+            topics=tuple(d.get("topics", ())),
+            final=bool(d.get("final", False)),
+            url_contains=tuple(url_contains),
+            path=d.get("path"),
+            title=d.get("title"),
+            ignore_case=bool(d.get("ignore_case", False)),
+        )
+        matchers = sum(1 for m in (rule.url_contains, rule.path, rule.title) if m)
+        if matchers != 1:
+            raise ValueError(f"Rule {rule.name!r} needs exactly one of url_contains, path, title")
+        if not rule.topics:
+            raise ValueError(f"Rule {rule.name!r} has no topics")
+        return rule
+
+    def pattern(self) -> str:
+        if self.url_contains:
+            body = "|".join(re.escape(s) for s in self.url_contains)
+        elif self.path:
+            body = self.path.lstrip("^")
+        else:
+            body = self.title
+        return f"(?i:{body})" if self.ignore_case else f"(?:{body})"
+
+
+@dataclass(frozen=True)
+class RuleMatch:
+    topics: Tuple[str, ...]
+    final: bool
+    rules: Tuple[str, ...]
+
+
+class _RuleCheck:
+    """One rule: its pattern, its per-entry check and whether it hits densely."""
+
+    def __init__(self, index: int, rule: Rule, check_prefix: Optional[str]):
+        self.index = index
+        self.pattern = rule.pattern()
+        # Anchored at the start of the entry for `path` rules, searched otherwise
+        if check_prefix is None:
+            self.check = re.compile(self.pattern).search
+        else:
+            self.check = re.compile(check_prefix + self.pattern).match
+        # Case-sensitive literals without a newline are checked per entry with `in`
+        self.literals = () if rule.ignore_case or any("\n" in s for s in rule.url_contains) else rule.url_contains
+        self.dense = False
+
+    def per_entry(self, texts: List[str]) -> Set[int]:
+        index = range(len(texts))
+        if not self.literals:
+            return set(compress(index, map(self.check, texts)))
+        hits: Set[int] = set()
+        for literal in self.literals:
+            if len(hits) == len(texts):
+                break
+            hits.update(compress(index, map(contains, texts, repeat(literal))))
+        return hits
+
+
+class _Kind:
+    """Rules of one kind (substring, path or title), scanned together over one field.
+
+    The rules are compiled into one alternation and a block is scanned in one
+    pass over the newline-joined texts. The scan is a prefilter: each line it
+    hits is checked on its own against every rule (path rules anchored at the
+    real host), so overlapping rules all fire and a match never spans two
+    entries, and the scan resumes at the next line. A lone `url_contains`
+    rule needs no check, as its literals can only hit inside one entry.
+
+    A rule that hit more than `_DENSE` of the previous block is checked per
+    entry instead and left out of the alternation: past that ratio, locating
+    and re-checking the hits costs more than checking every entry.
+    """
+
+    def __init__(
+        self, field: str, rules: List[Tuple[int, Rule]], scan_prefix: str = "", check_prefix: Optional[str] = None
+    ):
+        self.field = field
+        self.rules = [_RuleCheck(i, r, check_prefix) for i, r in rules]
+        self.scan_prefix = scan_prefix
+        self._scans: Dict[Tuple[int, ...], "re.Pattern"] = {}
+
+    def lines(self, block: "_Block") -> Dict[int, Set[int]]:
+        """Entries of `block` hit by each rule (by rule index)."""
+        found: Dict[int, Set[int]] = {}
+        sparse = []
+        for rule in self.rules:
+            if rule.dense:
+                found[rule.index] = rule.per_entry(block.texts)
+            else:
+                sparse.append(rule)
+        if sparse:
+            found.update(self._scan_lines(sparse, block))
+        for rule in self.rules:
+            rule.dense = len(found.get(rule.index, ())) > _DENSE * len(block.texts)
+        return found
+
+    def _scan(self, rules: List[_RuleCheck]) -> "re.Pattern":
+        key = tuple(r.index for r in rules)
+        scan = self._scans.get(key)
+        if scan is None:
+            # MULTILINE so ^/$ anchor at each entry of the block
+            body = "|".join(r.pattern for r in rules)
+            scan = self._scans[key] = re.compile(f"{self.scan_prefix}(?:{body})", re.MULTILINE)
+        return scan
+
+    def _scan_lines(self, rules: List[_RuleCheck], block: "_Block") -> Dict[int, Set[int]]:
+        found: Dict[int, Set[int]] = {}
+        text, texts = block.text, block.texts
+        search = self._scan(rules).search
+        # A lone literal rule owns every hit; otherwise the hit line is checked
+        trusted = rules[0] if len(rules) == 1 and rules[0].literals else None
+        line = prev = pos = 0
+        while True:
+            m = search(text, pos)
+            if m is None:
+                break
+            start = text.rfind("\n", 0, m.start()) + 1
+            # Line number from the newlines since the previous hit (C-level count)
+            line += text.count("\n", prev, start)
+            prev = start
+            entry = texts[line]
+            if trusted is not None:
+                found.setdefault(trusted.index, set()).add(line)
+            else:
+                for rule in rules:
+                    if rule.check(entry):
+                        found.setdefault(rule.index, set()).add(line)
+            pos = start + len(entry) + 1
+        return found
+
+
+class RuleSet:
+    """Rules of one domain, scanned per kind (substring, path, title) over blocks of entries."""
+
+    def __init__(self, rules: Sequence[Rule]):
+        self.rules = list(rules)
+        self.hits: Counter = Counter()
+        kinds = (
+            ("url", lambda r: bool(r.url_contains), {}),
+            ("url", lambda r: bool(r.path), {"scan_prefix": _HOST, "check_prefix": _URL_PREFIX}),
+            ("title", lambda r: bool(r.title), {}),
+        )
+        self._kinds = [
+            _Kind(field_name, selected, **options)
+            for field_name, kind, options in kinds
+            for selected in [[(i, r) for i, r in enumerate(self.rules) if kind(r)]]
+            if selected
+        ]
+        self._matches: Dict[int, RuleMatch] = {}
+
+    def match(self, urls: Sequence[str], titles: Sequence[str]) -> List[Optional[RuleMatch]]:
+        """Return a `RuleMatch` (or None) per entry and update the per-rule hit counters."""
+        blocks: Dict[str, _Block] = {}
+        found: List[Tuple[int, Set[int]]] = []
+        for kind in self._kinds:
+            if kind.field not in blocks:
+                blocks[kind.field] = _Block(urls if kind.field == "url" else titles)
+            found.extend((1 << i, lines) for i, lines in kind.lines(blocks[kind.field]).items() if lines)
+
+        # Entry index -> bitmask of the rules hitting it, seeded with the rule
+        # hitting most entries so a dense rule costs no Python-level loop
+        hit_rules: Dict[int, int] = {}
+        found.sort(key=lambda f: len(f[1]), reverse=True)
+        for bit, lines in found:
+            if not hit_rules:
+                hit_rules = dict.fromkeys(lines, bit)
+                continue
+            get = hit_rules.get
+            for line in lines:
+                hit_rules[line] = get(line, 0) | bit
+
+        per_match = {self._rule_match(mask): n for mask, n in Counter(hit_rules.values()).items()}
+        # Entries without a hit map to mask None, and None to no match
+        out: List[Optional[RuleMatch]] = list(map(self._matches.get, map(hit_rules.get, range(len(urls)))))
+
+        counts: Counter = Counter()
+        for m, n in per_match.items():
+            for name in m.rules:
+                counts[name] += n
+        self.hits.update(counts)
+        for name, n in counts.items():
+            metrics.inc("rule_hits_total", n, rule=name)
+        return out
+
+    def _rule_match(self, mask: int) -> RuleMatch:
+        # Few distinct rule combinations occur, so their merged result is cached
+        m = self._matches.get(mask)
+        if m is None:
+            rules = [r for i, r in enumerate(self.rules) if mask >> i & 1]
+            topics: List[str] = []
+            for rule in rules:
+                topics.extend(t for t in rule.topics if t not in topics)
+            m = self._matches[mask] = RuleMatch(
+                topics=tuple(topics), final=any(r.final for r in rules), rules=tuple(r.name for r in rules)
+            )
+        return m
+
+
+class _Block:
+    """Texts of one field of a block, joined one per line."""
+
+    def __init__(self, texts: Sequence[str]):
+        texts = [t or "" for t in texts] if None in texts else list(texts)
+        text = "\n".join(texts)
+        if text.count("\n") != len(texts) - 1:  # embedded newlines would shift line numbers
+            texts = [t.replace("\n", " ") for t in texts]
+            text = "\n".join(texts)
+        self.texts = texts
+        self.text = text
+
+
+def load_rules(path: str, domain: str, scrolling_urls: Iterable[str] = ()) -> Optional[RuleSet]:
+    """Compile the "*" and `domain` rules of `path` (if it exists) plus the SCROLLING_URLS rule."""
+    raw: List[Dict[str, object]] = []
+    if path and os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            spec = json.load(f)
+        raw = list(spec.get("*", [])) + list(spec.get(domain, []))
+    rules = [Rule.from_dict(d) for d in raw]
+    scrolling_urls = tuple(scrolling_urls)
+    if scrolling_urls:
+        rules.append(Rule(name="scrolling_urls", topics=("Scrolling",), url_contains=scrolling_urls))
+    return RuleSet(rules) if rules else None
@@ -0,0 +1,151 @@
+"""
+storage.py
+
+Storage-backend interface used by `TopicModelingPipeline`, and the factory that
+picks an implementation from `AppConfig.STORAGE_BACKEND`:
+
+- "snowflake" – `SnowflakeRepository` (db.py), the warehouse itself.
+- "duckdb"    – `DuckDBRepository` (duckdb_repository.py), an embedded columnar
+                file for local / backfill runs, exported to Snowflake afterwards.
+"""
+
+import sys
+from abc import ABC, abstractmethod
+from typing import Dict, Iterator, List, Optional, Sequence, Set, Tuple
+
+from src.topic_modeling.config import AppConfig
+from src.topic_modeling.data_models import HistoryEntry
+
+
+class StorageBackend(ABC):
+    """Operations the pipeline needs from a store.
+
+    Backends are context managers: methods are only valid inside `with repo:`,
+    which delimits one transaction (committed on success, rolled back on error).
+    """
+
+    @abstractmethod
+    def __enter__(self) -> "StorageBackend": ...
+
+    @abstractmethod
+    def __exit__(self, exc_type, exc, tb): ...
+
+    # ---- Classification table ----
+    # One table for all domains (`CLASSIFICATION_TABLE`), keyed by (domain, url).
+    # Writes are upserts, so re-classifying a URL replaces its row instead of duplicating it.
+    # Each row records its `source` ("rules", "llm" or "local"; NULL for migrated rows).
+    @abstractmethod
+    def ensure_classification_table(self, table: str) -> None: ...
+
+    @abstractmethod
+    def distinct_classified_urls(
+        self, table: str, domain: str, shard: Optional[int] = None, n_shards: int = 1
+    ) -> Set[str]:
+        """Classified URLs of `domain`, or of one of its `n_shards` hash shards (same split as the history)."""
+
+    @abstractmethod
+    def count_classified_urls(self, table: str, domain: str) -> int: ...
+
+    @abstractmethod
+    def write_classifications(self, table: str, domain: str, entries: Sequence[Dict[str, object]]) -> None:
+        """Upsert `entries` (dicts with url, title, topics and source); the last copy of a URL wins."""
+
+    @abstractmethod
+    def migrate_classifications(self, legacy_table: str, table: str, domain: str) -> bool:
+        """Copy a legacy per-domain table into `table` (existing keys are kept); False if it does not exist."""
+
+    @abstractmethod
+    def fetch_classifications(
+        self, table: str, domain: str, limit: int, source: Optional[str] = None
+    ) -> List[Tuple[str, List[str]]]:
+        """(title, topics) of the `limit` most recently classified URLs of `domain` (only those
+        labelled by `source` if given), e.g. to train the local model on LLM answers."""
+
+    # ---- Shard leases (see leases.py) ----
+    # Expiry is epoch seconds; claim/renew/complete/release are single conditional
+    # UPDATEs, so concurrent workers cannot both own a shard.
+    @abstractmethod
+    def ensure_lease_table(self, table: str) -> None: ...
+
+    @abstractmethod
+    def init_shards(self, table: str, domain: str, n_shards: int) -> int:
+        """Create the shard rows of `domain` if it has none; returns its shard count."""
+
+    @abstractmethod
+    def reset_shards(self, table: str, domain: str) -> None:
+        """Mark every shard of `domain` as not done and unowned, for a new pass."""
+
+    @abstractmethod
+    def claim_shard(self, table: str, domain: str, worker: str, lease_seconds: float) -> Optional[int]:
+        """Take a shard that is not done and unowned or expired; None when there is none."""
+
+    @abstractmethod
+    def renew_lease(self, table: str, domain: str, shard: int, worker: str, lease_seconds: float) -> bool: ...
+
+    @abstractmethod
+    def complete_shard(self, table: str, domain: str, shard: int, worker: str) -> bool: ...
+
+    @abstractmethod
+    def release_shard(self, table: str, domain: str, shard: int, worker: str) -> None: ...
+
+    # ---- Shared LLM budget (see leases.py) ----
+    # One row per domain: rows sent to the LLM so far, and who trains the local model.
+    @abstractmethod
+    def ensure_budget_table(self, table: str) -> None: ...
+
+    @abstractmethod
+    def init_budget(self, table: str, domain: str, used: int, reset: bool = False) -> None:
+        """Create the budget row of `domain` starting at `used` rows (or overwrite it with `reset`)."""
+
+    @abstractmethod
+    def take_budget(self, table: str, domain: str, n: int, limit: int) -> bool:
+        """Add `n` rows to the budget unless it already reached `limit`; False when exhausted."""
+
+    @abstractmethod
+    def claim_training(self, table: str, domain: str, worker: str, lease_seconds: float) -> bool:
+        """Become the one worker training the local model of `domain` (until the claim expires)."""
+
+    @abstractmethod
+    def release_training(self, table: str, domain: str, worker: str) -> None: ...
+
+    # ---- Topic tables ----
+    @abstractmethod
+    def has_topics(self, table: str, min_count: int = 20) -> bool: ...
+
+    @abstractmethod
+    def fetch_topics(self, table: str) -> List[Tuple[str, str]]: ...
+
+    @abstractmethod
+    def write_topics(self, table: str, topics: Dict[str, Dict[str, object]]) -> None: ...
+
+    # ---- History ----
+    @abstractmethod
+    def count_history_urls(self, domain: str) -> int: ...
+
+    @abstractmethod
+    def fetch_history_by_domain(
+        self, domain: str, limit: Optional[int] = None, shard: Optional[int] = None, n_shards: int = 1
+    ) -> Iterator[HistoryEntry]:
+        """Stream the history of `domain`; with `shard`, only URLs whose hash falls in that shard (filtered in SQL)."""
+
+
+def make_repository(cfg: Optional[AppConfig] = None) -> StorageBackend:
+    """Build the backend selected by `cfg.STORAGE_BACKEND`."""
+    cfg = cfg or AppConfig()
+    backend = cfg.STORAGE_BACKEND.lower()
+    if backend == "snowflake":
+        from src.topic_modeling.db import SnowflakeRepository
+
+        return SnowflakeRepository()
+    if backend == "duckdb":
+        from src.topic_modeling.duckdb_repository import DuckDBRepository
+
+        return DuckDBRepository(cfg.LOCAL_DB_PATH)
+    raise ValueError(f"Unknown STORAGE_BACKEND: {cfg.STORAGE_BACKEND!r} (expected 'snowflake' or 'duckdb')")
+
+
+def close_connections() -> None:
+    """Dispose pooled Snowflake connections at shutdown; a no-op if the client was never imported."""
+    client = sys.modules.get("src.db.snowflake_client")
+    if client is not None:
+        client.dispose_engines()
@@ -0,0 +1,104 @@
+"""
+topic_merge.py
+
+Local (no LLM) merge of near-duplicate topics, used by map-reduce discovery
+between the concurrent discovery calls and each level of tree refinement.
+
+Two topics are merged when their normalized name tokens overlap by at least
+`threshold` (Jaccard), or by at least half of it when their descriptions
+overlap by `threshold` as well. Normalization lowercases, strips accents and
+punctuation, drops stop words and a plural "s", so "Video Games",
+"video-game" and "Jeux vidéo" style variants collapse within a language.
+Only topics sharing a name token are compared (inverted index), so merging
+stays near-linear in the number of topics.
+"""
+
+import re
+import unicodedata
+from typing import Dict, FrozenSet, Iterable, List, Tuple
+
+TopicDetails = Dict[str, object]
+
+MAX_EXAMPLES = 5
+
+_STOP_WORDS = frozenset(
+    "a an and or the of for in on to with about & de des du la le les et en au aux un une sur pour".split()
+)
+_NON_WORD = re.compile(r"[^a-z0-9]+")
+
+
+def _tokens(text: str) -> FrozenSet[str]:
+    ascii_text = unicodedata.normalize("NFKD", text or "").encode("ascii", "ignore").decode("ascii").lower()
+    words = (w for w in _NON_WORD.split(ascii_text) if w and w not in _STOP_WORDS)
+    tokens = frozenset(w[:-1] if len(w) > 3 and w.endswith("s") else w for w in words)
+    # Names without Latin letters or digits (e.g. "音楽") fall back to the whole normalized name,
+    # so identical names still merge instead of overwriting each other
+    return tokens or frozenset([" ".join(unicodedata.normalize("NFKC", text or "").casefold().split())])
+
+
+def _jaccard(a: FrozenSet[str], b: FrozenSet[str]) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def _union(values: Iterable[object], limit: int = MAX_EXAMPLES) -> List[object]:
+    out: List[object] = []
+    for v in values:
+        if v not in out:
+            out.append(v)
+            if len(out) == limit:
+                break
+    return out
+
+
+def merge_similar_topics(
+    topic_sets: Iterable[Dict[str, TopicDetails]], threshold: float = 0.8
+) -> Dict[str, TopicDetails]:
+    """Merge topic dicts (as returned by the discovery/refinement prompts) into one, collapsing near-duplicates.
+
+    The first-seen name of a group is kept, with the longest description and
+    the union of examples (capped at `MAX_EXAMPLES`).
+    """
+    items: List[Tuple[str, TopicDetails]] = [
+        (name, details if isinstance(details, dict) else {})
+        for topics in topic_sets
+        for name, details in (topics or {}).items()
+    ]
+    names = [_tokens(name) for name, _ in items]
+    descriptions = [_tokens(str(d.get("description", ""))) for _, d in items]
+
+    parent = list(range(len(items)))
+
+    def find(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    index: Dict[str, List[int]] = {}
+    for i, toks in enumerate(names):
+        candidates = {j for t in toks for j in index.get(t, ())}
+        for j in candidates:
+            if find(i) == find(j):
+                continue
+            name_sim = _jaccard(toks, names[j])
+            if name_sim >= threshold or (name_sim >= threshold / 2 and _jaccard(descriptions[i], descriptions[j]) >= threshold):
+                parent[find(i)] = find(j)
+        for t in toks:
+            index.setdefault(t, []).append(i)
+
+    groups: Dict[int, List[int]] = {}
+    for i in range(len(items)):
+        groups.setdefault(find(i), []).append(i)
+
+    merged: Dict[str, TopicDetails] = {}
+    for members in sorted(groups.values(), key=lambda m: m[0]):
+        name = items[members[0]][0]
+        details = [items[i][1] for i in members]
+        merged[name] = {
+            "description": max((str(d.get("description") or "") for d in details), key=len),
+            "example_domains": _union(x for d in details for x in d.get("example_domains", []) or []),
+            "example_titles": _union(x for d in details for x in d.get("example_titles", []) or []),
+        }
+    return merged
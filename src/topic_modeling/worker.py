@@ -0,0 +1,61 @@
+"""
+worker.py
+
+Sharded classification worker: claims shard leases of a domain and classifies
+them until every shard is done (see leases.py). Start as many as needed, on
+any number of machines, against the same store; topics must already be
+refined (run main.py, or discovery/refinement once, first).
+
+Usage (from the repository root):
+    python -m src.topic_modeling.worker reddit.com
+    python -m src.topic_modeling.worker reddit.com --worker-id node-3
+    python -m src.topic_modeling.worker reddit.com --reset   # reopen all shards after new history
+"""
+
+import argparse
+import logging
+import sys
+
+from src.topic_modeling.config import AppConfig, setup_logging
+from src.topic_modeling.leases import default_worker_id
+from src.topic_modeling.metrics import metrics, record_connection_stats
+from src.topic_modeling.pipeline import TopicModelingPipeline
+from src.topic_modeling.storage import close_connections
+
+log = logging.getLogger("topic_pipeline")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Claim and classify shards of a domain.")
+    parser.add_argument("domain")
+    parser.add_argument("--worker-id", default=None, help="Defaults to <hostname>-<pid>")
+    parser.add_argument("--reset", action="store_true", help="Reopen every shard of the domain and exit")
+    args = parser.parse_args(argv)
+
+    pipe = TopicModelingPipeline(args.domain)
+    if args.reset:
+        pipe.reset_shards()
+        log.info("🔄 Shards of %s reopened", args.domain)
+        return 0
+
+    with pipe.repo as db:
+        if not db.has_topics(pipe.refined_table, min_count=3):
+            log.error("❌ No refined topics for %s; run discovery and refinement first.", args.domain)
+            return 2
+
+    worker = args.worker_id or default_worker_id()
+    try:
+        completed = pipe.run_worker(worker)
+        log.info("🏁 %s completed %d shard(s) of %s", worker, completed, args.domain)
+    finally:
+        record_connection_stats()
+        if AppConfig().METRICS_DIR:
+            # One file per worker, so workers sharing METRICS_DIR do not overwrite each other
+            metrics.export(AppConfig().METRICS_DIR, run_name=f"topic_worker_{worker}")
+        close_connections()
+    return 0
+
+
+if __name__ == "__main__":
+    setup_logging()
+    sys.exit(main())
@@ -1,25 +1,9 @@
-{{ config(materialized="table") }}
-
-WITH base AS (
-    SELECT
-        id,
-        datetime,
-    FROM {{ source('chrome_history', 'raw_history') }}
-),
-
-enriched AS (
-    SELECT DISTINCT
-        id,
-        dayofweek(DATETIME) AS day_of_week,
-        extract(HOUR FROM DATETIME) as hour_of_day,
-        CASE
-            WHEN extract(hour from datetime) BETWEEN 7 AND 11 THEN 'Morning'
-            WHEN extract(hour from datetime) BETWEEN 12 AND 14 THEN 'Lunch'
-            WHEN extract(hour from datetime) BETWEEN 15 AND 18 THEN 'Afternoon'
-            WHEN extract(hour from datetime) BETWEEN 19 AND 23 THEN 'Evening'
-            ELSE 'Night'
-        END AS time_of_day
-    FROM base
-)
-
-SELECT * FROM enriched
+{{ config(materialized="table") }}
+
+-- Time buckets are computed at ingestion (src/parsers/enrich_history.py).
+SELECT
+    id,
+    day_of_week,
+    hour_of_day,
+    time_of_day
+FROM {{ source('chrome_history', 'raw_history') }}
@@ -0,0 +1,38 @@
+import os
+
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.linear_model import LogisticRegression
+from sklearn.multiclass import OneVsRestClassifier
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import MultiLabelBinarizer
+
+from src.topic_modeling import classifier_artifact as ca
+
+
+def _fit():
+    mlb = MultiLabelBinarizer()
+    y = mlb.fit_transform([["Food"], ["Sport"], ["Food", "Sport"], ["Music"]])
+    clf = Pipeline([("tfidf", TfidfVectorizer()), ("clf", OneVsRestClassifier(LogisticRegression()))])
+    clf.fit(["apple pie", "football match", "apple football", "guitar"], y)
+    return clf, mlb
+
+
+def test_saves_swap_the_current_version_and_prune_superseded_ones(tmp_path, monkeypatch):
+    monkeypatch.setattr(ca, "PRUNE_AFTER_SECONDS", 0)
+    clf, mlb = _fit()
+    path = str(tmp_path / "model")
+    ca.save_artifact(clf, mlb, path)
+    first = ca.current_version(path)
+    ca.save_artifact(clf, mlb, path)
+    assert ca.current_version(path) != first and not os.path.exists(first)
+    assert sorted(os.listdir(path)) == ["CURRENT", os.path.basename(ca.current_version(path))]
+    expected = [list(t) for t in mlb.inverse_transform(clf.predict(["apple pie", "guitar"]))]
+    assert ca.ClassifierArtifact.load(path).predict(["apple pie", "guitar"]) == expected
+
+
+def test_unversioned_artifact_still_loads(tmp_path):
+    clf, mlb = _fit()
+    path = str(tmp_path / "model")
+    version = ca.current_version(ca.save_artifact(clf, mlb, path))
+    assert ca.ClassifierArtifact.load(version).labels.tolist() == ["Food", "Music", "Sport"]
+    assert not ca.artifact_exists(str(tmp_path / "missing"))
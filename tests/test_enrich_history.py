@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+
+from src.parsers.enrich_history import ENRICHED_COLUMNS, HistoryEnricher, enrich_csv
+
+
+def _history(n=60, seed=0):
+    rng = np.random.default_rng(seed)
+    # Gaps from seconds to hours so every session and gap category shows up
+    gaps = rng.choice([3, 40, 150, 700, 1500, 20000], size=n)
+    start = pd.Timestamp("2024-03-02 23:50:00")
+    urls = ["https://www.reddit.com/r/python/comments/1", "https://News.Example.com", "https://x.com/a/b/c/d/e/f"]
+    return pd.DataFrame({
+        "datetime": [start + pd.Timedelta(seconds=int(s)) for s in np.cumsum(gaps)],
+        "title": [f"t{i}" for i in range(n)],
+        "url": [urls[i % len(urls)] for i in range(n)],
+    })
+
+
+def _as_csv_text(df, tmp_path, name):
+    # Compare as written to disk, so dtype differences of CSV round trips do not matter
+    path = tmp_path / name
+    df.to_csv(path, index=False)
+    return pd.read_csv(path, dtype=str, keep_default_na=False)
+
+
+def test_chunked_and_delta_runs_match_a_full_recompute(tmp_path):
+    df = _history()
+    full = HistoryEnricher()
+    expected = _as_csv_text(pd.concat([full.enrich(df), full.flush()], ignore_index=True), tmp_path, "full.csv")
+
+    chunked = HistoryEnricher()
+    parts = [chunked.enrich(df.iloc[i : i + 7]) for i in range(0, len(df), 7)] + [chunked.flush()]
+    assert _as_csv_text(pd.concat(parts, ignore_index=True), tmp_path, "chunked.csv").equals(expected)
+
+    # Deltas through the state file: the last row stays held back for the next delta
+    state = str(tmp_path / "state.json")
+    deltas = []
+    for i, (lo, hi) in enumerate([(0, 25), (25, 26), (26, len(df))]):
+        df.iloc[lo:hi].to_csv(tmp_path / f"delta{i}.csv", index=False)
+        enrich_csv(str(tmp_path / f"delta{i}.csv"), str(tmp_path / f"out{i}.csv"), state_path=state, chunksize=10)
+        deltas.append(pd.read_csv(tmp_path / f"out{i}.csv", dtype=str, keep_default_na=False))
+    assert pd.concat(deltas, ignore_index=True).equals(expected.iloc[:-1])
+
+
+def test_url_parts_follow_parse_url():
+    enricher = HistoryEnricher()
+    df = _history(n=3)
+    out = pd.concat([enricher.enrich(df), enricher.flush()], ignore_index=True)
+    assert set(ENRICHED_COLUMNS) <= set(out.columns)
+
+    reddit, news, deep = out.to_dict("records")
+    assert reddit["domain"] == "reddit.com" and reddit["path_level_1"] == "www.reddit.com"
+    assert reddit["domain_depth_3"] == "www.reddit.com/r/python" and reddit["path_level_6"] == ""
+    # Host case is kept (domain, the pipeline key, is lower case); no path gives NULL parts
+    assert news["domain"] == "news.example.com" and news["path_level_1"] == "News.Example.com"
+    assert news["path_level_2"] is None and news["domain_depth_2"] is None
+    assert deep["path_level_6"] == "e"
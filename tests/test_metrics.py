@@ -0,0 +1,55 @@
+import json
+
+import pytest
+
+from src.topic_modeling.metrics import MetricsRegistry
+
+
+def _recorded():
+    registry = MetricsRegistry(prefix="test")
+    with registry.scope(domain="reddit.com"):
+        registry.inc("rows_classified_total", 3, source="llm")
+        registry.inc("rows_classified_total", 2, source="llm")
+        registry.inc("rows_classified_total", 4, source="rules")
+        registry.observe("stage_seconds", 0.003, stage="llm.call", status="ok")
+        registry.observe("stage_seconds", 0.2, stage="llm.call", status="ok")
+    registry.inc("llm_cost_usd_total", 0.25)
+    return registry
+
+
+def test_prometheus_text_has_counters_and_cumulative_buckets():
+    lines = _recorded().to_prometheus().splitlines()
+
+    assert "# TYPE test_rows_classified_total counter" in lines
+    assert 'test_rows_classified_total{domain="reddit.com",source="llm"} 5' in lines
+    assert 'test_rows_classified_total{domain="reddit.com",source="rules"} 4' in lines
+    assert "test_llm_cost_usd_total 0.25" in lines
+
+    assert "# TYPE test_stage_seconds histogram" in lines
+    labels = 'domain="reddit.com",stage="llm.call",status="ok"'
+    assert f'test_stage_seconds_bucket{{{labels},le="0.001"}} 0' in lines
+    assert f'test_stage_seconds_bucket{{{labels},le="0.005"}} 1' in lines
+    assert f'test_stage_seconds_bucket{{{labels},le="0.25"}} 2' in lines
+    assert f'test_stage_seconds_bucket{{{labels},le="+Inf"}} 2' in lines
+    assert f"test_stage_seconds_count{{{labels}}} 2" in lines
+    assert f"test_stage_seconds_sum{{{labels}}} 0.203" in lines
+
+
+def test_json_summary_and_export(tmp_path):
+    registry = _recorded()
+    with pytest.raises(ValueError), registry.timer("classify"):
+        raise ValueError
+
+    prom_path, json_path = registry.export(str(tmp_path), run_name="run")
+    with open(prom_path, encoding="utf-8") as f:
+        assert f.read() == registry.to_prometheus()
+    with open(json_path, encoding="utf-8") as f:
+        summary = json.load(f)
+
+    assert summary["rows_classified"] == 9
+    assert summary["cost_usd"] == 0.25
+    call = summary["stages"]["stage_seconds{domain=reddit.com|stage=llm.call|status=ok}"]
+    assert call["count"] == 2 and call["p50_s"] == 0.005 and call["max_s"] == 0.2
+    assert summary["stages"]["stage_seconds{stage=classify|status=error}"]["count"] == 1
+    rules = {"name": "rows_classified_total", "labels": {"domain": "reddit.com", "source": "rules"}, "value": 4}
+    assert rules in summary["counters"]
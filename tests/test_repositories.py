@@ -0,0 +1,90 @@
+import pandas as pd
+import pytest
+
+from src.benchmarks.local_repository import LocalRepository
+
+DOMAIN = "reddit.com"
+TABLE = "URL_CLASSIFICATIONS"
+LEASES = "CLASSIFICATION_LEASES"
+URLS = [f"https://www.reddit.com/r/sub{i}/comments/{i * 7}" for i in range(200)]
+
+
+@pytest.fixture(params=["sqlite", "duckdb"])
+def repo(request, tmp_path):
+    rows = [(f"2024-01-01 00:{i // 60:02d}:{i % 60:02d}", f"title {i}", url, DOMAIN) for i, url in enumerate(URLS)]
+    if request.param == "duckdb":
+        pytest.importorskip("duckdb")
+        from src.topic_modeling.duckdb_repository import DuckDBRepository
+
+        repo = DuckDBRepository(str(tmp_path / "test.duckdb"))
+        repo.import_history(pd.DataFrame(rows, columns=["datetime", "title", "url", "domain"]))
+    else:
+        repo = LocalRepository(str(tmp_path / "test.sqlite"))
+        repo.load_history(rows)
+    with repo as db:
+        db.ensure_classification_table(TABLE)
+        db.ensure_lease_table(LEASES)
+    yield repo
+    repo.close()
+
+
+def _row(url, topics, source="llm"):
+    return {"url": url, "title": "t", "topics": topics, "source": source}
+
+
+def test_classification_writes_are_upserts(repo):
+    with repo as db:
+        db.write_classifications(TABLE, DOMAIN, [_row(URLS[0], ["A"]), _row(URLS[1], ["B"])])
+        db.write_classifications(TABLE, DOMAIN, [_row(URLS[0], ["C"], source="local")])
+        db.write_classifications(TABLE, "other.com", [_row(URLS[0], ["D"])])
+
+        assert db.count_classified_urls(TABLE, DOMAIN) == 2
+        assert db.distinct_classified_urls(TABLE, DOMAIN) == {URLS[0], URLS[1]}
+        assert sorted(topics for _, topics in db.fetch_classifications(TABLE, DOMAIN, 10)) == [["B"], ["C"]]
+        assert db.fetch_classifications(TABLE, DOMAIN, 10, source="llm") == [("t", ["B"])]
+
+
+def test_hash_shards_split_history_and_classifications_alike(repo):
+    n_shards = 4
+    with repo as db:
+        db.write_classifications(TABLE, DOMAIN, [_row(url, ["A"]) for url in URLS[::3]])
+        seen = set()
+        for shard in range(n_shards):
+            history = {e.url for e in db.fetch_history_by_domain(DOMAIN, shard=shard, n_shards=n_shards)}
+            assert history and not history & seen
+            seen |= history
+            classified = db.distinct_classified_urls(TABLE, DOMAIN, shard, n_shards)
+            assert classified == history & set(URLS[::3])
+        assert seen == set(URLS)
+
+
+def test_lease_claim_expiry_and_steal(repo):
+    with repo as db:
+        assert db.init_shards(LEASES, DOMAIN, 2) == 2
+        first = db.claim_shard(LEASES, DOMAIN, "w1", lease_seconds=60)
+        second = db.claim_shard(LEASES, DOMAIN, "w2", lease_seconds=-1)  # already expired
+        assert {first, second} == {0, 1}
+        assert db.claim_shard(LEASES, DOMAIN, "w3", lease_seconds=60) == second  # stolen
+
+        assert not db.renew_lease(LEASES, DOMAIN, second, "w2", 60)
+        assert not db.complete_shard(LEASES, DOMAIN, second, "w2")
+        assert db.renew_lease(LEASES, DOMAIN, second, "w3", 60)
+        assert db.complete_shard(LEASES, DOMAIN, second, "w3")
+
+        db.release_shard(LEASES, DOMAIN, first, "w1")
+        assert db.claim_shard(LEASES, DOMAIN, "w4", lease_seconds=60) == first
+        assert db.claim_shard(LEASES, DOMAIN, "w5", lease_seconds=60) is None  # done or held
+
+        db.reset_shards(LEASES, DOMAIN)
+        assert db.claim_shard(LEASES, DOMAIN, "w5", lease_seconds=60) is not None
+
+
+def test_newest_copy_of_a_duplicated_url_wins(repo):
+    with repo as db:
+        db.write_classifications(TABLE, DOMAIN, [_row(URLS[0], ["Old"]), _row(URLS[1], ["B"]), _row(URLS[0], ["New"])])
+        assert db.count_classified_urls(TABLE, DOMAIN) == 2
+        assert sorted(topics for _, topics in db.fetch_classifications(TABLE, DOMAIN, 10)) == [["B"], ["New"]]
+
+        db.write_classifications(TABLE, DOMAIN, [_row(URLS[1], ["Newer"], source="rules")])
+        assert sorted(topics for _, topics in db.fetch_classifications(TABLE, DOMAIN, 10)) == [["New"], ["Newer"]]
+        assert db.fetch_classifications(TABLE, DOMAIN, 10, source="rules") == [("t", ["Newer"])]
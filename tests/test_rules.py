@@ -0,0 +1,62 @@
+from src.topic_modeling.rules import Rule, RuleSet
+
+
+def _rule(name, **kwargs):
+    return Rule.from_dict({"name": name, "topics": [name.title()], **kwargs})
+
+
+def _names(ruleset, urls, titles=None):
+    titles = titles if titles is not None else [""] * len(urls)
+    return [m.rules if m else () for m in ruleset.match(urls, titles)]
+
+
+def test_path_rule_is_anchored_at_the_real_host():
+    rules = RuleSet([_rule("login", path="/(login|signin)\\b", final=True)])
+    urls = [
+        "https://www.reddit.com/r/python/comments/1?next=https://x.com/login",
+        "https://www.reddit.com/login",
+        "HTTP://reddit.com/signin?x=1",
+    ]
+    assert _names(rules, urls) == [(), ("login",), ("login",)]
+
+
+def test_anchored_title_rule_matches_every_entry_of_the_block():
+    rules = RuleSet([_rule("home", title="^Home$")])
+    titles = ["Home", "Not Home", "Home", "Homepage"]
+    assert _names(rules, [""] * 4, titles) == [("home",), (), ("home",), ()]
+
+
+def test_title_match_never_spans_two_entries():
+    rules = RuleSet([_rule("foobar", title="foo\\s+bar"), _rule("neg", title="x[^y]+z")])
+    titles = ["Some foo", "bar baz", "x", "z", "foo  bar", "xaz"]
+    assert _names(rules, [""] * 6, titles) == [(), (), (), (), ("foobar",), ("neg",)]
+
+
+def test_overlapping_rules_all_fire_regardless_of_order():
+    broad = _rule("reddit", url_contains="reddit.com/r/")
+    narrow = _rule("python", url_contains="/r/python")
+    urls = ["https://reddit.com/r/python/top", "https://reddit.com/r/rust"]
+    for order in ([broad, narrow], [narrow, broad]):
+        names = [set(n) for n in _names(RuleSet(order), urls)]
+        assert names == [{"reddit", "python"}, {"reddit"}]
+
+
+def test_title_rules_overlapping_in_one_title():
+    rules = RuleSet([_rule("patch", title="patch"), _rule("notes", title="patch notes", ignore_case=True, final=True)])
+    m = rules.match([""], ["Patch notes 1.2 patch"])[0]
+    assert set(m.rules) == {"patch", "notes"} and m.final
+
+
+def test_dense_rules_checked_per_entry_match_the_block_scan():
+    rules = RuleSet([
+        _rule("feed", url_contains=["reddit.com/r/", "facebook.com"]),
+        _rule("login", path="/login\\b", final=True),
+        _rule("home", title="^Home$"),
+    ])
+    urls = ["https://reddit.com/r/python?next=https://x.com/login", "https://reddit.com/login", "https://facebook.com/"]
+    titles = ["Home", "Not Home", None]
+    expected = [("feed", "home"), ("login",), ("feed",)]
+    # The first block hits every entry, so the second is checked per entry
+    assert _names(rules, urls * 4, titles * 4) == expected * 4
+    assert all(kind.rules[0].dense for kind in rules._kinds)
+    assert _names(rules, urls * 4, titles * 4) == expected * 4
@@ -0,0 +1,15 @@
+from src.topic_modeling.topic_merge import merge_similar_topics
+
+
+def test_near_duplicate_names_merge():
+    merged = merge_similar_topics([{"Video Games": {"description": "Games"}}, {"video-game": {"description": "Gaming news"}}])
+    assert list(merged) == ["Video Games"] and merged["Video Games"]["description"] == "Gaming news"
+
+
+def test_names_without_latin_letters_are_kept_apart_and_merged_when_identical():
+    merged = merge_similar_topics([
+        {"音楽": {"description": "a", "example_titles": ["x"]}, "アニメ": {"description": "b"}},
+        {"音楽": {"description": "ab", "example_titles": ["y"]}},
+    ])
+    assert set(merged) == {"音楽", "アニメ"}
+    assert merged["音楽"]["example_titles"] == ["x", "y"] and merged["アニメ"]["description"] == "b"